@@ -5,6 +5,8 @@ from fastapi import FastAPI, Depends
 from blockchain import Blockchain, Transaction
 from network import messages, Node
 from event_stream import Event, EventStream
+from wallet import Wallet
+from storage import CidCache
 
 app = FastAPI(title="Node API")
 
@@ -18,38 +20,57 @@ def get_blockchain() -> Blockchain:
 def wallets(
     limit: int = 10, offset: int = 0, blockchain: Blockchain = Depends(get_blockchain)
 ):
-    wallets_count = len(blockchain.sorted_wallets)
+    wallets_count = len(blockchain.wallets)
     return [
         w.to_dict()
-        for w in blockchain.sorted_wallets[
-            min(offset, wallets_count) : min(offset + limit, wallets_count)
-        ]
+        for w in blockchain.wallets.sorted_wallets(
+            min(offset, wallets_count), min(offset + limit, wallets_count)
+        )
     ]
 
 
 @app.get("/wallet")
 def wallet(address: str, blockchain: Blockchain = Depends(get_blockchain)):
-    return blockchain.wallets.get(address, "wallet dose not exists")
+    wallet = blockchain.wallets.get(address, None)
+    if wallet is None:
+        return "wallet dose not exists"
+    return wallet.to_dict()
 
 
 @app.get("/block")
 def block(index: int, blockchain: Blockchain = Depends(get_blockchain)):
-    if index >= len(blockchain.chain):
+    try:
+        return blockchain.get_block(index).to_dict()
+    except IndexError:
         return "Block is not found (not full node or block is not forged yet)"
-    return blockchain.chain[index].to_dict()
 
 
 @app.get("/blocks")
-def block(
+def blocks(
     limit: int = 10, offset: int = 0, blockchain: Blockchain = Depends(get_blockchain)
 ):
-    chain_length = len(blockchain.chain)
-    offset = min(chain_length, offset)
-    limit = min(chain_length, limit)
-    return [
-        b.to_dict()
-        for b in blockchain.chain[offset : min(limit + offset, chain_length)]
-    ]
+    offset = max(offset, 0)
+    stop = min(offset + max(limit, 0), blockchain.length)
+    found_blocks = []
+    for index in range(offset, stop):
+        try:
+            found_blocks.append(blockchain.get_block(index).to_dict())
+        except IndexError:  # pruned node
+            continue
+    return found_blocks
+
+
+@app.get("/metrics")
+def metrics(blockchain: Blockchain = Depends(get_blockchain)):
+    event_stream: EventStream = EventStream.get_instance()
+    return {
+        "event_stream": event_stream.metrics(),
+        "ipfs": Node.get_instance().ipfs_api.metrics(),
+        "mempool": blockchain.mempool.metrics(),
+        "cid_cache": CidCache.get_instance().metrics(),
+        "signature_cache": Wallet.signature_cache.metrics(),
+        "verifying_key_cache": Wallet.verifying_key_cache.metrics(),
+    }
 
 
 @app.post("/transaction")
@@ -0,0 +1,160 @@
+"""
+Memory used by the chain objects a full node keeps in memory:
+bytes per transaction / per block / per wallet (tracemalloc) and the process RSS
+after loading a synthetic chain (blocks are decoded from the binary format, like
+blocks that are read from the block store or the network)
+
+run from the src directory:
+    python -m benchmarks.chain_memory --blocks 100000 --transactions 2 --wallets 10000
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import tracemalloc
+
+from blockchain import Block, Transaction
+from blockchain.wallet_ledger import WalletLedger
+
+# Budgets for the slotted representations (bytes, 64 bit CPython 3.11)
+TRANSACTION_BUDGET = 450
+BLOCK_BUDGET = 600  # without the block transactions
+WALLET_BUDGET = 130  # the balance is an exact python number object (not a float64 slot)
+
+KEY_SIZE = 33
+
+
+def random_hex(size: int) -> str:
+    return random.getrandbits(size * 8).to_bytes(size, "big").hex()
+
+
+def random_signature() -> bytes:
+    return f"{random.getrandbits(256)}:{random.getrandbits(256)}".encode()
+
+
+def synthetic_block(index: int, previous_hash: str, addresses: list, transactions: int) -> bytes:
+    block = Block(
+        index=index,
+        previous_hash=previous_hash,
+        forger=random.choice(addresses),
+        signature=random_signature(),
+        transactions=[
+            Transaction(
+                sender=random.choice(addresses),
+                recipient=random.choice(addresses),
+                amount=random.randint(1, 1000),
+                nonce=index,
+                signature=random_signature(),
+            )
+            for _ in range(transactions)
+        ],
+    )
+    return block.to_bytes()
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # Not linux, use the peak RSS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+def traced_size(create, count: int) -> float:
+    """
+    :return: bytes allocated per object by create() (objects are kept alive while measuring)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [create() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before - count * 8) / count  # without the list pointers
+
+
+def ledger_row_size(addresses: list) -> float:
+    """
+    :return: bytes allocated per wallet row (the address strings are shared with the chain)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ledger = WalletLedger()
+    for address in addresses:
+        ledger.add(address, balance=random.random() * 1000)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(addresses)
+
+
+def report(name: str, size: float, budget: int):
+    status = "ok" if size <= budget else "OVER BUDGET"
+    print(f"{name}: {size:,.0f} bytes (budget {budget:,}) {status}")
+
+
+def run(blocks: int, transactions: int, wallets: int):
+    addresses = [random_hex(KEY_SIZE) for _ in range(max(wallets, 1))]
+    sample_blocks = [
+        synthetic_block(index, random_hex(32), addresses, transactions) for index in range(100)
+    ]
+
+    def load_block():
+        block = Block.from_bytes(random.choice(sample_blocks))
+        block.hash()
+        return block
+
+    block_size = traced_size(load_block, 1000)
+    empty_block_data = synthetic_block(0, random_hex(32), addresses, 0)
+    transactions_data = [
+        transaction.to_bytes() for transaction in Block.from_bytes(sample_blocks[0]).transactions
+    ]
+
+    def load_transaction():
+        transaction = Transaction.from_bytes(random.choice(transactions_data))
+        transaction.hash()
+        return transaction
+
+    def load_empty_block():
+        block = Block.from_bytes(empty_block_data)
+        block.hash()
+        return block
+
+    transaction_size = traced_size(load_transaction, 10000)
+    empty_block_size = traced_size(load_empty_block, 1000)
+    wallet_size = ledger_row_size(addresses)
+    report("transaction", transaction_size, TRANSACTION_BUDGET)
+    report("block (without transactions)", empty_block_size, BLOCK_BUDGET)
+    report("wallet", wallet_size, WALLET_BUDGET)
+    print(f"block with {transactions} transactions: {block_size:,.0f} bytes")
+
+    gc.collect()
+    rss_before = rss_bytes()
+    chain = []
+    previous_hash = random_hex(32)
+    for index in range(blocks):
+        block = Block.from_bytes(synthetic_block(index, previous_hash, addresses, transactions))
+        previous_hash = block.hash()
+        chain.append(block)
+    state_wallets = WalletLedger()
+    for address in addresses[:wallets]:
+        state_wallets.add(address)
+    gc.collect()
+    rss_after = rss_bytes()
+    print(
+        f"chain of {len(chain):,} blocks ({len(chain) * transactions:,} transactions)"
+        f" and {len(state_wallets):,} wallets: RSS {rss_after / 2 ** 20:,.1f} MB"
+        f" ({(rss_after - rss_before) / 2 ** 20:,.1f} MB for the chain)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=2)
+    parser.add_argument("--wallets", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.blocks, args.transactions, args.wallets)
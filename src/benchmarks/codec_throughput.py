@@ -0,0 +1,54 @@
+"""
+Compare the binary block format (blockchain/codec.py) with the JSON format:
+payload size and encode / decode throughput
+
+run from the src directory:
+    python -m benchmarks.codec_throughput --blocks 20 --transactions 20
+"""
+import argparse
+import json
+from time import perf_counter
+
+from blockchain import Block
+
+from .hash_calls import create_chain
+
+
+def measure(name: str, function, items: list, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(item)
+    elapsed = perf_counter() - start
+    per_second = len(items) * repeat / elapsed
+    print(f"{name}: {per_second:,.0f} blocks/sec")
+    return per_second
+
+
+def run(blocks: int, transactions: int, repeat: int):
+    chain = create_chain(blocks, transactions)
+
+    json_payloads = [json.dumps(block.to_dict()).encode() for block in chain]
+    binary_payloads = [block.to_bytes() for block in chain]
+    for block, payload in zip(chain, binary_payloads):
+        assert Block.from_bytes(payload).hash() == block.hash(), "round trip changed the block hash"
+
+    json_size = sum(map(len, json_payloads)) / blocks
+    binary_size = sum(map(len, binary_payloads)) / blocks
+    print(f"blocks: {blocks} transactions per block: {transactions}")
+    print(f"json block size: {json_size:,.0f} bytes")
+    print(f"binary block size: {binary_size:,.0f} bytes ({binary_size / json_size:.0%} of json)")
+
+    measure("json encode", lambda block: json.dumps(block.to_dict()).encode(), chain, repeat)
+    measure("binary encode", Block.to_bytes, chain, repeat)
+    measure("json decode", lambda data: Block.from_dict(**json.loads(data)), json_payloads, repeat)
+    measure("binary decode", Block.from_bytes, binary_payloads, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.blocks, args.transactions, args.repeat)
@@ -0,0 +1,53 @@
+"""
+Measure end to end publish -> callback latency across chained event stream topics
+(like network -> protocol -> new-block-from-network -> chain extender)
+
+run from the src directory:
+    python -m benchmarks.event_stream_latency --hops 4 --events 200
+"""
+import argparse
+import statistics
+from threading import Event as ThreadEvent
+from time import perf_counter
+
+from event_stream import EventStream, Subscriber, Event
+
+
+def chain_topics(event_stream: EventStream, hops: int, on_last_hop):
+    for hop in range(hops):
+        def forward(event: Event, next_topic=f"hop-{hop + 1}"):
+            event_stream.publish(next_topic, Event(event.name, **event.args))
+
+        callback = on_last_hop if hop == hops - 1 else forward
+        Subscriber(topic=f"hop-{hop}", callback=callback).start()
+
+
+def run(hops: int, events: int):
+    event_stream = EventStream()
+    latencies = []
+    received = ThreadEvent()
+
+    def on_last_hop(event: Event):
+        latencies.append(perf_counter() - event.args["sent_at"])
+        received.set()
+
+    chain_topics(event_stream, hops, on_last_hop)
+    for _ in range(events):
+        received.clear()
+        event_stream.publish("hop-0", Event("benchmark", sent_at=perf_counter()))
+        received.wait(timeout=5)
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    print(f"hops: {hops} events: {len(latencies_ms)}")
+    print(f"mean: {statistics.mean(latencies_ms):.3f}ms")
+    print(f"p50:  {latencies_ms[len(latencies_ms) // 2]:.3f}ms")
+    print(f"p99:  {latencies_ms[int(len(latencies_ms) * 0.99) - 1]:.3f}ms")
+    event_stream.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hops", type=int, default=4)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+    run(args.hops, args.events)
@@ -0,0 +1,76 @@
+"""
+Count block / transaction hash() calls and actual hash calculations per block
+while syncing a chain (Blockchain.add_chain)
+
+run from the src directory:
+    python -m benchmarks.hash_calls --blocks 20 --transactions 20
+"""
+import argparse
+from collections import Counter
+from functools import wraps
+
+from blockchain import Blockchain, Block, Transaction
+from wallet import Wallet
+
+
+def count_calls(cls, method_name: str, counter: Counter, key: str):
+    method = getattr(cls, method_name)
+
+    @wraps(method)
+    def counted(self, *args, **kwargs):
+        counter[key] += 1
+        return method(self, *args, **kwargs)
+
+    setattr(cls, method_name, counted)
+
+
+def create_chain(blocks: int, transactions: int) -> list:
+    blockchain = Blockchain(branch=True)
+    wallets = [Wallet(secret_passcode=f"benchmark-{index}") for index in range(4)]
+    nonces = {wallet.public_address: 1 for wallet in wallets}
+    chain = []
+    for block_index in range(blocks):
+        for transaction_index in range(transactions):
+            sender = wallets[transaction_index % len(wallets)]
+            recipient = wallets[(transaction_index + 1) % len(wallets)]
+            transaction = blockchain.new_transaction(
+                sender=sender.public_address,
+                recipient=recipient.public_address,
+                amount=1,
+                nonce=nonces[sender.public_address],
+            )
+            nonces[sender.public_address] += 1
+            transaction.signature = sender.sign(transaction.hash())
+            blockchain.add_transaction(transaction)
+        forger = wallets[block_index % len(wallets)]
+        block = blockchain.new_block(forger=forger.public_address)
+        block.signature = forger.sign(block.hash())
+        blockchain.add_block(block)
+        chain.append(block)
+    return chain
+
+
+def run(blocks: int, transactions: int):
+    chain = create_chain(blocks, transactions)
+    # Synced blocks are parsed from the network, so they start without cached hashes
+    chain = [Block.from_dict(**block.to_dict()) for block in chain]
+
+    counter = Counter()
+    count_calls(Block, "hash", counter, "block hash() calls")
+    count_calls(Block, "_calculate_hash", counter, "block hash calculations")
+    count_calls(Transaction, "hash", counter, "transaction hash() calls")
+    count_calls(Transaction, "_calculate_hash", counter, "transaction hash calculations")
+
+    Blockchain(branch=True).add_chain(chain)
+
+    print(f"blocks: {blocks} transactions per block: {transactions}")
+    for key, count in sorted(counter.items()):
+        print(f"{key}: {count / blocks:.1f} per block")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=20)
+    args = parser.parse_args()
+    run(args.blocks, args.transactions)
@@ -0,0 +1,109 @@
+"""
+Pubsub stream decoding throughput: IpfsAPI.sub_to_topic reading from a local stand-in
+of the IPFS pubsub API that streams many messages per chunk (and splits messages between
+chunks), compared with the previous decoder (concatenate until chunk ends with newline)
+
+run from the src directory:
+    python -m benchmarks.pubsub_stream --messages 20000 --chunk-size 4096
+"""
+import argparse
+import json
+import threading
+from base64 import b64decode, b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from network.ipfs.api import IpfsAPI
+
+
+def create_stream(messages: int, payload_size: int) -> bytes:
+    lines = []
+    for index in range(messages):
+        message = {"meta": {"node_id": "peer", "index": index}, "cid": "x" * payload_size}
+        data = b64encode(json.dumps(message).encode()).decode()
+        lines.append(json.dumps({"from": "peer", "data": data, "topicIDs": ["bench"]}).encode())
+    return b"\n".join(lines) + b"\n"
+
+
+def create_server(stream: bytes, chunk_size: int) -> ThreadingHTTPServer:
+    class PubsubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.startswith("/api/v0/pubsub/sub"):
+                body = b'{"Version": "stand-in"}'
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for offset in range(0, len(stream), chunk_size):
+                chunk = stream[offset : offset + chunk_size]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            self.close_connection = True
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PubsubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def previous_decoder(api: IpfsAPI, topic: str):
+    response = api.session.post(
+        api.base_api_url + "/pubsub/sub", params={"arg": topic}, stream=True
+    )
+    data = b""
+    for stream_data in response:
+        data += stream_data
+        if stream_data.endswith(b"\n"):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:  # many messages in one read
+                data = b""
+                continue
+            data["data"] = b64decode(data["data"])
+            yield data
+            data = b""
+
+
+def measure(name: str, messages_iterator, expected: int):
+    start = perf_counter()
+    received = sum(1 for _ in messages_iterator)
+    elapsed = perf_counter() - start
+    print(
+        f"{name}: {received:,}/{expected:,} messages decoded, "
+        f"{received / elapsed:,.0f} messages/sec"
+    )
+
+
+def run(messages: int, previous_messages: int, payload_size: int, chunk_size: int):
+    # The previous decoder is quadratic on long lines, it reads a shorter stream
+    for name, decode, count in (
+        ("sub_to_topic", IpfsAPI.sub_to_topic, messages),
+        ("previous decoder", previous_decoder, previous_messages),
+    ):
+        stream = create_stream(count, payload_size)
+        server = create_server(stream, chunk_size)
+        api = IpfsAPI(host="127.0.0.1", port=server.server_address[1])
+        print(f"stream: {len(stream):,} bytes in {chunk_size:,} bytes chunks")
+        try:
+            measure(name, decode(api, "bench"), count)
+        finally:
+            api.close()
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--previous-messages", type=int, default=2000)
+    parser.add_argument("--payload-size", type=int, default=60)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    args = parser.parse_args()
+    run(args.messages, args.previous_messages, args.payload_size, args.chunk_size)
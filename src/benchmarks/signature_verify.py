@@ -0,0 +1,57 @@
+"""
+Compare signature verification throughput with and without the verifying key cache
+(a few senders signing many different hashes, so the signature cache never hits)
+
+run from the src directory:
+    python -m benchmarks.signature_verify --senders 5 --signatures 500
+"""
+import argparse
+import binascii
+import hashlib
+from time import perf_counter
+
+import ecdsa
+
+from config import Config
+from wallet import Wallet
+from wallet.wallet import decode_signature
+
+
+def verify_without_key_cache(verifying_key: str, signature: bytes, hash_str: str):
+    vk = ecdsa.VerifyingKey.from_string(
+        binascii.unhexlify(verifying_key),
+        curve=Config.ECDSA_CURVE,
+        valid_encodings=["compressed", "raw"],
+    )
+    return vk.verify_digest(signature, bytes.fromhex(hash_str), sigdecode=decode_signature)
+
+
+def run(senders: int, signatures: int):
+    wallets = [Wallet(secret_passcode=f"benchmark-{index}") for index in range(senders)]
+    samples = []
+    for index in range(signatures):
+        wallet = wallets[index % senders]
+        hash_str = hashlib.sha256(str(index).encode()).hexdigest()
+        samples.append((wallet.public_address, wallet.sign(hash_str), hash_str))
+
+    start = perf_counter()
+    for sample in samples:
+        verify_without_key_cache(*sample)
+    before = signatures / (perf_counter() - start)
+
+    start = perf_counter()
+    for sample in samples:
+        assert Wallet.verify_signature(*sample)
+    after = signatures / (perf_counter() - start)
+
+    print(f"senders: {senders} signatures: {signatures}")
+    print(f"without key cache: {before:.1f} verifications/sec")
+    print(f"with key cache:    {after:.1f} verifications/sec ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--senders", type=int, default=5)
+    parser.add_argument("--signatures", type=int, default=500)
+    args = parser.parse_args()
+    run(args.senders, args.signatures)
@@ -2,6 +2,8 @@ from .blockchain import Blockchain, setup_blockchain as setup_main_chain
 from .blockchain_state import BlockchainState
 from .block import Block
 from .transaction import Transaction
+from .stored_chain import StoredChain
+from .mempool import Mempool
 from .subscribers import setup_subscribers
 from .exceptions import (
     ValidationError,
@@ -9,6 +11,9 @@ from .exceptions import (
     WalletLotteryFreezeError,
     DuplicateNonceError,
     NonLotteryMemberError,
+    BlockTooLargeError,
+    MempoolFullError,
+    ReplacementFeeTooLowError,
 )
 
 
@@ -16,15 +21,25 @@ def setup_blockchain():
     setup_main_chain()
     setup_subscribers()
 
+
+def close_blockchain():
+    Block.signature_verifier.shutdown()
+
 __all__ = [
     "setup_blockchain",
+    "close_blockchain",
     "Blockchain",
     "BlockchainState",
     "Block",
     "Transaction",
+    "StoredChain",
+    "Mempool",
     "ValidationError",
     "InsufficientBalanceError",
     "WalletLotteryFreezeError",
     "DuplicateNonceError",
     "NonLotteryMemberError",
+    "BlockTooLargeError",
+    "MempoolFullError",
+    "ReplacementFeeTooLowError",
 ]
@@ -4,9 +4,12 @@ import hashlib
 from time import time
 from base64 import b64decode, b64encode
 
+from config import Config
 from wallet import Wallet
 from .constants import BLOCK_COUNT_FREEZE_WALLET_LOTTERY_AFTER_WIN, DEVELOPER_KEY
 from .transaction import Transaction
+from .signature_verifier import SignatureVerifier
+from .codec import CodecError, encode_block, decode_block, is_binary_block
 from .exceptions import (
     ValidationError,
     NonLotteryMemberError,
@@ -14,10 +17,29 @@ from .exceptions import (
     GenesisIsNotValidError,
     NonSequentialBlockIndexError,
     NonMatchingHashError,
+    BlockTooLargeError,
 )
 
 
 class Block:
+    # Every chain block is kept in memory, so no per instance __dict__
+    __slots__ = (
+        "index",
+        "previous_hash",
+        "timestamp",
+        "forger",
+        "transactions",
+        "signature",
+        "_hash_cache",
+        "_size_cache",
+    )
+    signature_verifier = SignatureVerifier()
+    # Changing one of those fields invalidates the cached hash
+    # (transactions must not be changed after they are added to the block)
+    HASHED_FIELDS = frozenset(
+        ("index", "timestamp", "previous_hash", "forger", "transactions")
+    )
+
     def __init__(
         self,
         index,
@@ -48,6 +70,17 @@ class Block:
         self.transactions = transactions
         self.signature = signature
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.HASHED_FIELDS:
+            self._invalidate_hash()
+        elif name == "signature":
+            super().__setattr__("_size_cache", None)
+
+    def _invalidate_hash(self):
+        super().__setattr__("_hash_cache", None)
+        super().__setattr__("_size_cache", None)
+
     def _raw_data(self):
         return {
             "index": self.index,
@@ -60,15 +93,20 @@ class Block:
             "forger": self.forger,
         }
 
+    def _calculate_hash(self):
+        block_dict = self._raw_data()
+        block_string = json.dumps(block_dict, sort_keys=True).encode()
+        return hashlib.sha256(block_string).hexdigest()
+
     def hash(self):
         """
         Calculate the block hash (block number, previous hash, transactions)
+        the hash is cached until one of the hashed fields is changed
         :return: String hash of block data (hex)
         """
-
-        block_dict = self._raw_data()
-        block_string = json.dumps(block_dict, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        if self._hash_cache is None:
+            self._hash_cache = self._calculate_hash()
+        return self._hash_cache
 
     def to_dict(self):
         return {
@@ -77,6 +115,23 @@ class Block:
             "signature": b64encode(self.signature).decode(),
         }
 
+    def to_bytes(self) -> bytes:
+        """
+        Serialize block to the binary format (see codec.py), JSON if the block can't be encoded
+        """
+        try:
+            return encode_block(self)
+        except CodecError:
+            return json.dumps(self.to_dict()).encode()
+
+    def size(self) -> int:
+        """
+        :return: encoded block bytes (cached like the hash, the signature also changes it)
+        """
+        if self._size_cache is None:
+            self._size_cache = len(self.to_bytes())
+        return self._size_cache
+
     def add_transaction(self, transaction: Transaction):
         """
         Add transaction to block
@@ -85,6 +140,7 @@ class Block:
         :return: None
         """
         self.transactions.append(transaction)
+        self._invalidate_hash()
 
     def is_signature_verified(self) -> bool:
         """
@@ -93,14 +149,37 @@ class Block:
         """
         return Wallet.verify_signature(self.forger, self.signature, self.hash())
 
+    def signatures(self) -> list:
+        """
+        :return: (public key, signature, hash) of the block and of every signed transaction
+        """
+        items = []
+        if self.signature is not None:
+            items.append((self.forger, self.signature, self.hash()))
+        for transaction in self.transactions:
+            if transaction.signature is not None:
+                items.append((transaction.sender, transaction.signature, transaction.hash()))
+        return items
+
+    def are_transactions_signatures_verified(self) -> bool:
+        return self.signature_verifier.verify_all(
+            [
+                (transaction.sender, transaction.signature, transaction.hash())
+                for transaction in self.transactions
+                if transaction.signature is not None
+            ]
+        )
+
     def validate(self, blockchain_state):
         """
         Validate block
         1. check block index (is the next block in the blockchain state)
         2. check previous hash (is the hash of the previous block)
-        3. check forger wallet (is lottery member?)
-        4. check block signature
-        5. validate transactions
+        3. check block size (transactions count and encoded bytes)
+        4. check forger wallet (is lottery member?)
+        5. check block signature
+        6. check transactions signatures (in parallel for big blocks)
+        7. validate transactions
 
         :param blockchain_state: Blockchain state object
         :raises ValidationError
@@ -120,10 +199,16 @@ class Block:
             )
         if self.previous_hash != blockchain_state.last_block_hash:
             raise NonMatchingHashError("previous hash not match previous block hash")
+        if len(self.transactions) > Config.MAX_BLOCK_TRANSACTIONS:
+            raise BlockTooLargeError(f"block has more then {Config.MAX_BLOCK_TRANSACTIONS} transactions")
+        if self.size() > Config.MAX_BLOCK_BYTES:
+            raise BlockTooLargeError(f"block is bigger then {Config.MAX_BLOCK_BYTES} bytes")
         if not self.is_signature_verified():
             raise ValidationError("invalid signature")
+        if not self.are_transactions_signatures_verified():
+            raise ValidationError("transaction signature is not valid")
         for transaction in self.transactions:
-            transaction.validate(blockchain_state=blockchain_state)
+            transaction.validate(blockchain_state=blockchain_state, check_signature=False)
         # TODO: Add timestamp validation
 
     @classmethod
@@ -147,5 +232,19 @@ class Block:
             **kwargs,
         )
 
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """
+        Parse block from the binary format or from JSON (old payloads)
+        :raise CodecError / ValueError: when data is invalid
+        """
+        if not is_binary_block(data):
+            return cls.from_dict(**json.loads(data))
+        block_fields = decode_block(data)
+        transactions = [
+            Transaction(**transaction) for transaction in block_fields.pop("transactions")
+        ]
+        return cls(transactions=transactions, **block_fields)
+
     def __getitem__(self, item):
         return getattr(self, item)
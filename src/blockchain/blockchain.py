@@ -1,11 +1,20 @@
-from typing import Dict, List
+from itertools import islice
+from threading import RLock
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Union
+
+from loguru import logger
 
 from config import Config
+from storage import BlockStore, SnapshotStore
 
 from .constants import GENESIS_BLOCK
 from .transaction import Transaction
 from .block import Block
+from .exceptions import ValidationError
 from .blockchain_state import BlockchainState
+from .stored_chain import StoredChain
+from .mempool import Mempool
+from .codec import block_header_size
 
 
 class Blockchain:
@@ -19,23 +28,39 @@ class Blockchain:
     def get_main_chain(cls):
         return cls.main_chain
 
-    def __init__(self, branch: bool = False):
+    def __init__(
+        self,
+        branch: bool = False,
+        stored_chain: StoredChain = None,
+        snapshot_store: SnapshotStore = None,
+    ):
+        """
+        :param branch: allow creating chain other then the main chain
+        :param stored_chain: blocks stored on disk, the chain state is loaded from them (if any)
+        :param snapshot_store: chain state snapshots, the latest one is loaded on startup
+        """
         if self.__class__.main_chain is not None and not branch:
             raise RuntimeError("Singleton can initialized only once. use get_main_chain() or mark as branch")
-        self.current_transactions: Dict[
-            str, Transaction
-        ] = {}  # {transaction hash: transaction object}
-        self.chain: List[Block] = []
+        self.mempool = Mempool()  # pending transactions
+        self.chain: Union[List[Block], StoredChain] = []
         self.chain_length = 0
         self.__state: BlockchainState = BlockchainState()
         self.pruned = not Config.IS_FULL_NODE
-        self.default_genesis()
+        self.lock = RLock()  # blocks are added / the storage is handed over under the lock
+        self.snapshot_store = snapshot_store
+        if self.snapshot_store is not None:
+            self.load_snapshot(stored_chain)
+        if stored_chain is not None:
+            self.load_stored_chain(stored_chain)
+        if self.length == 0:
+            self.default_genesis()
 
-        self.set_main_chain(self)
+        if not branch:
+            self.set_main_chain(self)
 
     @property
     def last_block(self):
-        return self.chain[-1]
+        return self.__state.last_block
 
     @property
     def score(self):
@@ -53,10 +78,6 @@ class Blockchain:
     def wallets(self):
         return self.__state.wallets
 
-    @property
-    def sorted_wallets(self):
-        return self.__state.sorted_wallets
-
     def default_genesis(self):
         genesis_block = Block.from_dict(**GENESIS_BLOCK)
         self.add_block(genesis_block)
@@ -76,9 +97,10 @@ class Blockchain:
             index=index, previous_hash=previous_hash, forger=forger, signature=signature
         )
 
-        new_block.transactions = sorted(
-            self.current_transactions.values(),
-            key=lambda t: t.nonce + (1 / int.from_bytes(t.hash().encode(), "little")),
+        # Block template: best fee per byte transactions that fit the block limits
+        new_block.transactions = self.mempool.select(
+            max_transactions=Config.MAX_BLOCK_TRANSACTIONS,
+            max_bytes=Config.MAX_BLOCK_BYTES - block_header_size(new_block),
         )
 
         return new_block
@@ -86,14 +108,17 @@ class Blockchain:
     def add_block(self, block: Block):
         if block.signature is None:
             raise ValueError("Block is unsigned!")
-        self.__state.add_block(block)
-        for tx in block.transactions:
-            self.current_transactions.pop(tx.hash(), None)
-        if self.pruned:
-            self.chain = [block]
-        else:
-            self.chain.append(block)
-        self.chain_length += 1
+        with self.lock:
+            previous_length = self.length
+            self.__state.add_block(block)
+            self.mempool.remove_included(block.transactions)
+            self._revalidate_pending({transaction.sender for transaction in block.transactions})
+            if self.pruned:
+                self.chain = [block]
+            else:
+                self.chain.append(block)
+            self.chain_length += 1
+            self._snapshot_if_needed(previous_length)
 
     def new_transaction(
         self,
@@ -127,13 +152,248 @@ class Blockchain:
         return new_transaction
 
     def add_transaction(self, transaction: Transaction):
+        """
+        Validate transaction and add it to the pending transactions pool
+        :raise ValidationError: invalid transaction or rejected by the pool (see Mempool.add)
+        """
         transaction.validate(blockchain_state=self.__state)
-        self.current_transactions[transaction.hash()] = transaction
+        self.mempool.add(transaction)
+
+    def add_chain(self, blocks: List[Block]):
+        """
+        Add blocks after the last block, all or nothing: the blocks are validated on a copy of
+        the chain state that replaces the state only when all of them are valid
+        :raise ValidationError: a block is invalid (the chain, state and storage are unchanged)
+        """
+        with self.lock:
+            state = self.__state.copy()
+            state.add_chain(blocks)
+            previous_length = self.length
+            self.__state = state
+            senders = set()
+            for block in blocks:
+                self.mempool.remove_included(block.transactions)
+                senders.update(transaction.sender for transaction in block.transactions)
+            self._revalidate_pending(senders)
+            if not self.pruned:
+                self.chain.extend(blocks)
+            elif blocks:
+                self.chain = [blocks[-1]]
+            self.chain_length += len(blocks)
+            self._snapshot_if_needed(previous_length)
+
+    def _revalidate_pending(self, senders: Set[str]):
+        """
+        Evict pending transactions of senders that their nonce or balance changed (stale nonce /
+        insufficient balance), the signatures were verified when the transactions were added
+        """
+        removed = self.mempool.revalidate_senders(
+            senders,
+            lambda transaction: transaction.validate(self.__state, check_signature=False),
+        )
+        if removed:
+            logger.debug(f"{len(removed)} pending transactions became invalid")
+
+    def _snapshot_if_needed(self, previous_length: int):
+        if self.snapshot_store is None:
+            return
+        interval = Config.SNAPSHOT_INTERVAL
+        if self.length // interval > previous_length // interval:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        self.snapshot_store.save(self.length, self.__state.to_dict())
+        logger.info(f"Chain state snapshot saved at length {self.length}")
+
+    def _find_snapshot(
+        self, max_length: int = None, block_hash: Callable[[int], str] = None
+    ) -> Optional[dict]:
+        """
+        :param max_length: latest chain length the snapshot can be taken at (None for any)
+        :param block_hash: block hash by index, the snapshot last block must match it
+        :return: the latest valid snapshot (without block_hash, on pruned node, it is trusted
+                 to be of the current chain: snapshots of replaced chains are removed when
+                 the chain is replaced, see adopt_storage)
+        """
+        for length in self.snapshot_store.lengths():
+            if max_length is not None and length > max_length:
+                continue
+            snapshot = self.snapshot_store.load(length)
+            if snapshot is None:
+                continue
+            if block_hash is not None and block_hash(length - 1) != snapshot["block_hashs"][-1]:
+                continue
+            return snapshot
+        return None
+
+    def _load_state(self, snapshot: dict):
+        self.__state = BlockchainState.from_dict(**snapshot)
+        self.chain = [self.__state.last_block]
+        self.chain_length = self.length
+
+    def load_snapshot(self, stored_chain: StoredChain = None) -> bool:
+        """
+        Load the latest valid snapshot of the chain state
+        :param stored_chain: if given the snapshot must match the stored blocks
+        :return: True if snapshot is loaded
+        """
+        if stored_chain is None:
+            snapshot = self._find_snapshot()
+        else:
+            snapshot = self._find_snapshot(len(stored_chain), stored_chain.store.block_hash)
+        if snapshot is None:
+            return False
+        self._load_state(snapshot)
+        logger.info(f"Chain state loaded from snapshot at length {self.length}")
+        return True
+
+    def load_stored_chain(self, stored_chain: StoredChain):
+        """
+        Rebuild the chain state from blocks stored on disk (starting after the loaded snapshot)
+        """
+        previous_length = self.length
+        for index, block in enumerate(stored_chain.iter_from(self.length), start=self.length):
+            try:
+                self.__state.add_block(block)
+            except ValidationError:
+                logger.warning(f"Stored block [{index}] is invalid, dropping stored blocks from it")
+                stored_chain.truncate(index)
+                break
+        self.chain = stored_chain
+        self.chain_length = len(stored_chain)
+        self._snapshot_if_needed(previous_length)
+
+    def adopt_storage(self, blockchain):
+        """
+        Take over the storage of the chain that this branch is replacing, the replaced chain
+        keeps adding blocks only in memory (hold its lock until this chain is the main chain)
+        :param blockchain: the replaced chain
+        """
+        with blockchain.lock:
+            if isinstance(blockchain.chain, StoredChain):
+                self.save_to(blockchain.chain)
+                blockchain.chain = [blockchain.last_block]
+            self.snapshot_store = blockchain.snapshot_store
+            blockchain.snapshot_store = None
+            if self.snapshot_store is not None:
+                self._remove_stale_snapshots()
+                self.save_snapshot()
+
+    def _remove_stale_snapshots(self):
+        """
+        Remove the snapshots that are not of this chain (taken on the replaced chain after the fork)
+        """
+        for length in self.snapshot_store.lengths():
+            snapshot = self.snapshot_store.load(length)
+            if (
+                snapshot is None
+                or length > self.length
+                or self.block_hashs[length - 1] != snapshot["block_hashs"][-1]
+            ):
+                self.snapshot_store.remove(length)
+                logger.debug(f"Removed stale chain state snapshot at length {length}")
+
+    def save_to(self, stored_chain: StoredChain):
+        """
+        Persist this chain to the store (used when a synced branch become the main chain).
+        Only the blocks after the common prefix are rewritten.
+        :raise ValueError: when blocks after the common prefix are not in memory
+        """
+        # Chains that share a block share all the blocks before it, binary search the prefix
+        common_length = 0
+        max_common_length = min(len(stored_chain), self.length)
+        while common_length < max_common_length:
+            middle = (common_length + max_common_length + 1) // 2
+            if stored_chain.store.block_hash(middle - 1) == self.block_hashs[middle - 1]:
+                common_length = middle
+            else:
+                max_common_length = middle - 1
+        first_index = self.chain[0].index if self.chain else self.length
+        if common_length < first_index:
+            raise ValueError(f"blocks from index {common_length} are not in memory")
+        stored_chain.truncate(common_length)
+        stored_chain.extend(self.chain[common_length - first_index:])
+        self.chain = stored_chain
+
+    def locator(self, dense: int = 10) -> List[Tuple[int, str]]:
+        """
+        Describe the chain for sync requests with few block hashes:
+        the last <dense> blocks and then exponentially sparser blocks back to the genesis
+        :return: list of (index, hash) from the last block to the genesis block
+        """
+        indexes = []
+        index = self.length - 1
+        step = 1
+        while index > 0:
+            indexes.append(index)
+            if len(indexes) >= dense:
+                step *= 2
+            index -= step
+        indexes.append(0)
+        return [(index, self.block_hashs[index]) for index in indexes]
 
-    def add_chain(self, blocks: list):
-        self.__state.add_chain(blocks)
-        self.chain.extend(blocks)
-        self.chain_length += len(blocks)
+    def common_ancestor(self, locator: List[Tuple[int, str]]) -> int:
+        """
+        :param locator: other chain locator (see locator())
+        :return: index of the last block that both chains have (-1 if none)
+        """
+        for index, block_hash in locator:
+            if 0 <= index < self.length and self.block_hashs[index] == block_hash:
+                return index
+        return -1
+
+    def _iter_blocks(self, start: int, stop: int) -> Optional[Iterator[Block]]:
+        """
+        :return: the blocks in range [start, stop) or None if they are not available (pruned)
+        """
+        if isinstance(self.chain, StoredChain):
+            return islice(self.chain.iter_from(start), stop - start)
+        first_index = self.chain[0].index if self.chain else self.length
+        if start < min(first_index, stop):
+            return None
+        return iter(self.chain[start - first_index:stop - first_index])
+
+    def fork(self, length: int):
+        """
+        Create branch of this chain with its first <length> blocks (to add other blocks after them).
+        The branch state is restored from the latest snapshot before <length> and the blocks
+        after the snapshot are replayed.
+        :return: the branch or None if the blocks are not available (pruned node)
+        """
+        branch = Blockchain(branch=True)
+        if self.snapshot_store is not None:
+            snapshot = self._find_snapshot(length, lambda index: self.block_hashs[index])
+            if snapshot is not None:
+                branch._load_state(snapshot)
+        blocks = self._iter_blocks(branch.length, length)
+        if blocks is None:
+            return None
+        branch.__state.add_chain(blocks)
+        branch.chain = [branch.last_block]
+        branch.chain_length = branch.length
+        return branch
+
+    def get_block(self, index: int) -> Block:
+        """
+        :param index: block index in the chain (on pruned node the chain holds only the last blocks)
+        :raise IndexError: when the block is not stored (pruned node or block isn't forged yet)
+        """
+        first_index = 0
+        if not isinstance(self.chain, StoredChain):
+            first_index = self.chain[0].index if self.chain else self.length
+        if not first_index <= index < first_index + len(self.chain):
+            raise IndexError(f"block {index} is not stored")
+        return self.chain[index - first_index]
+
+    def iter_blocks_data(self, start: int = 0) -> Iterator[bytes]:
+        """
+        Encoded blocks from index start (blocks before the first block in memory are skipped
+        on pruned node), stored blocks are read as is
+        """
+        if isinstance(self.chain, StoredChain):
+            return self.chain.iter_data_from(start)
+        first_index = self.chain[0].index if self.chain else 0
+        return (block.to_bytes() for block in self.chain[max(start - first_index, 0):])
 
     def validate_block(self, block: Block):
         return block.validate(self.__state)
@@ -148,7 +408,11 @@ class Blockchain:
 
 
 def setup_blockchain():
-    #  TODO: load from disk
-    blockchain = Blockchain()
+    stored_chain = None
+    if Config.IS_FULL_NODE:
+        stored_chain = StoredChain(BlockStore.get_instance())
+    blockchain = Blockchain(
+        stored_chain=stored_chain, snapshot_store=SnapshotStore.get_instance()
+    )
     Blockchain.set_main_chain(blockchain)
 
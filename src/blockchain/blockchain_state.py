@@ -1,16 +1,17 @@
-from typing import Dict
+from typing import Iterable, List
 
-from .consensus import SumTree, wallet_score
+from config import Config
+
+from .consensus import SumTree, wallet_score, power_weight
 from .block import Block
 from .exceptions import DuplicateNonceError
-from .remote_wallet import RemoteWallet
+from .wallet_ledger import WalletLedger
 
 
 class BlockchainState:
     def __init__(self):
-        self.wallets = {}  # type: Dict[str, RemoteWallet]
-        self.sorted_wallets = []  # Sorted by wallet address aka public key
-        self.wallets_sum_tree: SumTree = None
+        self.wallets = WalletLedger()  # wallet row == sum tree index
+        self.wallets_sum_tree: SumTree = SumTree()
 
         self.score = 0  # type: float
         self.length = 0  # type: int
@@ -19,76 +20,96 @@ class BlockchainState:
         self.last_block_hash = None  # type: str
         self.last_block = None  # type: Block
 
-    def _chain_extended(self):
-        # Building the tree
-        self.wallets_sum_tree: SumTree = SumTree.from_dict(
-            {w.power: index for index, w in enumerate(self.sorted_wallets)}
-        )
+    def _wallet_weight(self, row: int) -> int:
+        return power_weight(self.wallets.balance[row], self.wallets.last_transaction[row])
+
+    def _chain_extended(self, changed_rows: Iterable[int]):
+        # Update only the tree leafs of wallets that changed in the block
+        for row in changed_rows:
+            self.wallets.update_power(row)
+            self.wallets_sum_tree.update(row, self._wallet_weight(row))
 
-    def _add_new_wallet(self, wallet: RemoteWallet):
-        self.wallets[wallet.address] = wallet
-        self.sorted_wallets.append(wallet)
-        self.sorted_wallets.sort(key=lambda w: w.address)
-
-    def _get_wallet(self, wallet_address) -> RemoteWallet:
-        wallet = self.wallets.get(wallet_address, None)
-        if wallet:
-            return wallet
-        wallet = RemoteWallet.new_empty(wallet_address)
-        self._add_new_wallet(wallet)
-        return wallet
-
-    def _calculate_wallet_score(self, wallet: RemoteWallet):
-        if not self.wallets_sum_tree:
-            self._chain_extended()
+    def _get_wallet_row(self, wallet_address: str) -> int:
+        row = self.wallets.rows.get(wallet_address, None)
+        if row is not None:
+            return row
+        row = self.wallets.add(wallet_address, balance=1 if Config.IS_TEST_NET else 0)
+        self.wallets_sum_tree.append(self._wallet_weight(row))
+        return row
+
+    def _calculate_wallet_score(self, wallet_address: str) -> float:
         lottery_number = 0.3512
         # TODO: change to random value based on last 4 block's hash
         score = wallet_score(
             self.wallets_sum_tree,
-            wallet,
+            wallet_address,
             lottery_number=lottery_number,
-            wallets_sorted_by_address=self.sorted_wallets,
+            sorted_addresses=self.wallets.sorted_addresses,
+            addresses_by_index=self.wallets.addresses,
         )
-        # print(f"Wallet {wallet.address} score: {score}")
         return score
 
-    def block_score(self, block: Block) -> int:
-        forger_wallet_address = block.forger
-        forger_wallet = self._get_wallet(forger_wallet_address)
-        return self._calculate_wallet_score(forger_wallet)
+    def block_score(self, block: Block) -> float:
+        self._get_wallet_row(block.forger)
+        return self._calculate_wallet_score(block.forger)
+
+    def _check_nonces(self, block: Block):
+        """
+        Check the nonces of all the block transactions before the ledger is changed
+        (block.validate checks every transaction against the state before the block)
+        :raise DuplicateNonceError: the sender nonce is already used
+        """
+        nonces = {}  # sender address: nonce counter after the previous block transactions
+        for transaction in block.transactions:
+            nonce = nonces.get(transaction.sender, None)
+            if nonce is None:
+                row = self.wallets.rows.get(transaction.sender, None)
+                nonce = 0 if row is None else self.wallets.nonce[row]
+            if transaction.nonce < nonce:
+                raise DuplicateNonceError()
+            nonces[transaction.sender] = nonce + 1
 
     def add_block(self, block: Block):
+        """
+        Validate the block and apply it, an invalid block doesn't change the state
+        :raise ValidationError: invalid block
+        """
         block.validate(blockchain_state=self)
+        if block.index != 0:
+            self._check_nonces(block)
         fees = 0
-        forger_wallet = self._get_wallet(block.forger)
+        ledger = self.wallets
+        forger_row = self._get_wallet_row(block.forger)
+        changed_rows = [forger_row]  # duplicates are no-op tree updates
         forger_score = (
-            100 if self.length == 0 else self._calculate_wallet_score(forger_wallet)
+            100 if self.length == 0 else self._calculate_wallet_score(block.forger)
         )
         # TODO change from 100 to 0 after lottery system refactor
 
         for transaction in block.transactions:
             if block.index == 0:  # Genesis block
-                recipient_wallet = self._get_wallet(transaction.recipient)
-                recipient_wallet.balance += transaction.amount
+                recipient_row = self._get_wallet_row(transaction.recipient)
+                ledger.balance[recipient_row] += transaction.amount
+                changed_rows.append(recipient_row)
                 continue
-            sender_wallet = self._get_wallet(transaction.sender)
-            recipient_wallet = self._get_wallet(transaction.recipient)
+            sender_row = self._get_wallet_row(transaction.sender)
+            recipient_row = self._get_wallet_row(transaction.recipient)
 
-            if transaction.nonce < sender_wallet.nonce_counter:
-                raise DuplicateNonceError()
+            ledger.nonce[sender_row] += 1
+            ledger.balance[sender_row] -= transaction.amount
+            ledger.balance[sender_row] -= transaction.fee
 
-            sender_wallet.nonce_counter += 1
-            sender_wallet.balance -= transaction.amount
-            sender_wallet.balance -= transaction.fee
+            ledger.balance[recipient_row] += transaction.amount
 
-            recipient_wallet.balance += transaction.amount
+            ledger.last_transaction[sender_row] = block.index
+            ledger.last_transaction[recipient_row] = block.index
 
-            sender_wallet.last_transaction = block.index
-            recipient_wallet.last_transaction = block.index
+            changed_rows.append(sender_row)
+            changed_rows.append(recipient_row)
 
             fees += transaction.fee
-        forger_wallet.balance += fees
-        forger_wallet.last_transaction = block.index
+        ledger.balance[forger_row] += fees
+        ledger.last_transaction[forger_row] = block.index
 
         self.score += forger_score
         self.last_block = block
@@ -96,8 +117,62 @@ class BlockchainState:
         self.block_hashs.append(self.last_block_hash)
         self.length += 1
 
-        self._chain_extended()  # consensus algorithm update
+        self._chain_extended(changed_rows)  # consensus algorithm update
+
+    def copy(self):
+        """
+        Independent copy of the state (to validate blocks without changing this state)
+        """
+        state = self.__class__()
+        state.wallets = self.wallets.copy()
+        state.wallets_sum_tree = self.wallets_sum_tree.copy()
+        state.score = self.score
+        state.length = self.length
+        state.block_hashs = self.block_hashs[:]
+        state.last_block_hash = self.last_block_hash
+        state.last_block = self.last_block
+        return state
+
+    def to_dict(self) -> dict:
+        return {
+            "wallets": self.wallets.to_list(),
+            "score": self.score,
+            "length": self.length,
+            "block_hashs": self.block_hashs,
+            "last_block": self.last_block.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, wallets: list, score: float, length: int, block_hashs: list, last_block: dict):
+        """
+        Restore state from snapshot (wallets must be ordered by sum tree index)
+        """
+        state = cls()
+        state.wallets = WalletLedger.from_list(wallets)
+        state.wallets_sum_tree = SumTree.from_values(
+            state._wallet_weight(row) for row in range(len(state.wallets))
+        )
+        state.score = score
+        state.length = length
+        state.block_hashs = block_hashs
+        state.last_block = Block.from_dict(**last_block)
+        state.last_block_hash = block_hashs[-1]
+        return state
 
     def add_chain(self, chain):
+        window = []
         for block in chain:
+            window.append(block)
+            if len(window) == Config.CHAIN_VERIFY_WINDOW:
+                self._add_blocks(window)
+                window = []
+        self._add_blocks(window)
+
+    def _add_blocks(self, blocks: List[Block]):
+        # Verify all the signatures of the blocks at once (in parallel), the verified
+        # signatures are cached so the sequential validation only checks the state.
+        Block.signature_verifier.verify_many(
+            [item for block in blocks for item in block.signatures()]
+        )
+        for block in blocks:
             self.add_block(block)
@@ -0,0 +1,479 @@
+"""
+Compact binary serialization of blocks and transactions (used for IPFS payloads and disk storage)
+
+block:       [magic b"YB"][version][block body]
+transaction: [magic b"YT"][version][transaction body]
+chunk:       [magic b"YC"][version][compression][blocks count (varint), (varint length + encoded block)...]
+             (sync unit of many blocks, the part after the compression byte is zlib compressed)
+
+block body:       index (varint), timestamp (number), previous hash (hex string), forger (hex string),
+                  signature, transactions count (varint), transaction bodies
+transaction body: sender (hex string), recipient (hex string), amount (number), fee (number),
+                  nonce (varint), signature
+
+hex string: [tag] compressed public key (33 bytes) / hash (32 bytes) / other hex (varint length + bytes)
+            / any other string (varint length + utf-8) / none
+number:     [tag] unsigned int (varint) / negative int (varint) / float (8 bytes double)
+signature:  [tag] none / "r:s" signature as r||s (64 bytes) / other bytes (varint length + bytes)
+
+Values are decoded to exactly the same python values (same types), so the hashes of decoded
+blocks and transactions don't change.
+"""
+import sys
+import zlib
+import struct
+from typing import Dict, List, Tuple
+
+from config import Config
+
+__all__ = [
+    "CodecError",
+    "VERSION",
+    "encode_block",
+    "decode_block",
+    "encode_transaction",
+    "decode_transaction",
+    "is_binary_block",
+    "is_binary_transaction",
+    "transaction_size",
+    "block_header_size",
+    "encode_chunk",
+    "decode_chunk",
+    "max_chunk_payload_size",
+]
+
+VERSION = 1
+BLOCK_MAGIC = b"YB"
+TRANSACTION_MAGIC = b"YT"
+CHUNK_MAGIC = b"YC"
+
+STRING_UTF8, STRING_HEX, STRING_KEY, STRING_HASH, STRING_NONE = range(5)
+NUMBER_UINT, NUMBER_NEGATIVE_INT, NUMBER_FLOAT = range(3)
+SIGNATURE_NONE, SIGNATURE_RS, SIGNATURE_BYTES = range(3)
+CHUNK_RAW, CHUNK_ZLIB = range(2)
+
+KEY_SIZE = 33
+HASH_SIZE = 32
+SIGNATURE_INT_SIZE = 32
+VARINT_MAX_SIZE = 5  # lengths and counts (up to 32 bits)
+
+DOUBLE = struct.Struct(">d")
+KEYS_PAIR = struct.Struct(f">B{KEY_SIZE}sB{KEY_SIZE}s")  # two tagged keys
+HEX_DIGITS = "0123456789abcdef"
+ENCODED_KEYS_CACHE_SIZE = 4096
+
+# public key hex string: its encoded string (tag and key bytes)
+_encoded_keys: Dict[str, bytes] = {}
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _encode_varint(value: int, out: bytearray):
+    if value < 0x80:  # most lengths, counts and nonces
+        if value < 0:
+            raise CodecError("varint must be non negative")
+        out.append(value)
+        return
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    if offset < len(data) and data[offset] < 0x80:  # one byte varint
+        return data[offset], offset + 1
+    value = 0
+    shift = 0
+    size = len(data)
+    while True:
+        if offset >= size:
+            raise CodecError("truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _read(data: bytes, offset: int, size: int) -> Tuple[bytes, int]:
+    end = offset + size
+    if end > len(data):
+        raise CodecError("truncated data")
+    return bytes(data[offset:end]), end
+
+
+def _read_tag(data: bytes, offset: int) -> int:
+    if offset >= len(data):
+        raise CodecError("truncated data")
+    return data[offset]
+
+
+def _is_hex(value: str) -> bool:
+    # Lower case hex digits of whole bytes (str.strip is faster than a regex match)
+    return len(value) % 2 == 0 and value != "" and not value.strip(HEX_DIGITS)
+
+
+def _encode_string(value: str, out: bytearray):
+    if value is None:
+        out.append(STRING_NONE)
+        return
+    if not isinstance(value, str):
+        raise CodecError(f"expected string got {type(value).__name__}")
+    encoded = _encoded_keys.get(value, None)
+    if encoded is not None:
+        out += encoded
+        return
+    if _is_hex(value):
+        raw = bytes.fromhex(value)
+        if len(raw) == KEY_SIZE:
+            # The same few wallet addresses repeat in every block
+            encoded = bytes((STRING_KEY,)) + raw
+            if len(_encoded_keys) >= ENCODED_KEYS_CACHE_SIZE:
+                _encoded_keys.clear()
+            _encoded_keys[value] = encoded
+            out += encoded
+            return
+        if len(raw) == HASH_SIZE:
+            out.append(STRING_HASH)
+        else:
+            out.append(STRING_HEX)
+            _encode_varint(len(raw), out)
+        out += raw
+        return
+    raw = value.encode()
+    out.append(STRING_UTF8)
+    _encode_varint(len(raw), out)
+    out += raw
+
+
+def _decode_string(data: bytes, offset: int) -> Tuple[str, int]:
+    tag = _read_tag(data, offset)
+    offset += 1
+    if tag == STRING_KEY:
+        end = offset + KEY_SIZE
+        if end > len(data):
+            raise CodecError("truncated data")
+        # The same few wallet addresses repeat in every block, share one string per address
+        return sys.intern(data[offset:end].hex()), end
+    if tag == STRING_HASH:
+        end = offset + HASH_SIZE
+        if end > len(data):
+            raise CodecError("truncated data")
+        return data[offset:end].hex(), end
+    if tag == STRING_NONE:
+        return None, offset
+    length, offset = _decode_varint(data, offset)
+    raw, offset = _read(data, offset, length)
+    if tag == STRING_HEX:
+        return raw.hex(), offset
+    if tag == STRING_UTF8:
+        return raw.decode(), offset
+    raise CodecError(f"unknown string tag {tag}")
+
+
+def _encode_number(value, out: bytearray):
+    value_type = type(value)
+    if value_type is int:
+        if value >= 0:
+            out.append(NUMBER_UINT)
+            _encode_varint(value, out)
+        else:
+            out.append(NUMBER_NEGATIVE_INT)
+            _encode_varint(-value, out)
+    elif value_type is float:
+        out.append(NUMBER_FLOAT)
+        out += DOUBLE.pack(value)
+    else:
+        raise CodecError(f"expected int or float got {value_type.__name__}")
+
+
+def _decode_number(data: bytes, offset: int):
+    tag = _read_tag(data, offset)
+    offset += 1
+    if tag == NUMBER_UINT:
+        return _decode_varint(data, offset)
+    if tag == NUMBER_NEGATIVE_INT:
+        value, offset = _decode_varint(data, offset)
+        return -value, offset
+    if tag == NUMBER_FLOAT:
+        if offset + DOUBLE.size > len(data):
+            raise CodecError("truncated data")
+        return DOUBLE.unpack_from(data, offset)[0], offset + DOUBLE.size
+    raise CodecError(f"unknown number tag {tag}")
+
+
+def _is_decimal(value: bytes) -> bool:
+    # Canonical decimal (no sign, no leading zeros), so the decoded signature is the same bytes
+    return value.isdigit() and (value[0] != 0x30 or len(value) == 1)
+
+
+def _encode_signature(signature, out: bytearray):
+    if signature is None:
+        out.append(SIGNATURE_NONE)
+        return
+    if not isinstance(signature, bytes):
+        raise CodecError(f"expected bytes signature got {type(signature).__name__}")
+    r, separator, s = signature.partition(b":")
+    if separator and _is_decimal(r) and _is_decimal(s):
+        r, s = int(r), int(s)
+        if r.bit_length() <= SIGNATURE_INT_SIZE * 8 and s.bit_length() <= SIGNATURE_INT_SIZE * 8:
+            out.append(SIGNATURE_RS)
+            out += r.to_bytes(SIGNATURE_INT_SIZE, "big")
+            out += s.to_bytes(SIGNATURE_INT_SIZE, "big")
+            return
+    out.append(SIGNATURE_BYTES)
+    _encode_varint(len(signature), out)
+    out += signature
+
+
+def _decode_signature(data: bytes, offset: int):
+    tag = _read_tag(data, offset)
+    offset += 1
+    if tag == SIGNATURE_RS:
+        middle = offset + SIGNATURE_INT_SIZE
+        end = middle + SIGNATURE_INT_SIZE
+        if end > len(data):
+            raise CodecError("truncated data")
+        r = int.from_bytes(data[offset:middle], "big")
+        s = int.from_bytes(data[middle:end], "big")
+        return b"%d:%d" % (r, s), end
+    if tag == SIGNATURE_NONE:
+        return None, offset
+    if tag == SIGNATURE_BYTES:
+        length, offset = _decode_varint(data, offset)
+        return _read(data, offset, length)
+    raise CodecError(f"unknown signature tag {tag}")
+
+
+def _encode_transaction_body(transaction, out: bytearray):
+    _encode_string(transaction.sender, out)
+    _encode_string(transaction.recipient, out)
+    _encode_number(transaction.amount, out)
+    _encode_number(transaction.fee, out)
+    if type(transaction.nonce) is not int:
+        raise CodecError("nonce must be int")
+    _encode_varint(transaction.nonce, out)
+    _encode_signature(transaction.signature, out)
+
+
+def _decode_transaction_body(data: bytes, offset: int) -> Tuple[dict, int]:
+    if (
+        offset + KEYS_PAIR.size <= len(data)
+        and data[offset] == STRING_KEY
+        and data[offset + 1 + KEY_SIZE] == STRING_KEY
+    ):
+        # Usual transaction: sender and recipient are wallet addresses, one unpack for both
+        _, sender, _, recipient = KEYS_PAIR.unpack_from(data, offset)
+        sender = sys.intern(sender.hex())
+        recipient = sys.intern(recipient.hex())
+        offset += KEYS_PAIR.size
+    else:
+        sender, offset = _decode_string(data, offset)
+        recipient, offset = _decode_string(data, offset)
+    amount, offset = _decode_number(data, offset)
+    fee, offset = _decode_number(data, offset)
+    nonce, offset = _decode_varint(data, offset)
+    signature, offset = _decode_signature(data, offset)
+    transaction = {
+        "sender": sender,
+        "recipient": recipient,
+        "amount": amount,
+        "fee": fee,
+        "nonce": nonce,
+        "signature": signature,
+    }
+    return transaction, offset
+
+
+def _check_header(data: bytes, magic: bytes) -> int:
+    if data[: len(magic)] != magic:
+        raise CodecError("invalid magic")
+    version = data[len(magic)] if len(data) > len(magic) else None
+    if version != VERSION:
+        raise CodecError(f"unsupported version {version}")
+    return len(magic) + 1
+
+
+def is_binary_block(data: bytes) -> bool:
+    return data[: len(BLOCK_MAGIC)] == BLOCK_MAGIC
+
+
+def is_binary_transaction(data: bytes) -> bool:
+    return data[: len(TRANSACTION_MAGIC)] == TRANSACTION_MAGIC
+
+
+def encode_transaction(transaction) -> bytes:
+    """
+    :param transaction: Transaction object
+    :raise CodecError: when a field can't be encoded
+    """
+    out = bytearray(TRANSACTION_MAGIC)
+    out.append(VERSION)
+    _encode_transaction_body(transaction, out)
+    return bytes(out)
+
+
+def decode_transaction(data: bytes) -> dict:
+    """
+    :return: transaction fields (signature as bytes)
+    :raise CodecError: when the data is invalid
+    """
+    offset = _check_header(data, TRANSACTION_MAGIC)
+    transaction, offset = _decode_transaction_body(data, offset)
+    if offset != len(data):
+        raise CodecError("unexpected trailing data")
+    return transaction
+
+
+def transaction_size(transaction) -> int:
+    """
+    :return: bytes the transaction takes inside an encoded block
+    :raise CodecError: when a field can't be encoded
+    """
+    out = bytearray()
+    _encode_transaction_body(transaction, out)
+    return len(out)
+
+
+def _encode_block_header(block, out: bytearray):
+    out += BLOCK_MAGIC
+    out.append(VERSION)
+    if type(block.index) is not int:
+        raise CodecError("index must be int")
+    _encode_varint(block.index, out)
+    _encode_number(block.timestamp, out)
+    _encode_string(block.previous_hash, out)
+    _encode_string(block.forger, out)
+    _encode_signature(block.signature, out)
+
+
+def block_header_size(block) -> int:
+    """
+    :return: bytes of the encoded block without its transactions
+        (unsigned block is counted as signed, transactions count as 3 bytes varint)
+    :raise CodecError: when a field can't be encoded
+    """
+    out = bytearray()
+    _encode_block_header(block, out)
+    if block.signature is None:
+        return len(out) + SIGNATURE_INT_SIZE * 2 + 3
+    return len(out) + 3
+
+
+def encode_block(block) -> bytes:
+    """
+    :param block: Block object
+    :raise CodecError: when a field can't be encoded
+    """
+    out = bytearray()
+    _encode_block_header(block, out)
+    _encode_varint(len(block.transactions), out)
+    for transaction in block.transactions:
+        _encode_transaction_body(transaction, out)
+    return bytes(out)
+
+
+def decode_block(data: bytes) -> dict:
+    """
+    :return: block fields (signature as bytes, transactions as list of transaction fields)
+    :raise CodecError: when the data is invalid
+    """
+    offset = _check_header(data, BLOCK_MAGIC)
+    index, offset = _decode_varint(data, offset)
+    timestamp, offset = _decode_number(data, offset)
+    previous_hash, offset = _decode_string(data, offset)
+    forger, offset = _decode_string(data, offset)
+    signature, offset = _decode_signature(data, offset)
+    transactions_count, offset = _decode_varint(data, offset)
+    transactions = []
+    for _ in range(transactions_count):
+        transaction, offset = _decode_transaction_body(data, offset)
+        transactions.append(transaction)
+    if offset != len(data):
+        raise CodecError("unexpected trailing data")
+    return {
+        "index": index,
+        "timestamp": timestamp,
+        "previous_hash": previous_hash,
+        "forger": forger,
+        "signature": signature,
+        "transactions": transactions,
+    }
+
+
+def encode_chunk(blocks_data: List[bytes], compress: bool = True) -> bytes:
+    """
+    :param blocks_data: encoded blocks (the block format isn't checked)
+    :param compress: zlib compress the blocks
+    """
+    payload = bytearray()
+    _encode_varint(len(blocks_data), payload)
+    for block_data in blocks_data:
+        _encode_varint(len(block_data), payload)
+        payload += block_data
+    out = bytearray(CHUNK_MAGIC)
+    out.append(VERSION)
+    if compress:
+        out.append(CHUNK_ZLIB)
+        out += zlib.compress(payload)
+    else:
+        out.append(CHUNK_RAW)
+        out += payload
+    return bytes(out)
+
+
+def max_chunk_payload_size() -> int:
+    """
+    :return: blocks part size limit of a chunk: the chunk blocks take up to SYNC_CHUNK_MAX_BYTES
+        (a bigger block is sent in a chunk of its own, up to MAX_BLOCK_BYTES) and the blocks
+        count and lengths varints
+    """
+    blocks_size = max(Config.SYNC_CHUNK_MAX_BYTES, Config.MAX_BLOCK_BYTES)
+    return blocks_size + (Config.SYNC_CHUNK_BLOCKS + 1) * VARINT_MAX_SIZE
+
+
+def decode_chunk(data: bytes, max_size: int = None) -> List[bytes]:
+    """
+    :param max_size: blocks part size limit after decompression (see max_chunk_payload_size)
+    :return: the encoded blocks of the chunk
+    :raise CodecError: when the data is invalid or larger than max_size
+    """
+    if max_size is None:
+        max_size = max_chunk_payload_size()
+    offset = _check_header(data, CHUNK_MAGIC)
+    compression, offset = _read(data, offset, 1)
+    payload = data[offset:]
+    if compression[0] == CHUNK_ZLIB:
+        # Bounded decompression, a small chunk must not expand to unlimited memory
+        decompressor = zlib.decompressobj()
+        try:
+            payload = decompressor.decompress(payload, max_size)
+        except zlib.error as error:
+            raise CodecError(f"invalid compressed chunk: {error}")
+        if decompressor.unconsumed_tail:
+            raise CodecError(f"chunk is larger than {max_size} bytes")
+        if not decompressor.eof:
+            raise CodecError("truncated compressed chunk")
+        if decompressor.unused_data:
+            raise CodecError("unexpected trailing data")
+    elif compression[0] != CHUNK_RAW:
+        raise CodecError(f"unknown chunk compression {compression[0]}")
+    elif len(payload) > max_size:
+        raise CodecError(f"chunk is larger than {max_size} bytes")
+    count, offset = _decode_varint(payload, 0)
+    if count > Config.SYNC_CHUNK_BLOCKS:
+        raise CodecError(f"chunk has more than {Config.SYNC_CHUNK_BLOCKS} blocks")
+    blocks_data = []
+    for _ in range(count):
+        length, offset = _decode_varint(payload, offset)
+        if length > Config.MAX_BLOCK_BYTES:
+            raise CodecError(f"chunk block is larger than {Config.MAX_BLOCK_BYTES} bytes")
+        block_data, offset = _read(payload, offset, length)
+        blocks_data.append(block_data)
+    if offset != len(payload):
+        raise CodecError("unexpected trailing data")
+    return blocks_data
@@ -1,2 +1,2 @@
 from .sum_tree import SumTree
-from .lottery import wallet_score
+from .lottery import wallet_score, power_weight, WEIGHT_SCALE
@@ -1,7 +1,19 @@
 from bisect import bisect_left
+from typing import List
 
 from .sum_tree import SumTree
-from ..remote_wallet import RemoteWallet
+
+
+# Sum tree leafs are integer weights so the prefix sums are exact: the same on every node
+# whatever order the leafs were updated in (incremental updates or a snapshot rebuild)
+WEIGHT_SCALE = 10 ** 9
+
+
+def power_weight(balance, last_transaction: int) -> int:
+    """
+    :return: the wallet power (balance / (last_transaction + 1)) as integer sum tree weight
+    """
+    return int(balance * WEIGHT_SCALE) // (last_transaction + 1)
 
 
 def binary_search(array, element):
@@ -12,15 +24,17 @@ def binary_search(array, element):
         return -1
 
 
-def find_lottery_winner(root: SumTree, lottery_number: float) -> int:
+def find_lottery_winner(
+    root: SumTree, lottery_number: float
+) -> int:
     """
     Find lottery winner index
 
-    :param root: the root node of the sum tree
+    :param root: the wallets sum tree
     :param lottery_number: float number in range of 0 to 1
-    :return: winner wallet index
+    :return: winner wallet index (sum tree index)
     """
-    search_number = lottery_number * root.sum
+    search_number = int(lottery_number * root.sum)
     winner = root.search(search_number)
     return winner
 
@@ -36,11 +50,17 @@ def wallet_distance(winner_index: int, wallet_index: int, wallets_count: int):
 
 def wallet_score(
     root: SumTree,
-    wallet: RemoteWallet,
+    wallet_address: str,
     lottery_number: float,
-    wallets_sorted_by_address: list,
-):
-    wallets_count = len(wallets_sorted_by_address)
-    winner_index = find_lottery_winner(root, lottery_number)
-    wallet_index = binary_search(wallets_sorted_by_address, wallet)
+    sorted_addresses: List[str],
+    addresses_by_index: List[str],
+) -> float:
+    """
+    :param sorted_addresses: all the wallets addresses sorted
+    :param addresses_by_index: all the wallets addresses by sum tree index
+    """
+    wallets_count = len(sorted_addresses)
+    winner_address = addresses_by_index[find_lottery_winner(root, lottery_number)]
+    winner_index = binary_search(sorted_addresses, winner_address)
+    wallet_index = binary_search(sorted_addresses, wallet_address)
     return wallet_distance(winner_index, wallet_index, wallets_count)
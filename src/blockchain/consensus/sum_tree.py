@@ -1,40 +1,110 @@
+from typing import Iterable, List
+
+
 class SumTree:
-    def __init__(self, left=None, right=None, value=None, data=None):
-        self._left = left
-        self._right = right
-
-        self._value = value
-        self._data = data
-        if left:
-            self.sum = self._left.sum + self._right.sum
-        else:
-            self.sum = self._value
-
-    def search(self, value: int, offset: int = 0):
-        if self._value:
-            return self._data
-        if self._left.sum + offset > value:
-            return self._left.search(value, offset=offset)
-        return self._right.search(value, offset=offset + self._left.sum)
+    """
+    Array backed sum tree (Fenwick tree) over wallet weights.
+    The leafs are integers (see lottery.power_weight), so every prefix sum is exact and
+    doesn't depend on the updates order.
 
-    @classmethod
-    def _build_tree(cls, arr: list):
-        n_arr = []
-        for i in range(0, len(arr), 2):
-            if i + 1 < len(arr):
-                n_arr.append(cls(left=arr[i], right=arr[i + 1]))
-            else:
-                n_arr.append(cls(left=arr[i], right=cls(value=0)))
-        if len(n_arr) > 1:
-            return cls._build_tree(n_arr)
-        else:
-            return n_arr[0]
+    Every wallet owns a stable index (the order it was added to the tree),
+    so when a block changes the power of a few wallets only those leafs are
+    updated instead of rebuilding the whole tree.
+
+    update(index, value) -> O(log n)
+    append(value)        -> O(log n)
+    search(value)        -> O(log n)
+    """
+
+    def __init__(self):
+        self._values: List[int] = []  # leaf values, by wallet index
+        self._tree: List[int] = [0]  # 1-based fenwick array
+        self.sum = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def values(self) -> List[int]:
+        return self._values
+
+    def _add(self, index: int, delta: int):
+        position = index + 1
+        size = len(self._tree)
+        while position < size:
+            self._tree[position] += delta
+            position += position & -position
+        self.sum += delta
+
+    def append(self, value: int) -> int:
+        """
+        Add new leaf at the end of the tree
+        :param value: leaf value
+        :return: the leaf index
+        """
+        index = len(self._values)
+        position = index + 1
+        # The new node covers the range (position - lowbit, position]
+        node_sum = value
+        child = 1
+        while child < position & -position:
+            node_sum += self._tree[position - child]
+            child <<= 1
+        self._values.append(value)
+        self._tree.append(node_sum)
+        self.sum += value
+        return index
+
+    def update(self, index: int, value: int):
+        """
+        Set leaf value
+        :param index: leaf index
+        :param value: new leaf value
+        """
+        delta = value - self._values[index]
+        if delta == 0:
+            return
+        self._values[index] = value
+        self._add(index, delta)
+
+    def search(self, value: int) -> int:
+        """
+        Find the first leaf that its prefix sum is bigger then value
+        (leafs with value 0 are never returned)
+        :param value: number in range of 0 to sum
+        :return: leaf index
+        """
+        position = 0
+        remaining = value
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= remaining:
+                position = next_position
+                remaining -= self._tree[position]
+            step >>= 1
+        return min(position, len(self._values) - 1)
+
+    def copy(self):
+        tree = self.__class__()
+        tree._values = self._values[:]
+        tree._tree = self._tree[:]
+        tree.sum = self.sum
+        return tree
 
     @classmethod
-    def from_dict(cls, k_v_data: dict):
+    def from_values(cls, values: Iterable[int]):
         """
-        value: value that is sumed
-        data:  data returned on search
+        Build tree in O(n)
+        :param values: leafs values ordered by index
         """
-        arr = [cls(value=v, data=d) for v, d in k_v_data.items()]
-        return cls._build_tree(arr)
+        tree = cls()
+        tree._values = list(values)
+        tree._tree = [0] + tree._values[:]
+        size = len(tree._tree)
+        for position in range(1, size):
+            parent = position + (position & -position)
+            if parent < size:
+                tree._tree[parent] += tree._tree[position]
+        tree.sum = sum(tree._values)
+        return tree
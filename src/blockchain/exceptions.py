@@ -9,6 +9,9 @@ __all__ = [
     "WalletLotteryFreezeError",
     "GenesisIsNotValidError",
     "NonSequentialBlockIndexError",
+    "BlockTooLargeError",
+    "MempoolFullError",
+    "ReplacementFeeTooLowError",
 ]
 
 
@@ -42,3 +45,15 @@ class GenesisIsNotValidError(ValidationError):
 
 class NonSequentialBlockIndexError(ValidationError):
     pass
+
+
+class BlockTooLargeError(ValidationError):
+    pass
+
+
+class MempoolFullError(ValidationError):
+    pass
+
+
+class ReplacementFeeTooLowError(ValidationError):
+    pass
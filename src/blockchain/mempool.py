@@ -0,0 +1,251 @@
+"""
+Pending transactions pool
+
+transactions: transaction hash -> transaction
+sizes:        transaction hash -> bytes it takes in an encoded block
+senders:      sender address -> SenderQueue (the sender transactions ordered by nonce)
+fee heap:     min heap of (fee, sequence, hash) over all the transactions, for evicting
+              the lowest fee transaction when the pool is full
+
+Removed transactions are not searched in the heaps / nonce lists, they are dropped
+lazily when they are reached (or when the stale entries outnumber the live ones).
+"""
+import heapq
+from bisect import bisect_left
+from threading import RLock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+from .transaction import Transaction
+from .exceptions import ValidationError, MempoolFullError, ReplacementFeeTooLowError
+
+__all__ = ["Mempool", "SenderQueue"]
+
+
+class SenderQueue:
+    """
+    Pending transactions of one sender ordered by nonce (one transaction per nonce)
+    """
+
+    __slots__ = ("transactions", "nonces")
+
+    def __init__(self):
+        self.transactions: Dict[int, Transaction] = {}  # nonce: transaction
+        self.nonces: List[int] = []  # sorted, may contain removed nonces
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for nonce in self.nonces:
+            transaction = self.transactions.get(nonce, None)
+            if transaction is not None:
+                yield transaction
+
+    def get(self, nonce: int) -> Optional[Transaction]:
+        return self.transactions.get(nonce, None)
+
+    def add(self, transaction: Transaction):
+        nonce = transaction.nonce
+        # New nonces are usually the biggest (append), removed nonces may still be listed
+        position = bisect_left(self.nonces, nonce)
+        if position == len(self.nonces) or self.nonces[position] != nonce:
+            self.nonces.insert(position, nonce)
+        self.transactions[nonce] = transaction
+
+    def remove(self, nonce: int) -> Optional[Transaction]:
+        transaction = self.transactions.pop(nonce, None)
+        if len(self.nonces) > 2 * len(self.transactions) + 8:
+            self.nonces = [nonce for nonce in self.nonces if nonce in self.transactions]
+        return transaction
+
+
+class Mempool:
+    def __init__(self, capacity: int = None):
+        """
+        :param capacity: max pending transactions (default Config.MEMPOOL_CAPACITY)
+        """
+        self.capacity = Config.MEMPOOL_CAPACITY if capacity is None else capacity
+        self.transactions: Dict[str, Transaction] = {}  # transaction hash: transaction
+        self.sizes: Dict[str, int] = {}  # transaction hash: encoded size
+        self.senders: Dict[str, SenderQueue] = {}
+
+        self._fee_heap: List[Tuple[float, int, str]] = []  # (fee, sequence, hash)
+        self._sequences: Dict[str, int] = {}  # transaction hash: sequence of its live heap entry
+        self._next_sequence = 0
+        self.evicted = 0
+        self.replaced = 0
+        self.invalidated = 0
+
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self.transactions
+
+    def get(self, transaction_hash: str) -> Optional[Transaction]:
+        return self.transactions.get(transaction_hash, None)
+
+    def add(self, transaction: Transaction) -> bool:
+        """
+        Add validated transaction to the pool
+        :raise ReplacementFeeTooLowError: the sender has pending transaction with the same nonce
+            and a higher or equal fee
+        :raise MempoolFullError: the pool is full and the transaction fee is the lowest
+        :return: False if the transaction is already in the pool
+        """
+        transaction_hash = transaction.hash()
+        with self._lock:
+            if transaction_hash in self.transactions:
+                return False
+            queue = self.senders.get(transaction.sender, None)
+            replaced = queue.get(transaction.nonce) if queue is not None else None
+            if replaced is not None:
+                if transaction.fee <= replaced.fee:
+                    raise ReplacementFeeTooLowError(
+                        f"pending transaction with nonce {transaction.nonce} has fee {replaced.fee}"
+                    )
+                self._remove(replaced)
+                self.replaced += 1
+            elif len(self.transactions) >= self.capacity:
+                lowest = self._lowest_fee_transaction()
+                if lowest is None or transaction.fee <= lowest.fee:
+                    raise MempoolFullError("transaction fee is too low to enter the full pool")
+                self._remove(lowest)
+                self.evicted += 1
+
+            queue = self.senders.get(transaction.sender, None)  # removed if it became empty
+            if queue is None:
+                queue = self.senders[transaction.sender] = SenderQueue()
+            queue.add(transaction)
+            self.transactions[transaction_hash] = transaction
+            self.sizes[transaction_hash] = transaction.size()
+            self._push_fee_entry(transaction_hash, transaction.fee)
+            return True
+
+    def _push_fee_entry(self, transaction_hash: str, fee: float):
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self._sequences[transaction_hash] = sequence
+        heapq.heappush(self._fee_heap, (fee, sequence, transaction_hash))
+        if len(self._fee_heap) > 2 * len(self.transactions) + 8:
+            self._fee_heap = [
+                entry for entry in self._fee_heap if self._sequences.get(entry[2]) == entry[1]
+            ]
+            heapq.heapify(self._fee_heap)
+
+    def _lowest_fee_transaction(self) -> Optional[Transaction]:
+        while self._fee_heap:
+            fee, sequence, transaction_hash = self._fee_heap[0]
+            if self._sequences.get(transaction_hash) == sequence:
+                return self.transactions[transaction_hash]
+            heapq.heappop(self._fee_heap)  # stale entry of removed transaction
+        return None
+
+    def _remove(self, transaction: Transaction):
+        transaction_hash = transaction.hash()
+        del self.transactions[transaction_hash]
+        del self.sizes[transaction_hash]
+        del self._sequences[transaction_hash]  # the heap entry become stale
+        queue = self.senders[transaction.sender]
+        queue.remove(transaction.nonce)
+        if not queue:
+            del self.senders[transaction.sender]
+
+    def remove(self, transaction_hash: str) -> Optional[Transaction]:
+        with self._lock:
+            transaction = self.transactions.get(transaction_hash, None)
+            if transaction is not None:
+                self._remove(transaction)
+            return transaction
+
+    def remove_included(self, transactions: Iterable[Transaction]):
+        """
+        Remove the transactions of a new block, and pending transactions that use
+        the same sender nonce (they can't be included anymore)
+        """
+        with self._lock:
+            for transaction in transactions:
+                queue = self.senders.get(transaction.sender, None)
+                pending = queue.get(transaction.nonce) if queue is not None else None
+                if pending is not None:
+                    self._remove(pending)
+
+    def revalidate_senders(
+        self, senders: Iterable[str], validate: Callable[[Transaction], None]
+    ) -> List[Transaction]:
+        """
+        Re-check the pending transactions of the given senders only (the senders that their
+        nonce / balance changed by a new block), and remove the ones that became invalid
+        :param senders: senders addresses
+        :param validate: raise ValidationError for invalid transaction
+        :return: the removed transactions
+        """
+        removed = []
+        with self._lock:
+            for sender in senders:
+                queue = self.senders.get(sender, None)
+                if queue is None:
+                    continue
+                invalid = []
+                for transaction in queue:
+                    try:
+                        validate(transaction)
+                    except ValidationError:
+                        invalid.append(transaction)
+                for transaction in invalid:
+                    self._remove(transaction)
+                removed.extend(invalid)
+            self.invalidated += len(removed)
+        return removed
+
+    def _head_entry(self, transaction: Transaction, transactions: Iterator[Transaction]):
+        transaction_hash = transaction.hash()
+        fee_per_byte = transaction.fee / self.sizes[transaction_hash]
+        return -fee_per_byte, transaction_hash, transaction, transactions
+
+    def select(self, max_transactions: int = None, max_bytes: int = None) -> List[Transaction]:
+        """
+        Build the transactions of the next block template (greedy, highest fee per byte first).
+        Transactions of the same sender are picked in nonce order, so only the lowest nonce
+        pending transaction of every sender competes at a time (heap of senders heads).
+        Transaction that doesn't fit in the remaining bytes is skipped with the rest of its
+        sender transactions, smaller transactions of other senders may still fit.
+        :param max_transactions: max transactions to pick (None for no limit)
+        :param max_bytes: max encoded bytes of the picked transactions (None for no limit)
+        :return: transactions in the order they should be added to the block
+        """
+        with self._lock:
+            heads = []
+            for queue in self.senders.values():
+                transactions = iter(queue)
+                heads.append(self._head_entry(next(transactions), transactions))
+            heapq.heapify(heads)
+
+            selected = []
+            selected_bytes = 0
+            while heads and (max_transactions is None or len(selected) < max_transactions):
+                _, transaction_hash, transaction, transactions = heapq.heappop(heads)
+                size = self.sizes[transaction_hash]
+                if max_bytes is not None and selected_bytes + size > max_bytes:
+                    continue
+                selected.append(transaction)
+                selected_bytes += size
+                next_transaction = next(transactions, None)
+                if next_transaction is not None:
+                    heapq.heappush(heads, self._head_entry(next_transaction, transactions))
+            return selected
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self.transactions),
+                "capacity": self.capacity,
+                "senders": len(self.senders),
+                "evicted": self.evicted,
+                "replaced": self.replaced,
+                "invalidated": self.invalidated,
+            }
@@ -1,39 +1,49 @@
-from config import Config
+class RemoteWallet:
+    """
+    View of one wallet row of the wallet ledger (see wallet_ledger.py),
+    reading / setting a field reads / sets the ledger column.
+    """
 
+    __slots__ = ("ledger", "row")
 
-class RemoteWallet:
-    def __init__(
-        self,
-        public_address: str,
-        balance: float,
-        last_transaction: int,
-        nonce_counter: int,
-    ):
-        self.address = public_address
-        self.balance = balance
-        self.last_transaction = last_transaction
-        self.nonce_counter = nonce_counter
+    def __init__(self, ledger, row: int):
+        self.ledger = ledger
+        self.row = row
+
+    @property
+    def address(self) -> str:
+        return self.ledger.addresses[self.row]
+
+    @property
+    def balance(self) -> float:
+        return self.ledger.balance[self.row]
+
+    @balance.setter
+    def balance(self, balance: float):
+        self.ledger.balance[self.row] = balance
+
+    @property
+    def last_transaction(self) -> int:
+        return self.ledger.last_transaction[self.row]
+
+    @last_transaction.setter
+    def last_transaction(self, last_transaction: int):
+        self.ledger.last_transaction[self.row] = last_transaction
+
+    @property
+    def nonce_counter(self) -> int:
+        return self.ledger.nonce[self.row]
+
+    @nonce_counter.setter
+    def nonce_counter(self, nonce_counter: int):
+        self.ledger.nonce[self.row] = nonce_counter
 
     @property
     def power(self) -> float:
         return self.balance / (self.last_transaction + 1)
 
     def to_dict(self):
-        return {
-            "address": self.address,
-            "balance": self.balance,
-            "last_transaction": self.last_transaction,
-            "nonce": self.nonce_counter,
-        }
-
-    @classmethod
-    def new_empty(cls, wallet_address: str):
-        return cls(
-            public_address=wallet_address,
-            balance=1 if Config.IS_TEST_NET else 0,
-            last_transaction=0,
-            nonce_counter=0,
-        )
+        return self.ledger.row_to_dict(self.row)
 
     def __gt__(self, other) -> bool:
         return self.address > other.address
@@ -0,0 +1,123 @@
+import binascii
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import List, Tuple
+
+import ecdsa
+from ecdsa.curves import curve_by_name
+
+from config import Config
+from wallet import Wallet
+from wallet.wallet import decode_signature
+
+# (public key, signature, hash)
+SignatureItem = Tuple[str, bytes, str]
+
+
+def _verify_chunk(curve_name: str, items: List[SignatureItem]) -> List[bool]:
+    """
+    Runs in the pool processes: plain ecdsa verification, the wallet caches (and their locks)
+    are not used in the workers
+    """
+    curve = curve_by_name(curve_name)
+    verifying_keys = {}
+    results = []
+    for public_address, signature, hash_str in items:
+        try:
+            verifying_key = verifying_keys.get(public_address, None)
+            if verifying_key is None:
+                verifying_key = verifying_keys[public_address] = ecdsa.VerifyingKey.from_string(
+                    binascii.unhexlify(public_address),
+                    curve=curve,
+                    valid_encodings=["compressed", "raw"],
+                )
+            verifying_key.verify_digest(
+                signature, bytes.fromhex(hash_str), sigdecode=decode_signature
+            )
+        except ecdsa.BadSignatureError:
+            results.append(False)
+        else:
+            results.append(True)
+    return results
+
+
+class SignatureVerifier:
+    """
+    Verify batches of signatures (block transactions, synced chains) on a process pool.
+    Signature verification is CPU bound and holds the GIL, so threads don't help.
+    Only the signatures are checked here, stateful checks (balance, nonce) stay sequential.
+    """
+
+    def __init__(self, workers: int = None, min_batch: int = None):
+        """
+        :param workers: pool processes (default Config.SIGNATURE_VERIFY_WORKERS, 0 to disable)
+        :param min_batch: smaller batches are verified in the calling thread
+            (default Config.PARALLEL_VERIFY_MIN_SIGNATURES)
+        """
+        self._workers = workers
+        self._min_batch = min_batch
+        self._pool: ProcessPoolExecutor = None
+        self._pool_lock = Lock()
+
+    @property
+    def workers(self) -> int:
+        if self._workers is None:
+            return Config.SIGNATURE_VERIFY_WORKERS
+        return self._workers
+
+    @property
+    def min_batch(self) -> int:
+        if self._min_batch is None:
+            return Config.PARALLEL_VERIFY_MIN_SIGNATURES
+        return self._min_batch
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # The node runs threads that hold locks, forked workers could inherit a held
+                # lock, so the workers are started fresh
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def verify_many(self, items: List[SignatureItem]) -> List[bool]:
+        """
+        :param items: list of (public key, signature, hash)
+        :return: verification result of every item (ordered as items)
+        """
+        if self.workers <= 1 or len(items) < self.min_batch:
+            return [Wallet.verify_signature(*item) for item in items]
+
+        results = [True] * len(items)
+        pending = [
+            index
+            for index, item in enumerate(items)
+            if not Wallet.signature_cache.contains(*item)
+        ]
+        if not pending:
+            return results
+
+        chunk_size = max(1, len(pending) // (self.workers * 4))
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        chunks_results = self._get_pool().map(
+            _verify_chunk,
+            [Config.ECDSA_CURVE.name] * len(chunks),
+            [[items[index] for index in chunk] for chunk in chunks],
+        )
+        for chunk, chunk_results in zip(chunks, chunks_results):
+            for index, is_verified in zip(chunk, chunk_results):
+                results[index] = is_verified
+                if is_verified:  # The workers caches are not shared with this process
+                    Wallet.signature_cache.add(*items[index])
+        return results
+
+    def verify_all(self, items: List[SignatureItem]) -> bool:
+        return all(self.verify_many(items))
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -0,0 +1,62 @@
+from typing import Iterable, Iterator, List, Union
+
+from storage import BlockStore
+
+from .block import Block
+
+
+class StoredChain:
+    """
+    List like view of the chain blocks that are stored on disk.
+    Blocks are read from the store on access (seek), so the chain isn't held in memory.
+    """
+
+    def __init__(self, store: BlockStore):
+        self.store = store
+
+    @staticmethod
+    def encode_block(block: Block) -> bytes:
+        return block.to_bytes()
+
+    @staticmethod
+    def decode_block(data: bytes) -> Block:
+        return Block.from_bytes(data)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Block, List[Block]]:
+        if isinstance(item, slice):
+            return [self[index] for index in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("block index out of range")
+        return self.decode_block(self.store.read(item))
+
+    def __iter__(self) -> Iterator[Block]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[Block]:
+        for data in self.store.read_range(start, len(self)):
+            yield self.decode_block(data)
+
+    def iter_data_from(self, start: int) -> Iterator[bytes]:
+        """
+        Encoded blocks as they are stored (no decoding / encoding)
+        """
+        return self.store.read_range(start, len(self))
+
+    def append(self, block: Block):
+        self.store.append(block.hash(), self.encode_block(block))
+
+    def extend(self, blocks: Iterable[Block]):
+        for block in blocks:
+            self.append(block)
+
+    def index_of(self, block_hash: str) -> int:
+        index = self.store.index_of(block_hash)
+        return -1 if index is None else index
+
+    def truncate(self, length: int):
+        self.store.truncate(length)
@@ -1,23 +1,64 @@
+import json
+import math
 import hashlib
 from base64 import b64encode, b64decode
 
 from config import Config
 from wallet import Wallet
+from .codec import (
+    CodecError,
+    encode_transaction,
+    decode_transaction,
+    is_binary_transaction,
+    transaction_size,
+)
 from .exceptions import ValidationError, InsufficientBalanceError, DuplicateNonceError
 
 
+def _is_finite(value) -> bool:
+    """
+    :return: True if the value is a finite float / int in the float range (the wallets power
+        is a float)
+    """
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
 class Transaction:
+    # Every block transaction is kept in memory, so no per instance __dict__
+    __slots__ = (
+        "sender",
+        "recipient",
+        "amount",
+        "fee",
+        "nonce",
+        "signature",
+        "_hash_cache",
+    )
+    # Changing one of those fields invalidates the cached hash
+    HASHED_FIELDS = frozenset(("sender", "recipient", "amount", "fee", "nonce"))
+
     def __init__(
         self, sender, recipient, amount, nonce: int, fee=None, signature=None, **kwargs
     ):
         if fee is None:
             fee = 1
-        self.sender = sender
-        self.recipient = recipient
-        self.amount = amount
-        self.fee = fee
-        self.nonce = nonce
-        self.signature = signature
+        # New object, no cached hash to invalidate on every field (see __setattr__)
+        set_field = object.__setattr__
+        set_field(self, "sender", sender)
+        set_field(self, "recipient", recipient)
+        set_field(self, "amount", amount)
+        set_field(self, "fee", fee)
+        set_field(self, "nonce", nonce)
+        set_field(self, "signature", signature)
+        set_field(self, "_hash_cache", None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.HASHED_FIELDS:
+            super().__setattr__("_hash_cache", None)
 
     def to_dict(self):
         return {
@@ -32,7 +73,7 @@ class Transaction:
     def is_signature_verified(self):
         return Wallet.verify_signature(self.sender, self.signature, self.hash())
 
-    def validate(self, blockchain_state):
+    def validate(self, blockchain_state, check_signature: bool = True):
         """
         Check validation of transaction
         1. check sender key (is valid ECDSA key)
@@ -41,6 +82,7 @@ class Transaction:
         4. check fee is integer > 0
         5. check nonce is used only once
         6. check sender signature
+        :param check_signature: False when the signature is already verified (batch verification)
         :raises ValidationError
         :return: None
         """
@@ -52,24 +94,62 @@ class Transaction:
                 raise InsufficientBalanceError()
         if sender_wallet is not None and sender_wallet.nonce_counter >= self.nonce:
             raise DuplicateNonceError("Wallet nonce is grater then transaction nonce")
-        if type(self.amount) not in (int, float) or self.amount <= 0:
+        if type(self.amount) not in (int, float) or not self.amount > 0:
             raise ValidationError("amount must be number grater then 0")
-        if type(self.fee) not in (int, float) or self.fee <= 0:
+        if type(self.fee) not in (int, float) or not self.fee > 0:
             raise ValidationError("fee must be number grater then 0")
-        if not self.is_signature_verified():
+        if not _is_finite(self.amount + self.fee):
+            raise ValidationError("amount is out of range")
+        if check_signature and not self.is_signature_verified():
             raise ValidationError("transaction signature is not valid")
 
     def _raw_transaction(self):
         return f"{self.sender}:{self.recipient}:{self.amount}:{self.fee}:{self.nonce}"
 
-    def hash(self):
+    def _calculate_hash(self):
         transaction_string = self._raw_transaction().encode()
         return hashlib.sha256(transaction_string).hexdigest()
 
+    def hash(self):
+        """
+        :return: the transaction hash (cached until one of the hashed fields is changed)
+        """
+        if self._hash_cache is None:
+            self._hash_cache = self._calculate_hash()
+        return self._hash_cache
+
     @property
     def base64_signature(self):
         return b64encode(self.signature).decode()
 
+    def to_bytes(self) -> bytes:
+        """
+        Serialize transaction to the binary format (see codec.py), JSON if it can't be encoded
+        """
+        try:
+            return encode_transaction(self)
+        except CodecError:
+            return json.dumps(self.to_dict()).encode()
+
+    def size(self) -> int:
+        """
+        :return: bytes the transaction takes in an encoded block
+        """
+        try:
+            return transaction_size(self)
+        except CodecError:
+            return len(json.dumps(self.to_dict()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """
+        Parse transaction from the binary format or from JSON (old payloads)
+        :raise CodecError / ValueError: when data is invalid
+        """
+        if not is_binary_transaction(data):
+            return cls.from_dict(**json.loads(data))
+        return cls(**decode_transaction(data))
+
     @classmethod
     def from_dict(cls, sender, recipient, signature, **kwargs):
         signature = b64decode(signature.encode())
@@ -0,0 +1,136 @@
+"""
+Columnar storage of the chain wallets
+
+Every wallet is a row (the order it was first seen, same as its sum tree index),
+the wallet fields are stored in parallel columns instead of one object per wallet:
+    addresses[row], balance[row], nonce[row], last_transaction[row], power[row]
+balance and nonce are lists of python numbers (exact like the transactions amounts, no
+rounding or overflow), last_transaction (block index) and power are typed arrays.
+The addresses are also kept sorted (bisect insertion) for the lottery distance.
+"""
+from array import array
+from bisect import insort
+from operator import add, truediv
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, the powers are calculated with array / map
+    numpy = None
+
+from .remote_wallet import RemoteWallet
+
+__all__ = ["WalletLedger"]
+
+
+class WalletLedger:
+    def __init__(self):
+        self.addresses: List[str] = []  # by row
+        self.rows: Dict[str, int] = {}  # address: row
+        self.sorted_addresses: List[str] = []
+
+        self.balance: List[float] = []
+        self.nonce: List[int] = []
+        self.last_transaction = array("q")
+        self.power = array("d")  # balance / (last_transaction + 1)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.rows
+
+    def __getitem__(self, address: str) -> RemoteWallet:
+        return RemoteWallet(self, self.rows[address])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.addresses)
+
+    def get(self, address: str, default=None) -> Optional[RemoteWallet]:
+        row = self.rows.get(address, None)
+        if row is None:
+            return default
+        return RemoteWallet(self, row)
+
+    def values(self) -> Iterator[RemoteWallet]:
+        return (RemoteWallet(self, row) for row in range(len(self)))
+
+    def items(self) -> Iterator[Tuple[str, RemoteWallet]]:
+        return ((address, RemoteWallet(self, row)) for row, address in enumerate(self.addresses))
+
+    def add(self, address: str, balance: float = 0, last_transaction: int = 0, nonce: int = 0) -> int:
+        """
+        Add new wallet row
+        :return: the wallet row
+        """
+        row = len(self.addresses)
+        self.addresses.append(address)
+        self.rows[address] = row
+        insort(self.sorted_addresses, address)  # O(log W) search, memmove of pointers
+        self.balance.append(balance)
+        self.nonce.append(nonce)
+        self.last_transaction.append(last_transaction)
+        self.power.append(balance / (last_transaction + 1))
+        return row
+
+    def sorted_wallets(self, start: int, stop: int) -> List[RemoteWallet]:
+        return [self[address] for address in self.sorted_addresses[start:stop]]
+
+    def update_power(self, row: int) -> float:
+        power = self.balance[row] / (self.last_transaction[row] + 1)
+        self.power[row] = power
+        return power
+
+    def recalculate_powers(self):
+        """
+        Recalculate the power column of all the wallets in one vectorized operation
+        """
+        if numpy is not None:
+            balance = numpy.array(self.balance, dtype=numpy.float64)
+            last_transaction = numpy.frombuffer(self.last_transaction, dtype=numpy.int64)
+            self.power = array("d", (balance / (last_transaction + 1)).tobytes())
+        else:
+            self.power = array(
+                "d", map(truediv, self.balance, map(add, self.last_transaction, repeat(1)))
+            )
+
+    def copy(self):
+        ledger = self.__class__()
+        ledger.addresses = self.addresses[:]
+        ledger.rows = self.rows.copy()
+        ledger.sorted_addresses = self.sorted_addresses[:]
+        ledger.balance = self.balance[:]
+        ledger.nonce = self.nonce[:]
+        ledger.last_transaction = self.last_transaction[:]
+        ledger.power = self.power[:]
+        return ledger
+
+    def row_to_dict(self, row: int) -> dict:
+        return {
+            "address": self.addresses[row],
+            "balance": self.balance[row],
+            "last_transaction": self.last_transaction[row],
+            "nonce": self.nonce[row],
+        }
+
+    def to_list(self) -> List[dict]:
+        """
+        :return: the wallets ordered by row (snapshot format)
+        """
+        return [self.row_to_dict(row) for row in range(len(self))]
+
+    @classmethod
+    def from_list(cls, wallets: List[dict]):
+        """
+        Build ledger from wallets ordered by row (snapshot format)
+        """
+        ledger = cls()
+        ledger.addresses = [wallet["address"] for wallet in wallets]
+        ledger.rows = {address: row for row, address in enumerate(ledger.addresses)}
+        ledger.sorted_addresses = sorted(ledger.addresses)
+        ledger.balance = [wallet["balance"] for wallet in wallets]
+        ledger.nonce = [wallet["nonce"] for wallet in wallets]
+        ledger.last_transaction = array("q", (wallet["last_transaction"] for wallet in wallets))
+        ledger.recalculate_powers()
+        return ledger
@@ -3,7 +3,11 @@ from typing import Tuple
 from loguru import logger
 
 from blockchain import Blockchain, Block
-from blockchain.exceptions import NonSequentialBlockIndexError, NonMatchingHashError
+from blockchain.exceptions import (
+    ValidationError,
+    NonSequentialBlockIndexError,
+    NonMatchingHashError,
+)
 from network import Node, messages
 from wallet import Wallet
 from scheduler import Scheduler
@@ -95,14 +99,26 @@ class GlobalLoopHandler:
         finally:
             self._reset()
 
-    def check_block(self, block: Block):
+    def _is_valid_block(self, block: Block) -> bool:
         try:
             self._blockchain.validate_block(block)
-        except NonSequentialBlockIndexError:
-            if block.index > self._blockchain.length:
+        except ValidationError as error:
+            logger.info(f"Block [{block.index}] rejected: {type(error).__name__} {error}")
+            if isinstance(error, NonMatchingHashError) or (
+                isinstance(error, NonSequentialBlockIndexError)
+                and block.index > self._blockchain.length
+            ):
                 self._invalid_network_state()
-        except NonMatchingHashError:
-            self._invalid_network_state()
+            return False
+        return True
+
+    def check_block(self, block: Block):
+        """
+        Score the candidate block and keep it if it is the best one
+        :return: True if the block is the new best block
+        """
+        if not self._is_valid_block(block):
+            return False
         new_block_score = self._blockchain.get_block_score(block)
         if new_block_score > self.best_block_score:
             self.best_block = block
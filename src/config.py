@@ -1,4 +1,5 @@
 import argparse
+import os
 
 from ecdsa.curves import SECP256k1
 
@@ -14,13 +15,46 @@ class Config:
     IPFS_HOST = "127.0.0.1"
     if ENV_TYPE == "PRODUCTION":
         IPFS_HOST = "ipfs-node"
+    IPFS_POOL_SIZE = 32  # kept alive connections to the IPFS API (topic streams take one each)
+    IPFS_CONNECT_TIMEOUT = 3.05  # in seconds
+    IPFS_READ_TIMEOUT = 30  # in seconds, max wait for IPFS API response
+    IPFS_RETRY_ATTEMPTS = 5  # attempts per IPFS API request (temporary errors are retried)
+    IPFS_RETRY_DEADLINE = 30  # in seconds, no retry is started after it
+    IPFS_BACKOFF_BASE = 0.5  # in seconds, retry delay is random up to base * 2 ^ attempt
+    IPFS_BACKOFF_MAX = 10  # in seconds
+    IPFS_CIRCUIT_FAILURES = 5  # failed attempts in a row that stop requests to the IPFS API
+    IPFS_CIRCUIT_COOLDOWN = 10  # in seconds, until the next request is let through
+    INLINE_PAYLOAD_MAX_BYTES = 1024  # message payloads up to this size are sent inline (no CID)
+    IPFS_ASYNC = False  # asyncio IPFS client (requires aiohttp), all topics on one event loop
 
     IS_TEST_NET = True
     IS_FULL_NODE = True
     ECDSA_CURVE = SECP256k1
+    SIGNATURE_CACHE_SIZE = 100000  # successful signature verifications to remember
+    VERIFYING_KEY_CACHE_SIZE = 10000  # parsed public keys to remember
+    VERIFYING_KEY_PRECOMPUTE_AFTER = 16  # precompute point tables for keys used that many times
+    SIGNATURE_VERIFY_WORKERS = os.cpu_count() or 1  # processes verifying signatures (0 to disable)
+    PARALLEL_VERIFY_MIN_SIGNATURES = 64  # smaller batches are verified in the calling thread
+    CHAIN_VERIFY_WINDOW = 1000  # blocks verified together when adding chain
+    MAX_BLOCK_TRANSACTIONS = 1000
+    MAX_BLOCK_BYTES = 256 * 1024  # encoded block size (see blockchain/codec.py)
+    MEMPOOL_CAPACITY = 10000  # max pending transactions (lowest fee is evicted)
 
     SCHEDULER_STEP_LENGTH = 1.0  # in seconds
 
+    SYNC_CHUNK_BLOCKS = 1000  # max blocks per chain sync chunk (one IPFS object)
+    SYNC_CHUNK_MAX_BYTES = 1000 * 1000  # IPFS blocks bigger then 1MiB are not transferred
+    SYNC_CHUNK_COMPRESSION = True  # zlib compress chain sync chunks
+    SYNC_DOWNLOAD_WORKERS = 8  # chain sync chunks downloaded at the same time
+
+    EVENT_STREAM_TOPIC_CAPACITY = 10000  # max events kept per topic
+    EVENT_STREAM_RETENTION = 60 * 10  # max event age in seconds (None for no limit)
+
+    DATA_DIR = "data"  # blocks store and node data
+    SNAPSHOT_INTERVAL = 1000  # save chain state snapshot every <SNAPSHOT_INTERVAL> blocks
+    SNAPSHOTS_TO_KEEP = 2
+    CID_CACHE_SIZE = 10000  # published data cids to remember (least recently used are removed)
+
 
 def override_config():
     parser = argparse.ArgumentParser(description="Yoyocoin node daemon")
@@ -34,6 +68,27 @@ def override_config():
         "--api-host", type=str, help="Host for the node external api (http)"
     )
     parser.add_argument("--ipfs-port", type=int, help="IPFS daemon port")
+    parser.add_argument(
+        "--ipfs-pool-size", type=int, help="Kept alive connections to the IPFS API"
+    )
+    parser.add_argument(
+        "--ipfs-async",
+        action="store_true",
+        help="Use the asyncio IPFS client (requires aiohttp)",
+    )
+    parser.add_argument("--data-dir", type=str, help="Directory for the node data")
+    parser.add_argument(
+        "--verify-workers", type=int, help="Processes for signature verification (0 to disable)"
+    )
+    parser.add_argument(
+        "--snapshot-interval", type=int, help="Save chain state snapshot every N blocks"
+    )
+    parser.add_argument(
+        "--mempool-capacity", type=int, help="Max pending transactions in the pool"
+    )
+    parser.add_argument(
+        "--sync-workers", type=int, help="Chain sync chunks downloaded at the same time"
+    )
     parser.add_argument(
         "--test-net",
         "-t",
@@ -52,6 +107,20 @@ def override_config():
         Config.API_HOST = args["api_host"]
     if args["ipfs_port"] is not None:
         Config.IPFS_PORT = args["ipfs_port"]
+    if args["ipfs_pool_size"] is not None:
+        Config.IPFS_POOL_SIZE = args["ipfs_pool_size"]
+    if args["ipfs_async"]:
+        Config.IPFS_ASYNC = True
+    if args["data_dir"] is not None:
+        Config.DATA_DIR = args["data_dir"]
+    if args["verify_workers"] is not None:
+        Config.SIGNATURE_VERIFY_WORKERS = args["verify_workers"]
+    if args["snapshot_interval"] is not None:
+        Config.SNAPSHOT_INTERVAL = args["snapshot_interval"]
+    if args["mempool_capacity"] is not None:
+        Config.MEMPOOL_CAPACITY = args["mempool_capacity"]
+    if args["sync_workers"] is not None:
+        Config.SYNC_DOWNLOAD_WORKERS = args["sync_workers"]
     Config.IS_TEST_NET = args.get("test_net", Config.IS_TEST_NET)
     Config.IS_FULL_NODE = not args.get("prune_node")
     Config.EXPOSE_API = args["expose_api"]
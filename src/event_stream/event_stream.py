@@ -1,4 +1,7 @@
-from collections import defaultdict
+from threading import Lock
+from typing import Dict
+
+from config import Config
 
 from .multi_subscribers_queue import MultiSubscribersQueue
 from .event import Event
@@ -16,22 +19,61 @@ class EventStream:
     def __init__(self):
         if self.__class__._instance is not None:
             raise RuntimeError("Singleton can be initialized once! (use get_instance()")
-        self.topics = defaultdict(MultiSubscribersQueue)
+        self.topics: Dict[str, MultiSubscribersQueue] = {}
+        self._topics_lock = Lock()
         self._stop = False
 
         self.__class__._instance = self
 
-    def subscribe(self, topic: str, offset: int):
-        topic_queue = self.topics[topic]
-        while not self._stop:
-            yield topic_queue.get(offset)
-            offset += 1
+    def _get_topic(self, topic: str) -> MultiSubscribersQueue:
+        topic_queue = self.topics.get(topic, None)
+        if topic_queue is None:
+            # Publisher and subscriber may create the topic at the same time
+            with self._topics_lock:
+                topic_queue = self.topics.setdefault(
+                    topic,
+                    MultiSubscribersQueue(
+                        capacity=Config.EVENT_STREAM_TOPIC_CAPACITY,
+                        retention=Config.EVENT_STREAM_RETENTION,
+                    ),
+                )
+        return topic_queue
+
+    def subscribe(self, topic: str, offset: int, subscriber_id: str = None):
+        """
+        Iterate over the topic events
+        :param topic: topic name
+        :param offset: first event offset
+        :param subscriber_id: consumer id, events that all the consumers read are removed from the topic
+        """
+        topic_queue = self._get_topic(topic)
+        try:
+            while not self._stop:
+                offset, event = topic_queue.get(offset, subscriber_id=subscriber_id)
+                if event is None:  # Queue closed
+                    return
+                yield event
+                offset += 1
+        finally:
+            if subscriber_id is not None:
+                topic_queue.unsubscribe(subscriber_id)
 
     def publish(self, topic, event: Event):
-        self.topics[topic].put(event)
+        self._get_topic(topic).put(event)
+
+    def metrics(self) -> dict:
+        """
+        :return: per topic size, offsets, subscribers lag and dropped events
+        """
+        with self._topics_lock:
+            topics = dict(self.topics)
+        return {topic: topic_queue.metrics() for topic, topic_queue in topics.items()}
 
     def stop(self):
         self._stop = True
+        with self._topics_lock:
+            for topic_queue in self.topics.values():
+                topic_queue.close()
 
 
 def setup_event_stream():
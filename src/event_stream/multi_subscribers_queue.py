@@ -1,14 +1,108 @@
-import time
+from collections import deque
+from threading import Condition
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+
+from loguru import logger
 
 
 class MultiSubscribersQueue:
-    def __init__(self):
-        self.events = []
+    """
+    Bounded event log of a topic.
+
+    Offsets are absolute (the offset of an event never changes), the log keeps only
+    events that are not consumed yet by all the subscribers, at most <capacity> events
+    and (optionally) events not older then <retention> seconds.
+    Subscriber that fall behind the log start is moved to the oldest event and the
+    skipped events are counted as dropped.
+    """
+
+    def __init__(self, capacity: int = None, retention: float = None):
+        """
+        :param capacity: max events in the log (None for no limit)
+        :param retention: max event age in seconds (None for no limit)
+        """
+        self.capacity = capacity
+        self.retention = retention
+        self.events: Deque[Tuple[float, object]] = deque()  # (publish time, event)
+        self.base_offset = 0  # offset of events[0]
+
+        self.subscribers_offset: Dict[str, int] = {}  # subscriber id: next offset to read
+        self.dropped_events: Dict[str, int] = {}  # subscriber id: events skipped
+
+        self._new_event = Condition()
+        self._closed = False
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + len(self.events)
 
-    def get(self, offset):
-        while offset >= len(self.events):
-            time.sleep(0.1)
-        return self.events[offset]
+    def get(self, offset, subscriber_id: str = None, timeout: float = None) -> Tuple[int, Optional[object]]:
+        """
+        Wait until the event at offset is published (no polling, put() wakes the waiters)
+        :param offset: event offset
+        :param subscriber_id: the consumer id, used to truncate consumed events
+        :param timeout: max seconds to wait (None for no limit)
+        :return: the event offset (bigger then offset if events were dropped) and the event
+            (None on timeout / closed queue)
+        """
+        with self._new_event:
+            while True:
+                if offset < self.base_offset:
+                    self._count_dropped(subscriber_id, self.base_offset - offset)
+                    offset = self.base_offset
+                if subscriber_id is not None:
+                    self.subscribers_offset[subscriber_id] = offset
+                    self._truncate()
+                if offset < self.next_offset:
+                    return offset, self.events[offset - self.base_offset][1]
+                if self._closed or not self._new_event.wait(timeout):
+                    return offset, None
+
+    def _count_dropped(self, subscriber_id: Optional[str], count: int):
+        if subscriber_id is None:
+            return
+        self.dropped_events[subscriber_id] = self.dropped_events.get(subscriber_id, 0) + count
+        logger.warning(f"Subscriber {subscriber_id} is lagging, {count} events dropped")
 
     def put(self, event):
-        self.events.append(event)
+        with self._new_event:
+            self.events.append((monotonic(), event))
+            self._truncate()
+            self._new_event.notify_all()
+
+    def unsubscribe(self, subscriber_id: str):
+        with self._new_event:
+            self.subscribers_offset.pop(subscriber_id, None)
+
+    def _truncate(self):
+        if self.subscribers_offset:
+            consumed_offset = min(self.subscribers_offset.values())
+        else:
+            consumed_offset = self.base_offset  # keep events for future subscribers
+        min_publish_time = None if self.retention is None else monotonic() - self.retention
+        while self.events and (
+            self.base_offset < consumed_offset
+            or (self.capacity is not None and len(self.events) > self.capacity)
+            or (min_publish_time is not None and self.events[0][0] < min_publish_time)
+        ):
+            self.events.popleft()
+            self.base_offset += 1
+
+    def metrics(self) -> dict:
+        with self._new_event:
+            return {
+                "size": len(self.events),
+                "base_offset": self.base_offset,
+                "next_offset": self.next_offset,
+                "subscribers_lag": {
+                    subscriber_id: self.next_offset - offset
+                    for subscriber_id, offset in self.subscribers_offset.items()
+                },
+                "dropped_events": dict(self.dropped_events),
+            }
+
+    def close(self):
+        with self._new_event:
+            self._closed = True
+            self._new_event.notify_all()
@@ -14,6 +14,10 @@ class Subscriber(Thread):
 
     def run(self) -> None:
         event_stream: EventStream = EventStream.get_instance()
-        for event in event_stream.subscribe(topic=self.topic, offset=self.offset):
+        events = event_stream.subscribe(
+            topic=self.topic, offset=self.offset, subscriber_id=self.name
+        )
+        for event in events:
             if self.callback(event):
                 break
+        events.close()
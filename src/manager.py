@@ -7,7 +7,8 @@ import api
 from config import Config, override_config
 from event_stream import setup_event_stream, Event
 from wallet import Wallet
-from blockchain import setup_blockchain
+from storage import setup_storage, close_storage
+from blockchain import setup_blockchain, close_blockchain
 from scheduler import setup_scheduler
 from network import setup_network
 from chain_extender import setup_global_loop_handler
@@ -43,6 +44,7 @@ def main():
     event_stream = setup_event_stream()
     setup_wallet()
     scheduler = setup_scheduler()
+    setup_storage()
     setup_blockchain()
     setup_network()
     setup_global_loop_handler()
@@ -57,7 +59,8 @@ def main():
     event_stream.publish(topic="lifecycle", event=Event("closing"))
     # Stopping
     scheduler.stop()
-    # TODO: close storage
+    close_blockchain()
+    close_storage()
 
 
 if __name__ == "__main__":
@@ -1,26 +1,79 @@
 import json
+import socket
+import time
 from dataclasses import dataclass, field
-from base64 import b64decode
+from base64 import b64decode, b64encode
+from binascii import Error as Base64Error
+from threading import Lock
+from typing import Iterable, Iterator, Union
 from uuid import uuid4
 
-from .resilient_session import ResilientSession
+from loguru import logger
+from requests import RequestException, Response
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+from .resilient_session import ResilientSession, backoff_delay
 
 __all__ = [
+    "INLINE_PAYLOAD_RECEIVE_MAX_BYTES",
     "Message",
     "IpfsAPI",
+    "decode_stream_messages",
 ]
 
 
+def decode_stream_messages(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Decode pubsub stream (json message per line), the chunks may hold many messages
+    and a message may be split between chunks.
+    Every chunk is copied once to the buffer and the consumed lines are removed once per chunk.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        start = len(buffer)  # the buffer has no complete line before the new chunk
+        buffer += chunk
+        line_start = 0
+        line_end = buffer.find(b"\n", start)
+        while line_end != -1:
+            line = buffer[line_start:line_end]
+            if line.strip():
+                message = json.loads(line)
+                message["data"] = b64decode(message["data"])
+                yield message
+            line_start = line_end + 1
+            line_end = buffer.find(b"\n", line_start)
+        del buffer[:line_start]
+
+
+# Inline payloads up to this size are accepted from any node. It's part of the protocol and
+# not of the node configuration: nodes configured to send bigger inline payloads than the
+# receivers would be ignored (Config.INLINE_PAYLOAD_MAX_BYTES is capped by it when sending).
+INLINE_PAYLOAD_RECEIVE_MAX_BYTES = 64 * 1024
+
+
+def inline_data_max_length() -> int:
+    """
+    :return: max base64 length of a received inline payload
+    """
+    return (INLINE_PAYLOAD_RECEIVE_MAX_BYTES + 2) // 3 * 4
+
+
 @dataclass
 class Message:
     meta: dict = field(default_factory=lambda: dict())
     cid: str = None
+    data: bytes = None  # small payload sent inline instead of by cid
 
     def to_dict(self):
-        return {
+        message_dict = {
             "meta": self.meta,
             "cid": self.cid,
         }
+        if self.data is not None:
+            message_dict["data"] = b64encode(self.data).decode()
+        return message_dict
 
     def has_node_id(self) -> bool:
         return self.meta is not None and "node_id" in self.meta
@@ -34,6 +87,25 @@ class Message:
     def get_cid(self) -> str:
         return self.cid
 
+    def has_data(self) -> bool:
+        return self.data is not None
+
+    def get_data(self) -> bytes:
+        return self.data
+
+    @staticmethod
+    def decode_inline_data(data: str) -> bytes:
+        """
+        Inline payloads are small (bigger payloads are sent by cid), big ones aren't decoded
+        :raise ValueError: the data is bigger than INLINE_PAYLOAD_RECEIVE_MAX_BYTES or invalid
+        """
+        if len(data) > inline_data_max_length():
+            raise ValueError("inline payload is too big")
+        data = b64decode(data, validate=True)
+        if len(data) > INLINE_PAYLOAD_RECEIVE_MAX_BYTES:
+            raise ValueError("inline payload is too big")
+        return data
+
     @classmethod
     def from_json(cls, message_json):
         try:
@@ -41,10 +113,18 @@ class Message:
         except json.JSONDecodeError:
             cid = message_json
             meta = None
+            data = None
         else:
             cid = message_dict.pop("cid", None)
             meta = message_dict.get("meta", None)
-        return Message(cid=cid, meta=meta)
+            data = message_dict.get("data", None)
+            if data is not None:
+                try:
+                    data = cls.decode_inline_data(data)
+                except (Base64Error, TypeError, ValueError) as error:
+                    logger.warning(f"Dropped inline payload of message {meta}: {error!r}")
+                    data = None
+        return Message(cid=cid, meta=meta, data=data)
 
 
 class IpfsAPI:
@@ -56,49 +136,109 @@ class IpfsAPI:
 
         self.base_api_url = f"http://{self.host}:{self.port}/api/v0"
 
+        # One keep-alive connections pool for all the threads (the topic streams hold a
+        # connection each while they are open)
+        self.session = ResilientSession()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=Config.IPFS_POOL_SIZE, pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.timeout = (Config.IPFS_CONNECT_TIMEOUT, Config.IPFS_READ_TIMEOUT)
+
+        self._metrics_lock = Lock()
+        self.requests_count = 0
+        self.failed_requests = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
         self._streams = {}
 
-        self.node_info = self.get_node_info()
+        self.node_info = self.wait_for_node_info()
+
+    def wait_for_node_info(self) -> dict:
+        """
+        Get the node info, wait until the IPFS API is available (the node may start before it)
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.get_node_info()
+            except (RequestException, ValueError) as error:
+                attempt += 1
+                delay = max(backoff_delay(attempt), self.session.retry_policy.cooldown_left())
+                logger.warning(f"IPFS API is not available ({error!r}), retry in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _post(self, path: str, **kwargs) -> Response:
+        """
+        Send request to the IPFS API (with the pooled session and the default timeout)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start_time = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.post(self.base_api_url + path, **kwargs)
+            failed = response is None or not response.ok
+            return response
+        finally:
+            latency = time.perf_counter() - start_time
+            with self._metrics_lock:
+                self.requests_count += 1
+                self.failed_requests += failed
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            requests_count = self.requests_count
+            return {
+                "requests": requests_count,
+                "failed": self.failed_requests,
+                **self.session.metrics(),
+                "average_latency": self.total_latency / requests_count if requests_count else 0.0,
+                "max_latency": self.max_latency,
+                "open_streams": len(self._streams),
+            }
 
     def get_node_info(self) -> str:
-        response = ResilientSession().post(self.base_api_url + "/version")
+        response = self._post("/version")
         return response.json()
 
     def get_pubsub_peers(self, topic: str = None) -> list:
         params = {}
         if topic:
             params = {"arg": topic}
-        response = ResilientSession().post(
-            self.base_api_url + "/pubsub/peers", params=params
-        )
+        response = self._post("/pubsub/peers", params=params)
         return response.json()["Strings"]
 
     def get_sync_peers(self) -> list:
         return self.get_pubsub_peers("sync")
 
-    def add_data(self, data: str):
+    def add_data(self, data: Union[str, bytes]):
         files = {"content": data}
-        response = ResilientSession().post(
-            self.base_api_url + "/block/put", files=files
-        )
+        response = self._post("/block/put", files=files)
         return response.json()["Key"]
 
     def get_data(self, cid: str):
-        response = ResilientSession().post(
-            self.base_api_url + "/block/get", params={"arg": cid}
-        )
+        response = self._post("/block/get", params={"arg": cid})
         return response.json()
 
-    def block_stat(self, cid: str):
-        response = ResilientSession().post(
-            self.base_api_url + "/block/stat", params={"arg": cid}
-        )
+    def get_raw_data(self, cid: str) -> bytes:
+        response = self._post("/block/get", params={"arg": cid})
+        return response.content
+
+    def block_stat(self, cid: str, offline: bool = False):
+        """
+        :param offline: don't fetch the block from the network (only local blocks are found)
+        """
+        params = {"arg": cid}
+        if offline:
+            params["offline"] = "true"
+        response = self._post("/block/stat", params=params)
         return response.json()
 
     def _publish_to_topic(self, topic: str, data: str):
-        response = ResilientSession().post(
-            self.base_api_url + "/pubsub/pub", params={"arg": [topic, data]}
-        )
+        response = self._post("/pubsub/pub", params={"arg": [topic, data]})
         return response.text
 
     def publish_json_to_topic(self, topic: str, data: dict):
@@ -107,22 +247,34 @@ class IpfsAPI:
         return response
 
     def sub_to_topic(self, topic: str):
-        response = ResilientSession().post(
-            self.base_api_url + "/pubsub/sub", params={"arg": topic}, stream=True
+        # No read timeout, the stream is idle until a message is published to the topic
+        response = self._post(
+            "/pubsub/sub",
+            params={"arg": topic},
+            stream=True,
+            timeout=(Config.IPFS_CONNECT_TIMEOUT, None),
         )
         self._streams[topic] = response
-        data = b""
-        for stream_data in response:
-            data += stream_data
-            if stream_data.endswith(b"\n"):
-                data = json.loads(data)
-                data["data"] = b64decode(data["data"])
-                yield data
-                data = b""
+        response.raise_for_status()
+        # chunk_size=None: read the data as it arrives (not waiting for fixed size chunks)
+        yield from decode_stream_messages(response.iter_content(chunk_size=None))
 
     def close_stream(self, topic: str):
-        self._streams[topic].close()
+        stream = self._streams.pop(topic, None)
+        if stream is None:
+            return
+        # Closing a stream that another thread is reading waits for the next data, shut the
+        # socket down first to wake the reader up
+        connection = getattr(stream.raw, "connection", None) or getattr(stream.raw, "_connection", None)
+        stream_socket = getattr(connection, "sock", None)
+        if stream_socket is not None:
+            try:
+                stream_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        stream.close()
 
     def close(self):
         for stream_name, stream in self._streams.items():
             stream.close()
+        self.session.close()
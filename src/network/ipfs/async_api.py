@@ -0,0 +1,223 @@
+"""
+asyncio version of IpfsAPI (requires the optional aiohttp package)
+
+All the requests share one aiohttp session (keep-alive connections pool), the methods
+must be awaited on the event loop the API was connected on.
+The requests are retried with the same policy as the threaded client (see RetryPolicy).
+"""
+import asyncio
+import json
+import time
+from base64 import b64decode
+from typing import AsyncIterator, Union
+from uuid import uuid4
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional, the threaded IpfsAPI is used without it
+    aiohttp = None
+
+from loguru import logger
+
+from config import Config
+
+from .resilient_session import CircuitOpenError, RetryPolicy, backoff_delay
+
+__all__ = ["AsyncIpfsAPI", "aiohttp"]
+
+
+def _is_connect_failure(error: Exception) -> bool:
+    """
+    :return: the request failed to connect to the IPFS API (see RetryPolicy), aiohttp < 3.10
+             reports connect timeouts as ServerTimeoutError, they are treated as read timeouts
+    """
+    connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", ())
+    return isinstance(error, (aiohttp.ClientConnectorError, connect_timeout))
+
+
+class AsyncIpfsAPI:
+    def __init__(self, host="127.0.0.1", port=5001):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async IPFS API")
+        self.host = host
+        self.port = port
+
+        self.node_id = str(uuid4())
+
+        self.base_api_url = f"http://{self.host}:{self.port}/api/v0"
+
+        self.session = None
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=Config.IPFS_CONNECT_TIMEOUT, sock_read=Config.IPFS_READ_TIMEOUT
+        )
+
+        self.requests_count = 0
+        self.failed_requests = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.retry_policy = RetryPolicy()
+
+        self._streams = {}
+
+        self.node_info = None
+
+    async def connect(self):
+        """
+        Create the connections pool (on the running event loop) and load the node info
+        """
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=Config.IPFS_POOL_SIZE)
+        )
+        self.node_info = await self.wait_for_node_info()
+
+    async def wait_for_node_info(self) -> dict:
+        """
+        Get the node info, wait until the IPFS API is available (the node may start before it)
+        """
+        attempt = 0
+        while True:
+            try:
+                return await self.get_node_info()
+            except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, ValueError) as error:
+                attempt += 1
+                delay = max(backoff_delay(attempt), self.retry_policy.cooldown_left())
+                logger.warning(f"IPFS API is not available ({error!r}), retry in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _post(self, path: str, **kwargs) -> bytes:
+        """
+        Send request to the IPFS API with retries (see RetryPolicy)
+        :param kwargs: aiohttp request arguments, data can be a function that creates the body
+                       (form data can be sent only once)
+        :raise CircuitOpenError: the circuit is open
+        :raise aiohttp.ClientError / asyncio.TimeoutError: the last attempt failed to get a response
+        :return: the response body (may be recoverable error response when out of attempts)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        data = kwargs.pop("data", None)
+        create_data = data if callable(data) else lambda: data
+        policy = self.retry_policy
+        url = self.base_api_url + path
+        deadline = policy.deadline()
+        attempt = 0
+        start_time = time.perf_counter()
+        failed = True
+        try:
+            while True:
+                policy.before_attempt("POST", url)
+                error = None
+                status = None
+                try:
+                    async with self.session.post(url, data=create_data(), **kwargs) as response:
+                        status = response.status
+                        body = await response.read()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as request_error:
+                    error = request_error
+                except BaseException:
+                    policy.attempt_cancelled()
+                    raise
+                failed = error is not None or status >= 400
+                if error is None or _is_connect_failure(error):
+                    policy.after_attempt(error is not None)
+                else:
+                    policy.attempt_cancelled()
+                if error is None and status not in policy.RECOVERABLE_STATUS_CODES:
+                    return body
+
+                attempt += 1
+                delay = policy.retry_delay(
+                    attempt, deadline, "POST", url, error or f"HTTP {status}"
+                )
+                if delay is None:
+                    if error is not None:
+                        raise error
+                    return body
+                await asyncio.sleep(delay)
+        finally:
+            latency = time.perf_counter() - start_time
+            self.requests_count += 1
+            self.failed_requests += failed
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def metrics(self) -> dict:
+        requests_count = self.requests_count
+        return {
+            "requests": requests_count,
+            "failed": self.failed_requests,
+            **self.retry_policy.metrics(),
+            "average_latency": self.total_latency / requests_count if requests_count else 0.0,
+            "max_latency": self.max_latency,
+            "open_streams": len(self._streams),
+        }
+
+    async def get_node_info(self) -> str:
+        return json.loads(await self._post("/version"))
+
+    async def get_pubsub_peers(self, topic: str = None) -> list:
+        params = {}
+        if topic:
+            params = {"arg": topic}
+        return json.loads(await self._post("/pubsub/peers", params=params))["Strings"]
+
+    async def add_data(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode()
+
+        def create_form():
+            form = aiohttp.FormData()
+            form.add_field("content", data, filename="content")
+            return form
+
+        return json.loads(await self._post("/block/put", data=create_form))["Key"]
+
+    async def get_data(self, cid: str):
+        return json.loads(await self.get_raw_data(cid))
+
+    async def get_raw_data(self, cid: str) -> bytes:
+        return await self._post("/block/get", params={"arg": cid})
+
+    async def block_stat(self, cid: str, offline: bool = False):
+        """
+        :param offline: don't fetch the block from the network (only local blocks are found)
+        """
+        params = {"arg": cid}
+        if offline:
+            params["offline"] = "true"
+        return json.loads(await self._post("/block/stat", params=params))
+
+    async def _publish_to_topic(self, topic: str, data: str):
+        return (await self._post("/pubsub/pub", params=[("arg", topic), ("arg", data)])).decode()
+
+    async def publish_json_to_topic(self, topic: str, data: dict):
+        return await self._publish_to_topic(topic, data=json.dumps(data))
+
+    async def sub_to_topic(self, topic: str) -> AsyncIterator[dict]:
+        # No read timeout, the stream is idle until a message is published to the topic
+        timeout = aiohttp.ClientTimeout(sock_connect=Config.IPFS_CONNECT_TIMEOUT)
+        async with self.session.post(
+            self.base_api_url + "/pubsub/sub", params={"arg": topic}, timeout=timeout
+        ) as response:
+            self._streams[topic] = response
+            try:
+                response.raise_for_status()
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    data["data"] = b64decode(data["data"])
+                    yield data
+            finally:
+                self._streams.pop(topic, None)
+
+    def close_stream(self, topic: str):
+        stream = self._streams.pop(topic, None)
+        if stream is not None:
+            stream.close()
+
+    async def close(self):
+        for stream in self._streams.values():
+            stream.close()
+        self._streams.clear()
+        if self.session is not None:
+            await self.session.close()
@@ -0,0 +1,157 @@
+"""
+Node that talks with the IPFS API on one asyncio event loop (running in its own thread)
+
+All the topic subscriptions are tasks of the loop instead of thread per topic.
+When a message with cid arrives, loading the cid starts right away on the loop, so the cids
+of different messages are loaded concurrently while the handlers process the messages one
+by one (the handler gets the already loaded data).
+The Node interface stays blocking for the handlers threads (don't call it from the loop).
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from threading import Thread
+from typing import Dict
+
+from loguru import logger
+
+from config import Config
+from event_stream import Event, EventStream
+
+from .api import Message
+from .async_api import AsyncIpfsAPI, aiohttp
+from .network_listener import TOPIC
+from .node import Node
+from .resilient_session import CircuitOpenError, backoff_delay
+
+__all__ = ["AsyncNode"]
+
+
+class AsyncNode(Node):
+    cids_to_prefetch = 64  # loaded cids waiting for a handler
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = Thread(target=self.loop.run_forever, name="ipfs loop", daemon=True)
+        self._loop_thread.start()
+
+        self.ipfs_api = AsyncIpfsAPI(host=Config.IPFS_HOST, port=Config.IPFS_PORT)
+        self._run(self.ipfs_api.connect())
+        self.event_stream: EventStream = EventStream.get_instance()
+
+        # Used only on the loop
+        self._listeners: Dict[str, asyncio.Task] = {}
+        self._prefetched: Dict[str, asyncio.Task] = OrderedDict()
+
+        Node._instance = self
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def publish_to_topic(self, topic: str, message: Message = None):
+        if message is None:
+            message = Message()
+        message.meta.update({"node_id": self.ipfs_api.node_id})
+        self._run(self.ipfs_api.publish_json_to_topic(topic, message.to_dict()))
+
+    def load_cid(self, cid: str):
+        return json.loads(self.load_raw_cid(cid))
+
+    def create_cid(self, data: dict):
+        return self.create_raw_cid(json.dumps(data))
+
+    def load_raw_cid(self, cid: str) -> bytes:
+        return self._run(self._load_raw_cid(cid))
+
+    def create_raw_cid(self, data: bytes):
+        return self._run(self.ipfs_api.add_data(data))
+
+    def has_cid(self, cid: str) -> bool:
+        try:
+            stat = self._run(self.ipfs_api.block_stat(cid, offline=True))
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, ValueError):
+            return False
+        return isinstance(stat, dict) and stat.get("Key", None) == cid
+
+    def publish_block(self, block: dict):
+        return self.create_cid(block)
+
+    def publish_transaction(self, transaction: dict):
+        return self.create_cid(transaction)
+
+    async def _load_raw_cid(self, cid: str) -> bytes:
+        task = self._prefetched.pop(cid, None)
+        if task is None:
+            return await self.ipfs_api.get_raw_data(cid)
+        return await task
+
+    def _prefetch(self, cid: str):
+        if cid in self._prefetched:
+            return
+        task = self.loop.create_task(self.ipfs_api.get_raw_data(cid))
+        # Load errors are raised to the handler, don't report unhandled errors of unused cids
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._prefetched[cid] = task
+        if len(self._prefetched) > self.cids_to_prefetch:
+            _, oldest = self._prefetched.popitem(last=False)
+            oldest.cancel()
+
+    def _publish(self, topic: str, message: dict):
+        serialized_message: Message = Message.from_json(message["data"])
+        if (
+            not serialized_message.has_node_id()
+            or serialized_message.get_node_id() == self.ipfs_api.node_id
+        ):
+            # ignore self messages
+            return
+        if serialized_message.has_cid():
+            self._prefetch(serialized_message.get_cid())
+        self.event_stream.publish(TOPIC, Event(TOPIC + "-" + topic, message=serialized_message))
+
+    async def _listen(self, topic: str):
+        """
+        Publish the topic messages, subscribe again (with backoff) when the stream fails or ends
+        until the listener is removed (the task is cancelled)
+        """
+        attempt = 0
+        while True:
+            try:
+                async for message in self.ipfs_api.sub_to_topic(topic):
+                    attempt = 0
+                    self._publish(topic, message)
+                error = "stream ended"
+            except (
+                aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, ValueError
+            ) as stream_error:
+                error = repr(stream_error)
+            attempt += 1
+            delay = max(backoff_delay(attempt), self.ipfs_api.retry_policy.cooldown_left())
+            logger.warning(
+                f"Subscription stream {topic} failed ({error}), resubscribe in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+    def add_listener(self, topic: str):
+        async def start_listener():
+            self._listeners[topic] = self.loop.create_task(self._listen(topic))
+
+        self._run(start_listener())
+
+    def remove_listener(self, topic: str):
+        async def stop_listener():
+            listener = self._listeners.pop(topic, None)
+            if listener is not None:
+                listener.cancel()
+
+        self._run(stop_listener())
+
+    def close(self):
+        async def close_node():
+            for listener in list(self._listeners.values()):
+                listener.cancel()
+            for task in self._prefetched.values():
+                task.cancel()
+            await self.ipfs_api.close()
+
+        self._run(close_node())
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -1,6 +1,10 @@
-from threading import Thread
+from threading import Event as ThreadingEvent, Thread
+
+from loguru import logger
+from requests import RequestException
 
 from .api import IpfsAPI, Message
+from .resilient_session import backoff_delay
 from event_stream import Event, EventStream
 
 
@@ -11,6 +15,12 @@ TOPIC = "network"
 
 
 class NetworkListener(Thread):
+    """
+    Publish the messages of a pubsub topic to the event stream.
+    When the subscription stream fails or ends the topic is subscribed again (with backoff)
+    until the listener is stopped.
+    """
+
     def __init__(
         self,
         topic: str,
@@ -19,22 +29,43 @@ class NetworkListener(Thread):
         super().__init__(name=f"{topic} listener", daemon=True)
         self._topic = topic
         self._ipfs_api = ipfs_api
+        self._stopped = ThreadingEvent()
         self.event_stream: EventStream = EventStream.get_instance()
 
-    def run(self) -> None:
+    def stop(self):
+        self._stopped.set()
+        self._ipfs_api.close_stream(self._topic)
+
+    def _publish(self, message: dict):
+        serialized_message: Message = Message.from_json(message["data"])
+        if (
+            not serialized_message.has_node_id()
+            or serialized_message.get_node_id() == self._ipfs_api.node_id
+        ):
+            # ignore self messages
+            return
         try:
-            for message in self._ipfs_api.sub_to_topic(self._topic):
-                message_data = message["data"]
-                serialized_message: Message = Message.from_json(message_data)
-                if (
-                    not serialized_message.has_node_id()
-                    or serialized_message.get_node_id() == self._ipfs_api.node_id
-                ):
-                    # ignore self messages
-                    continue
-                try:
-                    self.event_stream.publish(TOPIC, Event(TOPIC+"-"+self._topic, message=serialized_message))
-                except Exception as EX:
-                    print(type(EX), EX)
-        except AttributeError:
-            print(f"[X] - Subscription Stream {self._topic} has bin closed")
+            self.event_stream.publish(TOPIC, Event(TOPIC+"-"+self._topic, message=serialized_message))
+        except Exception as error:
+            logger.warning(f"Message of {self._topic} is not published: {error!r}")
+
+    def run(self) -> None:
+        attempt = 0
+        while not self._stopped.is_set():
+            try:
+                for message in self._ipfs_api.sub_to_topic(self._topic):
+                    attempt = 0
+                    self._publish(message)
+                error = "stream ended"
+            except (RequestException, AttributeError, ValueError) as stream_error:
+                # AttributeError: the stream was closed while reading
+                error = repr(stream_error)
+            if self._stopped.is_set():
+                break
+            attempt += 1
+            delay = max(backoff_delay(attempt), self._ipfs_api.session.retry_policy.cooldown_left())
+            logger.warning(
+                f"Subscription stream {self._topic} failed ({error}), resubscribe in {delay:.2f}s"
+            )
+            self._stopped.wait(delay)
+        logger.info(f"Subscription stream {self._topic} has been closed")
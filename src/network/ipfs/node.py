@@ -1,7 +1,11 @@
 import json
 
+from loguru import logger
+from requests.exceptions import RequestException
+
 from config import Config
 from .api import IpfsAPI, Message
+from .async_api import aiohttp
 from .network_listener import NetworkListener
 
 
@@ -35,6 +39,7 @@ class Node:
 
     def __init__(self):
         self.ipfs_api = IpfsAPI(host=Config.IPFS_HOST, port=Config.IPFS_PORT)
+        self._listeners = {}
 
         self.__class__._instance = self
 
@@ -50,6 +55,30 @@ class Node:
     def create_cid(self, data: dict):
         return self.ipfs_api.add_data(json.dumps(data))
 
+    def load_raw_cid(self, cid: str) -> bytes:
+        return self.ipfs_api.get_raw_data(cid)
+
+    def load_payload(self, message: Message) -> bytes:
+        """
+        :return: the message payload, inline in the message or loaded by the message cid
+        """
+        if message.has_data():
+            return message.get_data()
+        return self.load_raw_cid(message.get_cid())
+
+    def create_raw_cid(self, data: bytes):
+        return self.ipfs_api.add_data(data)
+
+    def has_cid(self, cid: str) -> bool:
+        """
+        :return: True if the local IPFS node still has the cid data (it may be garbage collected)
+        """
+        try:
+            stat = self.ipfs_api.block_stat(cid, offline=True)
+        except (RequestException, ValueError):
+            return False
+        return isinstance(stat, dict) and stat.get("Key", None) == cid
+
     def publish_block(self, block: dict):
         block_json = json.dumps(block)
         cid = self.ipfs_api.add_data(block_json)
@@ -62,16 +91,28 @@ class Node:
 
     def add_listener(self, topic: str):
         listener = NetworkListener(topic=topic, ipfs_api=self.ipfs_api)
+        self._listeners[topic] = listener
         listener.start()
 
     def remove_listener(self, topic: str):
-        self.ipfs_api.close_stream(topic)
+        listener = self._listeners.pop(topic, None)
+        if listener is not None:
+            listener.stop()
 
     def close(self):
+        for topic in list(self._listeners):
+            self.remove_listener(topic)
         self.ipfs_api.close()
 
 
 def setup_node():
-    node = Node()
+    if Config.IPFS_ASYNC and aiohttp is not None:
+        from .async_node import AsyncNode
+
+        node = AsyncNode()
+    else:
+        if Config.IPFS_ASYNC:
+            logger.warning("aiohttp is not installed, using the threaded IPFS client")
+        node = Node()
     for network_topic in NETWORK_TOPICS:
         node.add_listener(network_topic)
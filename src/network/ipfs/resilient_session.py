@@ -1,112 +1,238 @@
+from random import uniform
+from threading import Lock
+from typing import Optional
+import time
+
 from requests import Session
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import NewConnectionError
 import loguru
-import time
 
+from config import Config
 
-class ResilientSession(Session):
 
+def backoff_delay(attempt: int) -> float:
     """
-    This class is supposed to retry requests that do return temporary errors.
+    Exponential backoff with full jitter
+    :param attempt: failed attempts so far
+    """
+    return uniform(0, min(Config.IPFS_BACKOFF_BASE * 2 ** attempt, Config.IPFS_BACKOFF_MAX))
 
-    At this moment it supports: 502, 503, 504
+
+def is_connect_failure(error: Exception) -> bool:
+    """
+    :return: the request failed to connect to the server (read timeouts and dropped
+             connections are not connect failures, the server was reachable)
     """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if not isinstance(error, ConnectionError) or isinstance(error, Timeout):
+        return False
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)  # MaxRetryError wraps the urllib3 error
+    return isinstance(reason, NewConnectionError)
 
-    def __recoverable(self, error, url, request, counter=1):
-        if hasattr(error, "status_code"):
-            if error.status_code in [502, 503, 504]:
-                error = f"HTTP {error.status_code}"
-            else:
-                return False
-        MAX_DELAY = 60
-        DELAY = min(2 * counter, MAX_DELAY)
+
+class CircuitOpenError(ConnectionError):
+    """
+    The server failed too many times in a row, requests are not sent until the cooldown ends
+    """
+
+
+class RetryPolicy:
+
+    """
+    Retries and circuit breaker of the IPFS API requests (shared by the threaded and the asyncio
+    clients, the client sends the attempts and reports their results)
+
+    Every request is retried up to <retry_attempts> times and until <retry_deadline> seconds
+    passed, waiting exponential backoff with full jitter between attempts.
+
+    Circuit breaker: after <circuit_failures> connect failures in a row the circuit is open and
+    requests fail right away (CircuitOpenError), after <circuit_cooldown> seconds one request
+    is let through (half open), its result closes or opens the circuit again.
+    Only connect failures count toward the breaker, any response (5xx included) means the
+    server is reachable and closes the circuit, read timeouts don't decide anything (slow
+    streaming endpoints time out while the server is fine). Both are still retried.
+    """
+
+    RECOVERABLE_STATUS_CODES = (502, 503, 504)
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        retry_attempts: int = None,
+        retry_deadline: float = None,
+        circuit_failures: int = None,
+        circuit_cooldown: float = None,
+    ):
+        self.retry_attempts = Config.IPFS_RETRY_ATTEMPTS if retry_attempts is None else retry_attempts
+        self.retry_deadline = Config.IPFS_RETRY_DEADLINE if retry_deadline is None else retry_deadline
+        self.circuit_failures = (
+            Config.IPFS_CIRCUIT_FAILURES if circuit_failures is None else circuit_failures
+        )
+        self.circuit_cooldown = (
+            Config.IPFS_CIRCUIT_COOLDOWN if circuit_cooldown is None else circuit_cooldown
+        )
+
+        self._circuit_lock = Lock()
+        self.circuit_state = self.CLOSED
+        self._failures_in_row = 0
+        self._opened_at = 0.0
+        self._probing = False  # half open request is in progress
+
+        self.retries = 0
+        self.circuit_opened = 0
+        self.rejected = 0
+
+    def deadline(self) -> float:
+        """
+        :return: time.monotonic() time that no retry is started after it
+        """
+        return time.monotonic() + self.retry_deadline
+
+    def before_attempt(self, method: str, url: str):
+        """
+        :raise CircuitOpenError: the circuit is open (or half open and already probing)
+        """
+        with self._circuit_lock:
+            if self.circuit_state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.circuit_cooldown:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit is open, {method} {url} is not sent")
+                self.circuit_state = self.HALF_OPEN
+            if self.circuit_state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit is half open, {method} {url} is not sent")
+                self._probing = True
+
+    def after_attempt(self, failed: bool):
+        """
+        :param failed: the attempt failed to connect to the server, otherwise it got a response
+        """
+        with self._circuit_lock:
+            self._probing = False
+            if not failed:
+                self._failures_in_row = 0
+                if self.circuit_state != self.CLOSED:
+                    loguru.logger.info("IPFS API is back, circuit closed")
+                self.circuit_state = self.CLOSED
+                return
+            self._failures_in_row += 1
+            if (
+                self.circuit_state == self.HALF_OPEN
+                or self._failures_in_row >= self.circuit_failures
+            ):
+                if self.circuit_state != self.OPEN:
+                    self.circuit_opened += 1
+                    loguru.logger.warning(
+                        f"IPFS API failed {self._failures_in_row} times in a row, circuit opened"
+                    )
+                self.circuit_state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def cooldown_left(self) -> float:
+        """
+        :return: seconds until the open circuit lets a request through (0 if it isn't open)
+        """
+        with self._circuit_lock:
+            if self.circuit_state != self.OPEN:
+                return 0.0
+            return max(self._opened_at + self.circuit_cooldown - time.monotonic(), 0.0)
+
+    def attempt_cancelled(self):
+        """
+        The attempt ended without telling if the server is reachable (invalid request,
+        read timeout)
+        """
+        with self._circuit_lock:
+            self._probing = False
+
+    def retry_delay(
+        self, attempt: int, deadline: float, method: str, url: str, error
+    ) -> Optional[float]:
+        """
+        :param attempt: failed attempts so far
+        :param error: the failure (for logging)
+        :return: seconds to wait before the next attempt or None if the request is out of
+                 attempts or time
+        """
+        delay = backoff_delay(attempt)
+        if attempt >= self.retry_attempts or time.monotonic() + delay > deadline:
+            return None
+        with self._circuit_lock:
+            self.retries += 1
         loguru.logger.warning(
-            "Got recoverable error [%s] from %s %s, retry #%s in %ss"
-            % (error, request, url, counter, DELAY)
+            "Got recoverable error [%s] from %s %s, retry #%s in %.2fs"
+            % (error, method, url, attempt, delay)
         )
-        time.sleep(DELAY)
-        return True
+        return delay
 
-    def get(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).get(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "GET", counter):
-                continue
-            return r
-
-    def post(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).post(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "POST", counter):
-                continue
-            return r
-
-    def delete(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).delete(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "DELETE", counter):
-                continue
-            return r
-
-    def put(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).put(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "PUT", counter):
-                continue
-            return r
-
-    def head(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).head(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "HEAD", counter):
-                continue
-            return r
-
-    def patch(self, url, **kwargs):
-        counter = 0
-        while True:
-            counter += 1
-            try:
-                r = super(ResilientSession, self).patch(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "PATCH", counter):
-                continue
-            return r
-
-    def options(self, url, **kwargs):
-        counter = 0
+    def metrics(self) -> dict:
+        with self._circuit_lock:
+            return {
+                "retries": self.retries,
+                "circuit_state": self.circuit_state,
+                "circuit_opened": self.circuit_opened,
+                "rejected": self.rejected,
+            }
+
+
+class ResilientSession(Session):
+
+    """
+    This class is supposed to retry requests that do return temporary errors.
+
+    At this moment it supports: connection errors, timeouts and 502, 503, 504
+    The retries and the circuit breaker are described in RetryPolicy.
+    """
+
+    def __init__(self, retry_policy: RetryPolicy = None):
+        super().__init__()
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+
+    def request(self, method, url, *args, **kwargs):
+        """
+        Send the request with retries (see RetryPolicy)
+        :raise CircuitOpenError: the circuit is open
+        :raise ConnectionError / Timeout: the last attempt failed to get a response
+        :return: the response (may be recoverable error response when out of attempts)
+        """
+        policy = self.retry_policy
+        deadline = policy.deadline()
+        attempt = 0
         while True:
-            counter += 1
+            policy.before_attempt(method, url)
+            error = None
+            response = None
             try:
-                r = super(ResilientSession, self).options(url, **kwargs)
-            except ConnectionError as e:
-                r = e.response
-            if self.__recoverable(r, url, "OPTIONS", counter):
-                continue
-            return r
+                response = super().request(method, url, *args, **kwargs)
+            except (ConnectionError, Timeout) as request_error:
+                error = request_error
+            except Exception:
+                policy.attempt_cancelled()
+                raise
+            if error is None or is_connect_failure(error):
+                policy.after_attempt(error is not None)
+            else:
+                policy.attempt_cancelled()
+            failed = error is not None or response.status_code in policy.RECOVERABLE_STATUS_CODES
+            if not failed:
+                return response
+
+            attempt += 1
+            delay = policy.retry_delay(
+                attempt, deadline, method, url, error or f"HTTP {response.status_code}"
+            )
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+
+    def metrics(self) -> dict:
+        return self.retry_policy.metrics()
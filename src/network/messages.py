@@ -1,15 +1,39 @@
+from config import Config
+
 from .ipfs import Message, Node
+from .ipfs.api import INLINE_PAYLOAD_RECEIVE_MAX_BYTES
+
+
+def publish_payload(topic: str, meta: dict, payload: bytes):
+    """
+    Publish message with the payload, small payloads are sent inline in the message
+    (saves the IPFS upload and the receivers download), big payloads are sent by cid
+    """
+    node: Node = Node.get_instance()
+    if len(payload) <= min(Config.INLINE_PAYLOAD_MAX_BYTES, INLINE_PAYLOAD_RECEIVE_MAX_BYTES):
+        message = Message(meta=meta, data=payload)
+    else:
+        message = Message(meta=meta, cid=node.create_raw_cid(payload))
+    node.publish_to_topic(topic=topic, message=message)
 
 
 class SyncRequest:
     topic = "chain-request"
 
-    def __init__(self, score: int, length: int):
+    def __init__(self, score: int, length: int, locator: list = None):
+        """
+        :param locator: list of (index, hash) of the requester chain (see Blockchain.locator),
+            the response will include only the blocks after the common ancestor
+        """
         self.score = score
         self.length = length
+        self.locator = locator
 
     def to_message(self) -> Message:
-        return Message(meta={"score": self.score, "length": self.length})
+        meta = {"score": self.score, "length": self.length}
+        if self.locator is not None:
+            meta["locator"] = self.locator
+        return Message(meta=meta)
 
     def send(self):
         node: Node = Node.get_instance()
@@ -19,32 +43,28 @@ class SyncRequest:
 class NewBlock:
     topic = "new-block"
 
-    def __init__(self, block: dict, previous_hash: str, index: int):
+    def __init__(self, block: bytes, previous_hash: str, index: int):
         self.block = block
         self.privies_hash = previous_hash
         self.index = index
 
-    def to_message(self, cid: str) -> Message:
-        return Message(meta={"p_hash": self.privies_hash, "index": self.index}, cid=cid)
+    def meta(self) -> dict:
+        return {"p_hash": self.privies_hash, "index": self.index}
 
     def send(self):
-        node: Node = Node.get_instance()
-        cid = node.create_cid(self.block)
-        node.publish_to_topic(topic=self.topic, message=self.to_message(cid))
+        publish_payload(self.topic, self.meta(), self.block)
 
 
 class NewTransaction:
     topic = "new-transaction"
 
-    def __init__(self, transaction: dict, hash: str, nonce: int):
+    def __init__(self, transaction: bytes, hash: str, nonce: int):
         self.transaction = transaction
         self.hash = hash
         self.nonce = nonce
 
-    def to_message(self, cid: str) -> Message:
-        return Message(meta={"hash": self.hash, "nonce": self.nonce}, cid=cid)
+    def meta(self) -> dict:
+        return {"hash": self.hash, "nonce": self.nonce}
 
     def send(self):
-        node: Node = Node.get_instance()
-        cid = node.create_cid(self.transaction)
-        node.publish_to_topic(topic=self.topic, message=self.to_message(cid))
+        publish_payload(self.topic, self.meta(), self.transaction)
@@ -7,25 +7,30 @@ from .messages import SyncRequest, NewTransaction, NewBlock
 def lifecycle_callback(event: Event):
     if event.name == "end-setup":
         blockchain: Blockchain = Blockchain.get_main_chain()
-        SyncRequest(score=blockchain.score, length=blockchain.length).send()
+        SyncRequest(
+            score=blockchain.score, length=blockchain.length, locator=blockchain.locator()
+        ).send()
         return True  # Stop listening on topic. closing subscriber
 
 
 def new_block_callback(event: Event):
     if event.name == "block_created":
         block: Block = event.args["block"]
-        NewBlock(block=block.to_dict(), previous_hash=block.previous_hash, index=block.index).send()
+        NewBlock(block=block.to_bytes(), previous_hash=block.previous_hash, index=block.index).send()
 
 
 def new_transaction_callback(event: Event):
     if event.name == "transaction_created":
         transaction: Transaction = event.args["transaction"]
-        NewTransaction(transaction.to_dict(), hash=transaction.hash(), nonce=transaction.nonce).send()
+        NewTransaction(transaction.to_bytes(), hash=transaction.hash(), nonce=transaction.nonce).send()
 
 
 def invalid_network_state_callback(event: Event):
     blockchain: Blockchain = Blockchain.get_main_chain()
-    SyncRequest(score=blockchain.score, length=blockchain.length).send()
+    locator = blockchain.locator()
+    if event.args.get("full_chain", False):
+        locator = locator[-1:]  # genesis block only, the response is the whole chain
+    SyncRequest(score=blockchain.score, length=blockchain.length, locator=locator).send()
 
 
 def setup_subscribers():
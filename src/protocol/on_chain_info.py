@@ -3,14 +3,25 @@ Handle chain info request
 if chain info response is sent the handler will execute those steps:
 1. validate message
 2. if chain summery is not relevant ignore message
-3. get chain info via cid
-4. update chain info
+3. get chain manifest via cid
+4. download and parse the chain chunks (many blocks per cid) concurrently and check them
+   against the manifest in order
+5. apply every chunk as soon as the chunks before it are applied: extend the chain (response
+   start at our chain end) or fork the chain at the common ancestor and add the blocks to
+   the fork, switch to the fork if it is better
 """
-from typing import List
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List
 
 from loguru import logger
 
-from blockchain import Blockchain, Block
+from config import Config
+from blockchain import Blockchain, Block, ValidationError
+from blockchain.codec import decode_chunk
+from event_stream import Event, EventStream
 from network.ipfs import Node, Message
 
 from .handler import Handler
@@ -18,6 +29,7 @@ from .handler import Handler
 
 class ChainInfoHandler(Handler):
     topic = "chain-response"
+    full_chain_requested = False
 
     def __init__(self):
         self.node = Node.get_instance()
@@ -28,42 +40,180 @@ class ChainInfoHandler(Handler):
         length_exist = message.meta.get("length", None) is not None
         return cid_exist and score_exist and length_exist
 
-    def load_chain_blocks(self, message: Message) -> list:
-        cid = message.get_cid()
+    def load_chunk(self, chunk: dict) -> List[Block]:
+        """
+        Download and parse one chain chunk (runs in the download workers)
+        :raise ValueError: invalid chunk data
+        """
+        chunk_data = decode_chunk(self.node.load_raw_cid(chunk["cid"]))
+        return [Block.from_bytes(block_data) for block_data in chunk_data]
+
+    def iter_chain_chunks(self, message: Message) -> Iterator[List[Block]]:
+        """
+        Load the chain chunks listed in the manifest in order (stop at the first invalid chunk).
+        Up to Config.SYNC_DOWNLOAD_WORKERS chunks are downloaded at a time and the next chunks
+        are downloaded while the caller is applying the current one.
+        :return: iterator of the blocks of every valid chunk
+        """
+        try:
+            chunks = iter(self.node.load_cid(message.get_cid())["chunks"])
+        except Exception as error:  # IPFS error or malformed manifest
+            logger.warning(f"Can't load chain manifest {message.get_cid()}: {error!r}")
+            return
+        workers = max(Config.SYNC_DOWNLOAD_WORKERS, 1)
+        pending = deque()  # (chunk, future) in manifest order, reassembly buffer
+        previous_block = None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chain-sync") as executor:
+            try:
+                while True:
+                    for chunk in islice(chunks, 2 * workers - len(pending)):
+                        pending.append((chunk, executor.submit(self.load_chunk, chunk)))
+                    if not pending:
+                        return
+                    chunk, future = pending.popleft()
+                    try:
+                        chunk_blocks = future.result()
+                        chunk_is_valid = self.is_chunk_valid(chunk, chunk_blocks, previous_block)
+                    except Exception as error:  # IPFS error, invalid chunk data or manifest entry
+                        logger.warning(f"Can't load chain chunk {chunk!r:.200}: {error!r}")
+                        return
+                    if not chunk_is_valid:
+                        logger.warning(f"Chain chunk {chunk['cid']} doesn't match the manifest")
+                        return
+                    previous_block = chunk_blocks[-1]
+                    yield chunk_blocks
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def load_chain_blocks(self, message: Message) -> List[Block]:
+        """
+        :return: the blocks of the valid chunks
+        """
         blocks = []
-        blocks_info = self.node.load_cid(cid)
-        for b_cid, b_hash in zip(blocks_info["blocks_cid"], blocks_info["blocks_hash"]):
-            block_dict = self.node.load_cid(b_cid)
-            block = Block.from_dict(**block_dict)
-            if block.hash() != b_hash or (
-                blocks and block.previous_hash != blocks[-1].hash()
-            ):
-                break
-            blocks.append(block)
-        else:
-            return blocks
-
-    def build_blockchain(self, blocks: List[Block]):
+        for chunk_blocks in self.iter_chain_chunks(message):
+            blocks.extend(chunk_blocks)
+        return blocks
+
+    @staticmethod
+    def is_chunk_valid(chunk: dict, chunk_blocks: List[Block], previous_block: Block = None) -> bool:
+        """
+        Check the chunk blocks are the blocks listed in the manifest and are linked by hash
+        (the blocks themselves are validated when added to the chain)
+        """
+        if not chunk_blocks or len(chunk_blocks) != chunk["count"]:
+            return False
+        if chunk_blocks[0].index != chunk["start"] or chunk_blocks[-1].hash() != chunk["last_hash"]:
+            return False
+        if previous_block is not None and chunk_blocks[0].previous_hash != previous_block.hash():
+            return False
+        return all(
+            block.previous_hash == previous.hash()
+            for previous, block in zip(chunk_blocks, chunk_blocks[1:])
+        )
+
+    @staticmethod
+    def extend_blockchain(
+        blockchain: Blockchain, chunk_blocks: List[Block], chunks: Iterator[List[Block]]
+    ) -> int:
+        """
+        Add the chunks to the end of the chain (the next chunks are loaded meanwhile)
+        :return: number of added blocks
+        """
+        applied = 0
+        while chunk_blocks:
+            with blockchain.lock:
+                if chunk_blocks[0].index != blockchain.length:
+                    logger.info(
+                        f"Chain sync stopped at block {chunk_blocks[0].index}, "
+                        f"the chain changed meanwhile (length {blockchain.length})"
+                    )
+                    return applied
+                try:
+                    blockchain.add_chain(chunk_blocks)
+                except ValidationError as error:
+                    logger.warning(
+                        f"Invalid chain response at blocks [{chunk_blocks[0].index}-"
+                        f"{chunk_blocks[-1].index}], the next chunks are dropped: {error!r}"
+                    )
+                    event_stream: EventStream = EventStream.get_instance()
+                    event_stream.publish(
+                        topic="invalid-network-block", event=Event(name="invalid block added")
+                    )
+                    return applied
+            applied += len(chunk_blocks)
+            chunk_blocks = next(chunks, None)
+        return applied
+
+    def request_full_chain(self, start: int):
+        """
+        The response forks before the blocks this (pruned) node keeps, request the chain from
+        the genesis block (once until a response is applied, the responder may be pruned too)
+        """
+        if self.full_chain_requested:
+            logger.warning(f"Can't fork the chain at block {start} (pruned blocks)")
+            return
+        logger.info(f"Can't fork the chain at block {start} (pruned blocks), requesting full chain")
+        self.full_chain_requested = True
+        event_stream: EventStream = EventStream.get_instance()
+        event_stream.publish(
+            topic="invalid-network-block", event=Event(name="pruned fork", full_chain=True)
+        )
+
+    def build_blockchain(self, chunks: Iterator[List[Block]]) -> int:
+        """
+        Apply the chain chunks one by one as they are loaded
+        :return: number of applied blocks
+        """
         # TODO: move to blockchain package and activate via event
         current_blockchain: Blockchain = Blockchain.get_main_chain()
-        new_blockchain = Blockchain(branch=True)
-        if blocks and blocks[0].index == 0:
-            blocks.pop(0)
-        new_blockchain.add_chain(blocks)
-        score_is_bigger = new_blockchain.score > current_blockchain.score
-        length_is_not_lower = new_blockchain.length >= current_blockchain.length
-        if score_is_bigger and length_is_not_lower:
-            logger.success(
-                "New blockchain synced!"
-                + f"\n-\tScore: {new_blockchain.score}"
-                + f"\n-\tLength: {new_blockchain.length}"
-            )
-            Blockchain.set_main_chain(new_blockchain)
+        chunk_blocks = next(chunks, [])
+        if chunk_blocks and chunk_blocks[0].index == 0:
+            chunk_blocks = chunk_blocks[1:] or next(chunks, [])  # skip genesis
+        if not chunk_blocks:
+            return 0
+        start = chunk_blocks[0].index
+        if start > current_blockchain.length:
+            logger.warning(f"Chain response start at block {start} after our chain end")
+            return 0
+        if start == current_blockchain.length:
+            return self.extend_blockchain(current_blockchain, chunk_blocks, chunks)
+
+        new_blockchain = current_blockchain.fork(start)
+        if new_blockchain is None:
+            self.request_full_chain(start)
+            return 0
+        applied = 0
+        while chunk_blocks:
+            try:
+                new_blockchain.add_chain(chunk_blocks)
+            except ValidationError as error:
+                logger.warning(f"Invalid chain response: {error!r}")
+                return applied
+            applied += len(chunk_blocks)
+            chunk_blocks = next(chunks, None)
+        # No block is added to the current chain until the new chain replaces it
+        with current_blockchain.lock:
+            score_is_bigger = new_blockchain.score > current_blockchain.score
+            length_is_not_lower = new_blockchain.length >= current_blockchain.length
+            if score_is_bigger and length_is_not_lower:
+                logger.success(
+                    "New blockchain synced!"
+                    + f"\n-\tScore: {new_blockchain.score}"
+                    + f"\n-\tLength: {new_blockchain.length}"
+                )
+                new_blockchain.adopt_storage(current_blockchain)
+                Blockchain.set_main_chain(new_blockchain)
+        return applied
 
     def __call__(self, message: Message):
         super().log(message)
         if not self.validate(message):
             return
-        chain_blocks = self.load_chain_blocks(message)
-        self.build_blockchain(chain_blocks)
+        start_time = time.perf_counter()
+        applied = self.build_blockchain(self.iter_chain_chunks(message))
+        elapsed = time.perf_counter() - start_time
+        if applied:
+            self.full_chain_requested = False
+            logger.info(f"Chain synced {applied} blocks ({applied / elapsed:.0f} blocks/sec applied)")
         # TODO: remove from network handlers with callback
@@ -2,14 +2,22 @@
 Handle chain info request
 if chain info request is initiated the handler will execute those steps:
 1. validate message
-2. get chain info and summery
-3. publish chain info and get cid
-4. send the cid and summery
+2. get chain info and summery (the blocks after the common ancestor with the requester chain)
+3. publish chain chunks (many encoded blocks per cid) and the chunks manifest, chunks and
+   manifests that were already published are not published again (see CidCache)
+4. send the manifest cid and summery
 """
-from typing import Tuple
+from collections import OrderedDict
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-from blockchain import Blockchain
+from loguru import logger
+
+from config import Config
+from blockchain import Block, Blockchain
+from blockchain.codec import encode_chunk
 from network.ipfs import Node, Message
+from storage import CidCache
 
 from .handler import Handler
 
@@ -17,9 +25,12 @@ from .handler import Handler
 class ChainInfoRequestHandler(Handler):
     topic = "chain-request"
     topic_response = "chain-response"
+    manifests_to_cache = 64
 
     def __init__(self):
         self.node = Node.get_instance()
+        self.cid_cache = CidCache.get_instance()
+        self.manifests = OrderedDict()  # (start, length, last block hash): manifest cid
 
     def validate(self, message: Message):
         blockchain: Blockchain = Blockchain.get_main_chain()
@@ -28,27 +39,130 @@ class ChainInfoRequestHandler(Handler):
         # TODO: check length
         return score_is_lower
 
-    def get_chain_info(self) -> Tuple[dict, dict]:
+    def get_chain_info(self, locator: list = None) -> Tuple[Optional[dict], dict]:
         """
-        Return blockchain block hashes
-        :return: tuple of chain info (block hashes) and chain summery (chain length and score)
+        Return blockchain blocks
+        :param locator: requester chain locator, only the blocks after the common ancestor
+            are sent (all the blocks if there is no locator)
+        :return: tuple of chain info (blockchain and first block index, None if the blocks
+            are pruned) and chain summery (chain length and score)
         """
         blockchain: Blockchain = Blockchain.get_main_chain()
-        blocks = blockchain.chain
+        first_index = blockchain.chain[0].index if len(blockchain.chain) else 0
         score = blockchain.score
         length = blockchain.length
-        return {"blocks": blocks}, {"score": score, "length": length}
-
-    def publish_chain_info(self, chain_info: dict) -> str:
-        blocks_cids = []
-        blocks_hashes = []
-        for block in chain_info["blocks"]:
-            block_dict = block.to_dict()
-            blocks_cids.append(self.node.create_cid(block_dict))
-            blocks_hashes.append(block.hash())
-        return self.node.create_cid(
-            {"blocks_cid": blocks_cids, "blocks_hash": blocks_hashes}
-        )
+        chain_summery = {"score": score, "length": length}
+        start = first_index
+        if locator:
+            start = blockchain.common_ancestor(locator) + 1
+            if start < first_index:
+                return None, chain_summery  # the blocks after the common ancestor are pruned
+        chain_info = {"blockchain": blockchain, "start": start, "length": length}
+        return chain_info, chain_summery
+
+    @staticmethod
+    def split_chunks(blocks_data: Iterable[bytes]) -> Iterator[List[bytes]]:
+        """
+        Group encoded blocks to chunks of at most Config.SYNC_CHUNK_BLOCKS blocks
+        and Config.SYNC_CHUNK_MAX_BYTES bytes
+        """
+        chunk = []
+        chunk_bytes = 0
+        for block_data in blocks_data:
+            if chunk and (
+                len(chunk) == Config.SYNC_CHUNK_BLOCKS
+                or chunk_bytes + len(block_data) > Config.SYNC_CHUNK_MAX_BYTES
+            ):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+            chunk.append(block_data)
+            chunk_bytes += len(block_data)
+        if chunk:
+            yield chunk
+
+    def publish_chain_info(self, chain_info: dict) -> Optional[str]:
+        """
+        Publish the chain as chunks of encoded blocks and a manifest of the chunks,
+        the manifest of the same blocks range is published once (until the chain tip changes)
+        :return: the manifest cid or None if the chain was replaced while publishing
+        """
+        blockchain: Blockchain = chain_info["blockchain"]
+        start, length = chain_info["start"], chain_info["length"]
+        # The chain may be extended while publishing, stop at the summery length
+        with blockchain.lock:
+            manifest_key = (start, length, blockchain.block_hashs[length - 1])
+        cid = self.manifests.get(manifest_key, None)
+        if cid is not None:
+            self.manifests.move_to_end(manifest_key)
+            return cid
+
+        chunks = []
+        segment_blocks = Config.SYNC_CHUNK_BLOCKS
+        segment_start = start
+        while segment_start < length:
+            # Segments are aligned to the chunk size, so requests with other start share them
+            segment_end = min(segment_start - segment_start % segment_blocks + segment_blocks, length)
+            segment_chunks = self.publish_segment(blockchain, segment_start, segment_end)
+            if segment_chunks is None:
+                return None
+            chunks.extend(segment_chunks)
+            segment_start = segment_end
+        cid = self.node.create_cid({"chunks": chunks})
+
+        self.manifests[manifest_key] = cid
+        if len(self.manifests) > self.manifests_to_cache:
+            self.manifests.popitem(last=False)
+        return cid
+
+    def chunks_available(self, chunks: List[dict]) -> bool:
+        """
+        :return: True if the IPFS node still has all the chunks (published chunks aren't pinned)
+        """
+        return all(self.node.has_cid(chunk["cid"]) for chunk in chunks)
+
+    def publish_segment(
+        self, blockchain: Blockchain, start: int, end: int
+    ) -> Optional[List[dict]]:
+        """
+        Publish the chunks of the blocks [start, end), the chunks cids are cached by the
+        segment last block hash (the blocks before it are linked to it by hash)
+        :return: the chunks manifest entries or None if the blocks read don't end at the
+                 segment last block hash (the chain storage was handed over to a new main chain)
+        """
+        with blockchain.lock:
+            block_hashs = blockchain.block_hashs[start:end]
+        last_hash = block_hashs[-1]
+        segment_key = f"chunks:{start}:{end}:{last_hash}"
+        if Config.SYNC_CHUNK_COMPRESSION:
+            segment_key += ":z"
+        chunks = self.cid_cache.get(segment_key, is_valid=self.chunks_available)
+        if chunks is not None:
+            return chunks
+
+        # Blocks are added and the storage is handed over to a new main chain under the lock
+        with blockchain.lock:
+            blocks_data = list(islice(blockchain.iter_blocks_data(start), end - start))
+
+        if len(blocks_data) != end - start or Block.from_bytes(blocks_data[-1]).hash() != last_hash:
+            logger.warning(f"Chain blocks [{start}, {end}) were replaced while publishing them")
+            return None
+
+        chunks = []
+        offset = 0
+        for chunk in self.split_chunks(blocks_data):
+            chunk_data = encode_chunk(chunk, compress=Config.SYNC_CHUNK_COMPRESSION)
+            chunks.append(
+                {
+                    "cid": self.node.create_raw_cid(chunk_data),
+                    "start": start + offset,
+                    "count": len(chunk),
+                    "last_hash": block_hashs[offset + len(chunk) - 1],
+                }
+            )
+            offset += len(chunk)
+        self.cid_cache.set(segment_key, chunks)
+        return chunks
 
     def send_cid_and_summery(self, cid: str, summery: dict):
         return self.node.publish_to_topic(
@@ -59,6 +173,10 @@ class ChainInfoRequestHandler(Handler):
         super().log(message)
         if not self.validate(message):
             return
-        chain_info, chain_summery = self.get_chain_info()
+        chain_info, chain_summery = self.get_chain_info(message.meta.get("locator", None))
+        if chain_info is None:
+            return
         cid = self.publish_chain_info(chain_info)
+        if cid is None:
+            return
         self.send_cid_and_summery(cid, chain_summery)
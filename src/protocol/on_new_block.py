@@ -3,7 +3,7 @@ Handle new block
 if new block is sent, the handler will execute those steps:
 1. validate message
 2. if block hash and index are relevant (block is needed and I don't have it yet)
-3. get new block via cid
+3. get new block (inline in the message or via cid)
 4. parse new block and verify it
 4. add block to chain
 """
@@ -23,15 +23,16 @@ class NewBlockHandler(Handler):
 
     def validate(self, message: Message):
         return (
-            message.has_cid() and "p_hash" in message.meta and "index" in message.meta
+            (message.has_data() or message.has_cid())
+            and "p_hash" in message.meta
+            and "index" in message.meta
         )
 
-    def load_block(self, message: Message) -> dict:
-        cid = message.get_cid()
-        return self.node.load_cid(cid)
+    def load_block(self, message: Message) -> bytes:
+        return self.node.load_payload(message)
 
-    def parse_block(self, block_dict: dict) -> Block:
-        return Block.from_dict(**block_dict)
+    def parse_block(self, block_data: bytes) -> Block:
+        return Block.from_bytes(block_data)
 
     def publish_event(self, block: Block):
         event_stream: EventStream = EventStream.get_instance()
@@ -41,6 +42,6 @@ class NewBlockHandler(Handler):
         super().log(message)
         if not self.validate(message):
             return
-        block_dict = self.load_block(message)
-        block = self.parse_block(block_dict)
+        block_data = self.load_block(message)
+        block = self.parse_block(block_data)
         self.publish_event(block)
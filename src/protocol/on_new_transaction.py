@@ -3,7 +3,7 @@ Handle new transaction
 When new transaction is sent, the handler will execute those steps:
 1. validate message
 2. if transaction hash and nonce are relevant (transaction is not stored yet and nonce is valid)
-3. get new transaction via cid
+3. get new transaction (inline in the message or via cid)
 4. parse new transaction and verify it
 4. add transaction to transaction pool
 """
@@ -21,14 +21,14 @@ class NewTransactionHandler(Handler):
         self.node = Node.get_instance()
 
     def validate(self, message: Message):
-        return message.has_cid() and "hash" in message.meta and "nonce" in message.meta
+        has_payload = message.has_data() or message.has_cid()
+        return has_payload and "hash" in message.meta and "nonce" in message.meta
 
-    def load_transaction(self, message: Message) -> dict:
-        cid = message.get_cid()
-        return self.node.load_cid(cid)
+    def load_transaction(self, message: Message) -> bytes:
+        return self.node.load_payload(message)
 
-    def parse_transaction(self, transaction_dict: dict) -> Transaction:
-        return Transaction.from_dict(**transaction_dict)
+    def parse_transaction(self, transaction_data: bytes) -> Transaction:
+        return Transaction.from_bytes(transaction_data)
 
     def publish_event(self, transaction: Transaction):
         event_stream: EventStream = EventStream.get_instance()
@@ -38,6 +38,6 @@ class NewTransactionHandler(Handler):
         super().log(message)
         if not self.validate(message):
             return
-        transaction_dict = self.load_transaction(message)
-        transaction = self.parse_transaction(transaction_dict)
+        transaction_data = self.load_transaction(message)
+        transaction = self.parse_transaction(transaction_data)
         self.publish_event(transaction)
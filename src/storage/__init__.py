@@ -1,3 +1,23 @@
-from .storage import Storage
+import os
 
-__all__ = ["Storage"]
+from config import Config
+
+from .block_store import BlockStore
+from .snapshot_store import SnapshotStore
+from .cid_cache import CidCache
+
+
+def setup_storage():
+    BlockStore(os.path.join(Config.DATA_DIR, "chain"))
+    SnapshotStore(
+        os.path.join(Config.DATA_DIR, "snapshots"), keep=Config.SNAPSHOTS_TO_KEEP
+    )
+    CidCache(os.path.join(Config.DATA_DIR, "cids.log"), capacity=Config.CID_CACHE_SIZE)
+
+
+def close_storage():
+    BlockStore.get_instance().close()
+    CidCache.get_instance().close()
+
+
+__all__ = ["BlockStore", "SnapshotStore", "CidCache", "setup_storage", "close_storage"]
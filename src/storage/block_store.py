@@ -0,0 +1,161 @@
+"""
+This class is responsible for managing the blocks on disk
+
+blocks file: append only log of length prefixed records
+    [4 bytes record length][record bytes] ...
+index file: fixed size entry per block index
+    [8 bytes blocks file offset][32 bytes block hash] ...
+
+The index is loaded to memory on open (block index -> offset, block hash -> index)
+so reading a block is a single seek in the blocks file.
+"""
+import os
+import struct
+from array import array
+from threading import Lock
+from typing import Dict, Iterator, Optional
+
+__all__ = ["BlockStore"]
+
+RECORD_HEADER = struct.Struct(">I")
+INDEX_ENTRY = struct.Struct(">Q32s")
+
+BLOCKS_FILENAME = "blocks.log"
+INDEX_FILENAME = "blocks.idx"
+
+
+class BlockStore:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            raise RuntimeError(f"{cls.__name__} is not initialized yet!")
+        return cls._instance
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = Lock()
+
+        self._offsets = array("Q")  # block index: blocks file offset
+        self._hashes: Dict[str, int] = {}  # block hash: block index
+
+        self._blocks_file = open(os.path.join(directory, BLOCKS_FILENAME), "a+b")
+        self._index_file = open(os.path.join(directory, INDEX_FILENAME), "a+b")
+        self._load_index()
+
+        self.__class__._instance = self
+
+    def _load_index(self):
+        self._index_file.seek(0)
+        index_data = self._index_file.read()
+        blocks_file_size = os.fstat(self._blocks_file.fileno()).st_size
+        entries_count = len(index_data) // INDEX_ENTRY.size
+        expected_offset = 0
+        for index in range(entries_count):
+            offset, block_hash = INDEX_ENTRY.unpack_from(
+                index_data, index * INDEX_ENTRY.size
+            )
+            record_end = self._record_end(offset, blocks_file_size)
+            if offset != expected_offset or record_end is None:
+                break
+            self._offsets.append(offset)
+            self._hashes[block_hash.hex()] = index
+            expected_offset = record_end
+        # Drop entries and records that were not fully written (crash while appending)
+        self._truncate_files(len(self._offsets))
+
+    def _record_end(self, offset: int, blocks_file_size: int) -> Optional[int]:
+        if offset + RECORD_HEADER.size > blocks_file_size:
+            return None
+        self._blocks_file.seek(offset)
+        (length,) = RECORD_HEADER.unpack(self._blocks_file.read(RECORD_HEADER.size))
+        record_end = offset + RECORD_HEADER.size + length
+        if record_end > blocks_file_size:
+            return None
+        return record_end
+
+    def _end_offset(self, length: int) -> int:
+        if length < len(self._offsets):
+            return self._offsets[length]
+        if not self._offsets:
+            return 0
+        self._blocks_file.seek(self._offsets[-1])
+        (last_length,) = RECORD_HEADER.unpack(self._blocks_file.read(RECORD_HEADER.size))
+        return self._offsets[-1] + RECORD_HEADER.size + last_length
+
+    def _truncate_files(self, length: int):
+        self._blocks_file.truncate(self._end_offset(length))
+        self._index_file.truncate(length * INDEX_ENTRY.size)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def append(self, block_hash: str, data: bytes) -> int:
+        """
+        Append block record to the end of the log
+        :param block_hash: block hash (hex)
+        :param data: serialized block
+        :return: the block index
+        """
+        with self._lock:
+            self._blocks_file.seek(0, os.SEEK_END)
+            offset = self._blocks_file.tell()
+            self._blocks_file.write(RECORD_HEADER.pack(len(data)) + data)
+            self._blocks_file.flush()
+            # The index entry is written last, so a record without entry is ignored on load
+            self._index_file.write(INDEX_ENTRY.pack(offset, bytes.fromhex(block_hash)))
+            self._index_file.flush()
+
+            index = len(self._offsets)
+            self._offsets.append(offset)
+            self._hashes[block_hash] = index
+            return index
+
+    def read(self, index: int) -> bytes:
+        """
+        Read block record
+        :param index: block index
+        :raise IndexError: when the block is not stored
+        :return: serialized block
+        """
+        with self._lock:
+            offset = self._offsets[index]
+            self._blocks_file.seek(offset)
+            (length,) = RECORD_HEADER.unpack(self._blocks_file.read(RECORD_HEADER.size))
+            return self._blocks_file.read(length)
+
+    def read_range(self, start: int, stop: int) -> Iterator[bytes]:
+        for index in range(start, min(stop, len(self))):
+            yield self.read(index)
+
+    def index_of(self, block_hash: str) -> Optional[int]:
+        return self._hashes.get(block_hash, None)
+
+    def block_hash(self, index: int) -> str:
+        with self._lock:
+            self._index_file.seek(index * INDEX_ENTRY.size)
+            _, block_hash = INDEX_ENTRY.unpack(self._index_file.read(INDEX_ENTRY.size))
+            return block_hash.hex()
+
+    def truncate(self, length: int):
+        """
+        Remove all the blocks from index <length> and above (used on chain fork)
+        :param length: the new store length
+        """
+        with self._lock:
+            if length >= len(self._offsets):
+                return
+            self._truncate_files(length)
+            del self._offsets[length:]
+            self._hashes = {
+                block_hash: index
+                for block_hash, index in self._hashes.items()
+                if index < length
+            }
+
+    def close(self):
+        with self._lock:
+            self._blocks_file.close()
+            self._index_file.close()
@@ -0,0 +1,160 @@
+"""
+This class is responsible for remembering the CIDs of data this node already published
+to IPFS (chain sync chunks), so immutable data is not encoded and uploaded again.
+
+cids file: append only log of json lines
+    {"key": <key>, "value": <cid or any json value>}  (null value: the entry was removed)
+The log is loaded to memory on open (a line that was not fully written, crash while
+appending, is skipped) and rewritten with only the live entries (also on close, in the
+recently used order).
+Only the <capacity> most recently used entries are kept, the log is compacted again when
+it has twice that many lines.
+IPFS may garbage collect published data, so an entry can be checked before it is used
+(see get), stale entries are removed.
+"""
+import os
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Set
+
+__all__ = ["CidCache"]
+
+
+class CidCache:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            raise RuntimeError(f"{cls.__name__} is not initialized yet!")
+        return cls._instance
+
+    def __init__(self, path: str = None, capacity: int = 10000):
+        """
+        :param path: cids file path (None for memory only cache)
+        :param capacity: max entries (least recently used are removed)
+        """
+        self.path = path
+        self.capacity = capacity
+        self._lock = Lock()
+        self._values: Dict[str, Any] = OrderedDict()  # least recently used first
+        self._checked: Set[str] = set()  # keys that are valid in this run
+        self._log_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+        self._file = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._load()
+            self._compact()
+
+        self.__class__._instance = self
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as cids_file:
+            for line in cids_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._values.pop(entry["key"], None)
+                if entry["value"] is not None:
+                    self._values[entry["key"]] = entry["value"]
+        while len(self._values) > self.capacity:
+            self._values.popitem(last=False)
+
+    def _compact(self):
+        """
+        Rewrite the log with the live entries only (temp file and rename)
+        """
+        if self._file is not None:
+            self._file.close()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as cids_file:
+            for key, value in self._values.items():
+                cids_file.write(json.dumps({"key": key, "value": value}) + "\n")
+            cids_file.flush()
+            os.fsync(cids_file.fileno())
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "a")
+        self._log_lines = len(self._values)
+
+    def _append(self, key: str, value: Any):
+        if self._file is None:
+            return
+        self._file.write(json.dumps({"key": key, "value": value}) + "\n")
+        self._file.flush()
+        self._log_lines += 1
+        if self._log_lines > 2 * self.capacity:
+            self._compact()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key: str, is_valid: Callable[[Any], bool] = None) -> Optional[Any]:
+        """
+        :param is_valid: check the value can still be used (once per entry until restart),
+                         an invalid entry is removed
+        """
+        with self._lock:
+            value = self._values.get(key, None)
+            if value is not None:
+                self._values.move_to_end(key)
+            checked = key in self._checked
+        if value is not None and is_valid is not None and not checked:
+            if is_valid(value):
+                with self._lock:
+                    if key in self._values:
+                        self._checked.add(key)
+            else:
+                self.discard(key)
+                with self._lock:
+                    self.stale += 1
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            self._checked.add(key)
+            self._append(key, value)
+            while len(self._values) > self.capacity:
+                old_key, _ = self._values.popitem(last=False)
+                self._checked.discard(old_key)
+                self._append(old_key, None)  # not loaded again on restart
+
+    def discard(self, key: str):
+        with self._lock:
+            if self._values.pop(key, None) is None:
+                return
+            self._checked.discard(key)
+            self._append(key, None)
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
+
+    def close(self):
+        """
+        Rewrite the log in the current recently used order and close it
+        """
+        with self._lock:
+            if self._file is not None:
+                self._compact()
+                self._file.close()
+                self._file = None
@@ -0,0 +1,92 @@
+"""
+This class is responsible for saving chain state snapshots on disk
+
+Every snapshot is a single file named by the chain length it was taken at
+    [64 bytes sha256 checksum (hex)][\n][snapshot json]
+Files are written to a temp file and renamed, so a crash never leaves half a snapshot.
+Saving a snapshot removes the snapshots of longer chains (a chain replaced by a shorter one
+with higher score), so the longest stored snapshot is always the most recent one.
+"""
+import os
+import json
+import hashlib
+from typing import Optional, List
+
+from loguru import logger
+
+__all__ = ["SnapshotStore"]
+
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".json"
+
+
+class SnapshotStore:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            raise RuntimeError(f"{cls.__name__} is not initialized yet!")
+        return cls._instance
+
+    def __init__(self, directory: str, keep: int = 2):
+        """
+        :param directory: snapshots directory
+        :param keep: how many snapshots to keep on disk (older are removed)
+        """
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+        self.__class__._instance = self
+
+    def _path(self, length: int) -> str:
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{length:012d}{SNAPSHOT_SUFFIX}")
+
+    def lengths(self) -> List[int]:
+        """
+        :return: chain lengths of the stored snapshots (newest first)
+        """
+        lengths = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SNAPSHOT_PREFIX) and filename.endswith(SNAPSHOT_SUFFIX):
+                lengths.append(int(filename[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]))
+        return sorted(lengths, reverse=True)
+
+    def save(self, length: int, snapshot: dict):
+        # Longer snapshots are of a replaced chain, remove them before this one is written
+        for stale_length in self.lengths():
+            if stale_length > length:
+                self.remove(stale_length)
+        payload = json.dumps(snapshot).encode()
+        checksum = hashlib.sha256(payload).hexdigest().encode()
+        path = self._path(length)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(checksum + b"\n" + payload)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+
+        for old_length in self.lengths()[self.keep:]:
+            self.remove(old_length)
+
+    def remove(self, length: int):
+        try:
+            os.remove(self._path(length))
+        except FileNotFoundError:
+            pass
+
+    def load(self, length: int) -> Optional[dict]:
+        """
+        :return: the snapshot or None if it is missing or corrupted
+        """
+        try:
+            with open(self._path(length), "rb") as snapshot_file:
+                checksum, payload = snapshot_file.read().split(b"\n", 1)
+        except (OSError, ValueError):
+            return None
+        if hashlib.sha256(payload).hexdigest().encode() != checksum:
+            logger.warning(f"Snapshot at length {length} is corrupted (checksum mismatch)")
+            return None
+        return json.loads(payload)
@@ -0,0 +1,73 @@
+import binascii
+from collections import OrderedDict
+from threading import Lock
+
+import ecdsa
+from ecdsa.ellipticcurve import PointJacobi
+
+
+class VerifyingKeyCache:
+    """
+    Bounded LRU cache of parsed verifying keys by public address.
+    Parsing a compressed key decompresses the curve point, so repeated senders and forgers
+    skip it. Keys that are used <precompute_after> times get precomputed point tables
+    (faster verification for hot keys, costs memory so not done for every key).
+    """
+
+    def __init__(self, curve, capacity: int, precompute_after: int):
+        self.curve = curve
+        self.capacity = capacity
+        self.precompute_after = precompute_after
+        self._keys: "OrderedDict[str, list]" = OrderedDict()  # address: [key, uses]
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _parse(self, public_address: str) -> ecdsa.VerifyingKey:
+        return ecdsa.VerifyingKey.from_string(
+            binascii.unhexlify(public_address),
+            curve=self.curve,
+            valid_encodings=["compressed", "raw"],
+        )
+
+    def _precompute(self, verifying_key: ecdsa.VerifyingKey):
+        # VerifyingKey.precompute() fails for keys parsed from string (the point has no order)
+        point = verifying_key.pubkey.point
+        precomputed_point = PointJacobi(
+            point.curve(), point.x(), point.y(), 1, self.curve.order, generator=True
+        )
+        precomputed_point * 2  # build the tables now, not on first verification
+        verifying_key.pubkey.point = precomputed_point
+
+    def get(self, public_address: str) -> ecdsa.VerifyingKey:
+        with self._lock:
+            entry = self._keys.get(public_address, None)
+            if entry is not None:
+                self._keys.move_to_end(public_address)
+                self.hits += 1
+                entry[1] += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            if entry[1] == self.precompute_after:
+                self._precompute(entry[0])
+            return entry[0]
+
+        verifying_key = self._parse(public_address)
+        with self._lock:
+            self._keys[public_address] = [verifying_key, 1]
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+        return verifying_key
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
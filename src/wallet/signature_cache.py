@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Tuple
+
+
+class SignatureCache:
+    """
+    Bounded LRU cache of successful signature verifications.
+    Key is (public key, hash, signature), so a cache hit means that exact signature
+    was already verified for that exact hash.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._verified: "OrderedDict[Tuple[str, str, bytes], None]" = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._verified)
+
+    def contains(self, verifying_key: str, signature: bytes, hash_str: str) -> bool:
+        key = (verifying_key, hash_str, signature)
+        with self._lock:
+            if key in self._verified:
+                self._verified.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, verifying_key: str, signature: bytes, hash_str: str):
+        key = (verifying_key, hash_str, signature)
+        with self._lock:
+            self._verified[key] = None
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.capacity:
+                self._verified.popitem(last=False)
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
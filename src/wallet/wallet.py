@@ -1,8 +1,9 @@
 from loguru import logger
 import ecdsa
-import binascii
 
 from config import Config
+from .signature_cache import SignatureCache
+from .key_cache import VerifyingKeyCache
 
 
 def decode_signature(sig, o):
@@ -16,6 +17,12 @@ def encode_signature(r, s, o):
 
 class Wallet:
     main_wallet = None
+    signature_cache = SignatureCache(capacity=Config.SIGNATURE_CACHE_SIZE)
+    verifying_key_cache = VerifyingKeyCache(
+        curve=Config.ECDSA_CURVE,
+        capacity=Config.VERIFYING_KEY_CACHE_SIZE,
+        precompute_after=Config.VERIFYING_KEY_PRECOMPUTE_AFTER,
+    )
 
     @classmethod
     def get_main_wallet(cls):
@@ -64,12 +71,9 @@ class Wallet:
 
     @classmethod
     def verify_signature(cls, verifying_key: str, signature: str, hash_str: str):
-        public_key_string = binascii.unhexlify(verifying_key)
-        vk = ecdsa.VerifyingKey.from_string(
-            public_key_string,
-            curve=Config.ECDSA_CURVE,
-            valid_encodings=["compressed", "raw"],
-        )
+        if cls.signature_cache.contains(verifying_key, signature, hash_str):
+            return True
+        vk = cls.verifying_key_cache.get(verifying_key)
         try:
             vk.verify_digest(
                 signature, bytes.fromhex(hash_str), sigdecode=decode_signature
@@ -77,4 +81,5 @@ class Wallet:
         except ecdsa.BadSignatureError:
             return False
         else:
+            cls.signature_cache.add(verifying_key, signature, hash_str)
             return True
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other from the src directory (python main.py runs from there)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
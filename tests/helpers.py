@@ -0,0 +1,51 @@
+"""
+Wallets, transactions and blocks shared by the tests
+"""
+from typing import List
+
+from blockchain import Block, Blockchain
+from blockchain.transaction import Transaction
+from wallet import Wallet
+
+
+def create_wallets(name: str, count: int = 3) -> List[Wallet]:
+    """
+    :return: wallets with deterministic keys (the same for the same name and index)
+    """
+    return [Wallet(secret_passcode=f"{name} {index}") for index in range(count)]
+
+
+def create_transaction(
+    sender: Wallet, recipient: Wallet, nonce: int, amount=1, fee=None
+) -> Transaction:
+    transaction = Transaction(
+        sender=sender.public, recipient=recipient.public, amount=amount, nonce=nonce, fee=fee
+    )
+    transaction.signature = sender.sign(transaction.hash())
+    return transaction
+
+
+def forge_block(
+    blockchain: Blockchain, forger: Wallet, previous_hash: str = None, add: bool = True
+) -> Block:
+    """
+    Create the next block of the chain signed by the forger
+    :param add: add the block to the chain
+    """
+    block = blockchain.new_block(forger=forger.public, previous_hash=previous_hash)
+    block.signature = forger.sign(block.hash())
+    if add:
+        blockchain.add_block(block)
+    return block
+
+
+def forge_blocks(
+    blockchain: Blockchain, forgers: List[Wallet], count: int, first_forger: int = 0
+) -> List[Block]:
+    """
+    Add blocks to the chain, the forgers take turns
+    """
+    return [
+        forge_block(blockchain, forgers[(first_forger + index) % len(forgers)])
+        for index in range(count)
+    ]
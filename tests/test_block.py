@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from blockchain import Block
+from blockchain.transaction import Transaction
+from wallet import Wallet
+
+
+class BlockSizeTestCase(TestCase):
+    def setUp(self):
+        self.forger = Wallet(secret_passcode="forger")
+        self.block = Block(index=1, previous_hash="ab" * 32, forger=self.forger.public)
+
+    def create_transaction(self, nonce: int) -> Transaction:
+        transaction = Transaction(
+            sender=self.forger.public, recipient=self.forger.public, amount=1, nonce=nonce
+        )
+        transaction.signature = self.forger.sign(transaction.hash())
+        return transaction
+
+    def test_size_is_encoded_size(self):
+        self.block.add_transaction(self.create_transaction(1))
+        self.block.signature = self.forger.sign(self.block.hash())
+        self.assertEqual(self.block.size(), len(self.block.to_bytes()))
+
+    def test_size_changes_invalidate_the_cached_size(self):
+        unsigned_size = self.block.size()
+        self.block.signature = self.forger.sign(self.block.hash())
+        signed_size = self.block.size()
+        self.assertGreater(signed_size, unsigned_size)
+
+        self.block.add_transaction(self.create_transaction(1))
+        self.assertGreater(self.block.size(), signed_size)
+
+        self.block.transactions = []
+        self.assertEqual(self.block.size(), signed_size)
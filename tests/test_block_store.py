@@ -0,0 +1,80 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from storage import BlockStore
+from storage.block_store import BLOCKS_FILENAME, INDEX_FILENAME
+
+
+def block_record(index: int):
+    data = f"block {index}".encode() * (index + 1)
+    return hashlib.sha256(data).hexdigest(), data
+
+
+class BlockStoreTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = BlockStore(self.directory)
+        self.records = [block_record(index) for index in range(10)]
+        for block_hash, data in self.records:
+            self.store.append(block_hash, data)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.store.close()
+        self.store = BlockStore(self.directory)
+
+    def assert_stored(self, records):
+        self.assertEqual(len(self.store), len(records))
+        for index, (block_hash, data) in enumerate(records):
+            self.assertEqual(self.store.read(index), data)
+            self.assertEqual(self.store.block_hash(index), block_hash)
+            self.assertEqual(self.store.index_of(block_hash), index)
+
+    def test_append_and_read(self):
+        self.assert_stored(self.records)
+        self.assertEqual(list(self.store.read_range(3, 6)), [data for _, data in self.records[3:6]])
+        self.assertEqual(len(list(self.store.read_range(8, 20))), 2)
+        with self.assertRaises(IndexError):
+            self.store.read(10)
+
+    def test_reopen(self):
+        self.reopen()
+        self.assert_stored(self.records)
+
+    def test_truncate(self):
+        self.store.truncate(6)
+        self.assert_stored(self.records[:6])
+        self.assertIsNone(self.store.index_of(self.records[7][0]))
+
+        # Appended after the truncation point and kept after reopen
+        new_record = block_record(100)
+        self.assertEqual(self.store.append(*new_record), 6)
+        self.reopen()
+        self.assert_stored(self.records[:6] + [new_record])
+
+    def test_truncate_longer_length(self):
+        self.store.truncate(20)
+        self.assert_stored(self.records)
+
+    def test_partial_record_is_dropped_on_open(self):
+        # Crash after the record was written and before its index entry
+        with open(os.path.join(self.directory, BLOCKS_FILENAME), "ab") as blocks_file:
+            blocks_file.write(b"\x00\x00\x00\x10partial")
+        self.reopen()
+        self.assert_stored(self.records)
+        self.assertEqual(self.store.append(*block_record(100)), 10)
+
+    def test_partial_index_entry_is_dropped_on_open(self):
+        # Crash while writing the last index entry
+        index_path = os.path.join(self.directory, INDEX_FILENAME)
+        self.store.close()
+        with open(index_path, "r+b") as index_file:
+            index_file.truncate(os.path.getsize(index_path) - 5)
+        self.store = BlockStore(self.directory)
+        self.assert_stored(self.records[:9])
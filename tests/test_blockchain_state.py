@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from blockchain import Block, Blockchain, BlockchainState, DuplicateNonceError, ValidationError
+from blockchain.transaction import Transaction
+from wallet import Wallet
+
+from .helpers import create_transaction
+
+
+class BlockchainStateTestCase(TestCase):
+    def setUp(self):
+        self.forger = Wallet(secret_passcode="forger")
+        self.sender = Wallet(secret_passcode="sender")
+        self.recipient = Wallet(secret_passcode="recipient")
+        self.blockchain = Blockchain(branch=True)
+
+    def create_transaction(self, amount, nonce: int) -> Transaction:
+        return create_transaction(self.sender, self.recipient, nonce, amount=amount)
+
+    def create_block(self, transactions) -> Block:
+        block = Block(
+            index=self.blockchain.length,
+            previous_hash=self.blockchain.last_block.hash(),
+            forger=self.forger.public,
+            transactions=transactions,
+        )
+        block.signature = self.forger.sign(block.hash())
+        return block
+
+    def test_int_balances_are_exact(self):
+        amount = 2 ** 60 + 1  # not representable as float
+        self.blockchain.add_block(self.create_block([self.create_transaction(amount, 1)]))
+        balance = self.blockchain.wallets[self.recipient.public].balance
+        self.assertEqual(balance, amount + 1)  # test net wallets start with balance 1
+        self.assertIs(type(balance), int)
+
+        state = BlockchainState.from_dict(**self.blockchain._Blockchain__state.to_dict())
+        self.assertEqual(state.wallets[self.recipient.public].balance, amount + 1)
+
+    def test_invalid_block_leaves_state_unchanged(self):
+        self.blockchain.add_block(self.create_block([self.create_transaction(1, 1)]))
+        wallets = self.blockchain.wallets.to_list()
+        length = self.blockchain.length
+
+        # both transactions are valid against the state before the block
+        duplicate_nonce = [
+            self.create_transaction(1, 2),
+            self.create_transaction(1, 3),
+            self.create_transaction(2, 2),
+        ]
+        with self.assertRaises(DuplicateNonceError):
+            self.blockchain.add_block(self.create_block(duplicate_nonce))
+
+        self.assertEqual(self.blockchain.wallets.to_list(), wallets)
+        self.assertEqual(self.blockchain.length, length)
+        self.assertEqual(self.blockchain.wallets[self.sender.public].nonce_counter, 1)
+
+    def test_out_of_range_amount(self):
+        wallets = self.blockchain.wallets.to_list()
+        for amount in (10 ** 400, float("inf"), float("nan")):
+            with self.assertRaises(ValidationError):
+                self.blockchain.add_block(self.create_block([self.create_transaction(amount, 1)]))
+        self.assertEqual(self.blockchain.wallets.to_list(), wallets)
+
+    def test_snapshot_rebuilds_the_same_sum_tree(self):
+        for nonce, amount in enumerate((0.1, 3, 0.7, 2 ** 60, 0.2), 1):
+            self.blockchain.add_block(self.create_block([self.create_transaction(amount, nonce)]))
+        state = self.blockchain._Blockchain__state
+        restored = BlockchainState.from_dict(**state.to_dict())
+        self.assertEqual(restored.wallets_sum_tree.values, state.wallets_sum_tree.values)
+        self.assertEqual(restored.wallets_sum_tree._tree, state.wallets_sum_tree._tree)
+        self.assertEqual(restored.wallets_sum_tree.sum, state.wallets_sum_tree.sum)
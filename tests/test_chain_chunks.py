@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+from config import Config
+from blockchain import Blockchain
+from network.ipfs import Message
+from protocol.on_chain_info import ChainInfoHandler
+from protocol.on_chain_info_request import ChainInfoRequestHandler
+from storage import CidCache
+
+from .helpers import create_wallets, forge_blocks
+
+
+class MemoryNode:
+    """
+    IPFS node stand-in that keeps the published data in memory
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def create_raw_cid(self, data: bytes) -> str:
+        cid = hashlib.sha256(data).hexdigest()
+        self.objects[cid] = bytes(data)
+        self.uploads += 1
+        return cid
+
+    def create_cid(self, data: dict) -> str:
+        return self.create_raw_cid(json.dumps(data).encode())
+
+    def load_raw_cid(self, cid: str) -> bytes:
+        return self.objects[cid]
+
+    def load_cid(self, cid: str) -> dict:
+        return json.loads(self.load_raw_cid(cid))
+
+    def has_cid(self, cid: str) -> bool:
+        return cid in self.objects
+
+
+class ChainChunksTestCase(TestCase):
+    def setUp(self):
+        self.chunk_blocks = Config.SYNC_CHUNK_BLOCKS
+        Config.SYNC_CHUNK_BLOCKS = 4
+        self.forgers = create_wallets("forger")
+        self.blockchain = Blockchain(branch=True)
+        forge_blocks(self.blockchain, self.forgers, 10)
+
+        self.node = MemoryNode()
+        # The handlers are created without the node singletons
+        self.request_handler = object.__new__(ChainInfoRequestHandler)
+        self.request_handler.node = self.node
+        self.directory = tempfile.mkdtemp()
+        self.cids_path = os.path.join(self.directory, "cids")
+        self.request_handler.cid_cache = CidCache(self.cids_path)
+        self.request_handler.manifests = OrderedDict()
+        self.response_handler = object.__new__(ChainInfoHandler)
+        self.response_handler.node = self.node
+
+    def tearDown(self):
+        Config.SYNC_CHUNK_BLOCKS = self.chunk_blocks
+        self.request_handler.cid_cache.close()
+        shutil.rmtree(self.directory)
+
+    def publish(self, start: int = 0) -> str:
+        chain_info = {
+            "blockchain": self.blockchain,
+            "start": start,
+            "length": self.blockchain.length,
+        }
+        return self.request_handler.publish_chain_info(chain_info)
+
+    def load_blocks(self, cid: str):
+        return self.response_handler.load_chain_blocks(Message(cid=cid, meta={}))
+
+    def test_split_chunks(self):
+        blocks_data = [bytes(10)] * 9
+        chunks = list(ChainInfoRequestHandler.split_chunks(blocks_data))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 1])
+
+    def test_split_chunks_max_bytes(self):
+        max_bytes = Config.SYNC_CHUNK_MAX_BYTES
+        Config.SYNC_CHUNK_MAX_BYTES = 25
+        try:
+            chunks = list(ChainInfoRequestHandler.split_chunks([bytes(10)] * 3 + [bytes(30)]))
+        finally:
+            Config.SYNC_CHUNK_MAX_BYTES = max_bytes
+        # a block larger than the limit is sent in a chunk of its own
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1, 1])
+
+    def test_publish_and_load(self):
+        cid = self.publish()
+        manifest = self.node.load_cid(cid)
+        self.assertEqual([chunk["start"] for chunk in manifest["chunks"]], [0, 4, 8])
+        blocks = self.load_blocks(cid)
+        self.assertEqual([block.hash() for block in blocks], self.blockchain.block_hashs)
+
+    def test_published_chunks_are_reused(self):
+        self.publish()
+        uploads = self.node.uploads
+        self.assertEqual(self.publish(), self.publish())
+        self.assertEqual(self.node.uploads, uploads)
+
+        # Other start shares the aligned segments after its first segment
+        cid = self.publish(start=6)
+        self.assertEqual(self.node.uploads, uploads + 2)  # blocks 6-7 and the manifest
+        blocks = self.load_blocks(cid)
+        self.assertEqual([block.hash() for block in blocks], self.blockchain.block_hashs[6:])
+
+    def test_collected_chunks_are_published_again(self):
+        self.publish()
+        # IPFS garbage collected the published chunks while the node was down
+        self.node.objects.clear()
+        self.request_handler.cid_cache.close()
+        self.request_handler.cid_cache = CidCache(self.cids_path)
+        self.request_handler.manifests.clear()
+        cid = self.publish()
+        self.assertEqual(len(self.load_blocks(cid)), self.blockchain.length)
+
+    def test_chunk_not_matching_manifest(self):
+        cid = self.publish()
+        manifest = self.node.load_cid(cid)
+        manifest["chunks"][1]["last_hash"] = "00" * 32
+        blocks = self.load_blocks(self.node.create_cid(manifest))
+        # the chunks until the invalid one are loaded
+        self.assertEqual(len(blocks), 4)
+
+    def test_corrupted_chunk(self):
+        cid = self.publish()
+        chunk_cid = self.node.load_cid(cid)["chunks"][0]["cid"]
+        self.node.objects[chunk_cid] = self.node.objects[chunk_cid][:-10]
+        self.assertEqual(self.load_blocks(cid), [])
+
+    def test_malformed_manifest(self):
+        for manifest in ({}, {"chunks": [None]}, {"chunks": [{"cid": "missing"}]}):
+            self.assertEqual(self.load_blocks(self.node.create_cid(manifest)), [])
+
+    def test_is_chunk_valid(self):
+        blocks = self.blockchain.chain[4:8]
+        chunk = {"start": 4, "count": 4, "last_hash": blocks[-1].hash()}
+        previous_block = self.blockchain.chain[3]
+        self.assertTrue(ChainInfoHandler.is_chunk_valid(chunk, blocks, previous_block))
+        self.assertFalse(ChainInfoHandler.is_chunk_valid(chunk, blocks[:3], previous_block))
+        self.assertFalse(ChainInfoHandler.is_chunk_valid(chunk, blocks, self.blockchain.chain[2]))
+        self.assertFalse(ChainInfoHandler.is_chunk_valid(chunk, blocks[1:] + blocks[:1]))
+        self.assertFalse(ChainInfoHandler.is_chunk_valid(dict(chunk, start=5), blocks))
+
+    def test_replaced_blocks_are_not_published(self):
+        # The storage was handed over to a new main chain, only the last block is kept
+        self.blockchain.chain = [self.blockchain.last_block]
+        self.assertIsNone(self.publish())
+        self.assertEqual(len(self.request_handler.cid_cache), 0)
+        self.assertEqual(len(self.request_handler.manifests), 0)
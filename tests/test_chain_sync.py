@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from config import Config
+from blockchain import Blockchain, StoredChain, ValidationError
+from event_stream import EventStream
+from protocol.on_chain_info import ChainInfoHandler
+from storage import BlockStore
+
+from .helpers import create_wallets, forge_block, forge_blocks
+
+
+class AddChainTestCase(TestCase):
+    def setUp(self):
+        self.forgers = create_wallets("forger")
+        self.source = Blockchain(branch=True)
+        self.blocks = forge_blocks(self.source, self.forgers, 6)
+
+        self.directory = tempfile.mkdtemp()
+        self.store = BlockStore(self.directory)
+        self.blockchain = Blockchain(branch=True, stored_chain=StoredChain(self.store))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_add_chain(self):
+        self.blockchain.add_chain(self.blocks)
+
+        self.assertEqual(self.blockchain.length, 7)
+        self.assertEqual(self.blockchain.block_hashs, self.source.block_hashs)
+        self.assertEqual(len(self.store), 7)
+
+    def test_rejected_chunk_leaves_chain_unchanged(self):
+        self.blockchain.add_chain(self.blocks[:3])
+        block_hashs = list(self.blockchain.block_hashs)
+        score = self.blockchain.score
+
+        # Valid blocks and then a block that doesn't follow them
+        invalid_block = forge_block(self.source, self.forgers[0], "00" * 32, add=False)
+        with self.assertRaises(ValidationError):
+            self.blockchain.add_chain(self.blocks[3:] + [invalid_block])
+
+        self.assertEqual(self.blockchain.length, 4)
+        self.assertEqual(len(self.blockchain.chain), 4)
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.blockchain.block_hashs, block_hashs)
+        self.assertEqual(self.blockchain.score, score)
+        self.assertEqual(self.blockchain.last_block.hash(), self.blocks[2].hash())
+
+        # The chain continues from the last accepted block
+        self.blockchain.add_chain(self.blocks[3:])
+        self.assertEqual(self.blockchain.block_hashs, self.source.block_hashs)
+        self.assertEqual(len(self.store), 7)
+
+    def test_adopt_storage(self):
+        self.blockchain.add_chain(self.blocks[:5])
+        branch = self.blockchain.fork(3)
+        forge_blocks(branch, self.forgers, 4, first_forger=1)
+
+        branch.adopt_storage(self.blockchain)
+
+        self.assertEqual(len(self.store), branch.length)
+        self.assertEqual(
+            [self.store.block_hash(index) for index in range(len(self.store))], branch.block_hashs
+        )
+        # The replaced chain doesn't write to the storage anymore
+        self.blockchain.add_block(self.blocks[5])
+        self.assertEqual(len(self.store), branch.length)
+        self.assertEqual(self.store.block_hash(5), branch.block_hashs[5])
+
+
+class PrunedReorgTestCase(TestCase):
+    def setUp(self):
+        self.main_chain = Blockchain.get_main_chain()
+        self.forgers = create_wallets("forger")
+        source = Blockchain(branch=True)
+        self.blocks = forge_blocks(source, self.forgers, 6)
+        self.peer = source.fork(4)
+        # genesis and the common blocks, then the peer branch blocks
+        peer_branch_blocks = forge_blocks(self.peer, self.forgers, 5, first_forger=1)
+        self.peer_blocks = source.chain[:4] + peer_branch_blocks
+
+        self.is_full_node = Config.IS_FULL_NODE
+        Config.IS_FULL_NODE = False
+        self.blockchain = Blockchain(branch=True)
+        self.blockchain.add_chain(self.blocks)
+        Blockchain.set_main_chain(self.blockchain)
+
+        if EventStream._instance is None:
+            EventStream()
+        self.requests = EventStream.get_instance()._get_topic("invalid-network-block")
+        self.handler = object.__new__(ChainInfoHandler)
+
+    def tearDown(self):
+        Config.IS_FULL_NODE = self.is_full_node
+        Blockchain.set_main_chain(self.main_chain)
+
+    def test_fork_before_kept_blocks_requests_full_chain(self):
+        self.assertIsNone(self.blockchain.fork(4))
+        offset = self.requests.next_offset
+
+        self.assertEqual(self.handler.build_blockchain(iter([self.peer_blocks[4:]])), 0)
+
+        _, event = self.requests.get(offset, timeout=0)
+        self.assertTrue(event.args["full_chain"])
+        self.assertIs(Blockchain.get_main_chain(), self.blockchain)
+
+    def test_full_chain_response_replaces_pruned_chain(self):
+        self.handler.build_blockchain(iter([self.peer_blocks[4:]]))
+        offset = self.requests.next_offset
+
+        chunks = iter([self.peer_blocks[:4], self.peer_blocks[4:]])
+        self.assertEqual(self.handler.build_blockchain(chunks), self.peer.length - 1)
+
+        self.assertEqual(Blockchain.get_main_chain().block_hashs, self.peer.block_hashs)
+        self.assertEqual(self.requests.next_offset, offset)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from storage import CidCache
+
+
+class CidCacheTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cids")
+        self.cache = CidCache(self.path, capacity=3)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self) -> CidCache:
+        self.cache.close()
+        self.cache = CidCache(self.path, capacity=3)
+        return self.cache
+
+    def log_lines(self) -> int:
+        with open(self.path) as cids_file:
+            return sum(1 for _ in cids_file)
+
+    def test_set_and_get(self):
+        self.cache.set("a", "cid a")
+        self.cache.set("b", [{"cid": "cid b"}])
+        self.assertEqual(self.cache.get("a"), "cid a")
+        self.assertEqual(self.cache.get("b"), [{"cid": "cid b"}])
+        self.assertIsNone(self.cache.get("c"))
+        self.assertEqual(self.cache.metrics(), {"size": 2, "hits": 2, "misses": 1, "stale": 0})
+
+    def test_reload(self):
+        self.cache.set("a", "cid a")
+        self.cache.set("a", "new cid a")
+        self.cache.set("b", "cid b")
+        self.cache.discard("b")
+        cache = self.reopen()
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get("a"), "new cid a")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(self.log_lines(), 1)  # compacted on open
+
+    def test_partially_written_line(self):
+        self.cache.set("a", "cid a")
+        self.cache.close()
+        with open(self.path, "a") as cids_file:
+            cids_file.write('{"key": "b", "val')
+        self.assertEqual(self.reopen().get("a"), "cid a")
+
+    def test_least_recently_used_are_removed(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+        self.cache.get("a")
+        self.cache.set("d", "d")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(len(self.cache), 3)
+        # the evicted entry isn't loaded again, also when the cache wasn't closed (crash)
+        crashed = CidCache(self.path, capacity=3)
+        self.assertIsNone(crashed.get("b"))
+        crashed.close()
+        self.assertEqual(sorted(self.reopen()._values), ["a", "c", "d"])
+
+    def test_recently_used_order_is_kept_on_close(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+        self.cache.get("a")
+        cache = self.reopen()
+        cache.set("d", "d")
+        self.assertEqual(list(cache._values), ["c", "a", "d"])
+
+    def test_log_compaction(self):
+        for index in range(7):
+            self.cache.set(f"key {index}", index)
+        # compacted when the log passed twice the capacity
+        self.assertLessEqual(self.log_lines(), 6)
+        self.assertEqual(self.cache.get("key 6"), 6)
+
+    def test_stale_entry(self):
+        self.cache.set("a", "cid a")
+        cache = self.reopen()
+        checked = []
+
+        def is_valid(value) -> bool:
+            checked.append(value)
+            return False
+
+        self.assertIsNone(cache.get("a", is_valid=is_valid))
+        self.assertEqual(checked, ["cid a"])
+        self.assertEqual(cache.metrics()["stale"], 1)
+        self.assertIsNone(self.reopen().get("a"))
+
+    def test_valid_entry_is_checked_once(self):
+        self.cache.set("a", "cid a")
+        cache = self.reopen()
+        checked = []
+
+        def is_valid(value) -> bool:
+            checked.append(value)
+            return True
+
+        self.assertEqual(cache.get("a", is_valid=is_valid), "cid a")
+        self.assertEqual(cache.get("a", is_valid=is_valid), "cid a")
+        self.assertEqual(checked, ["cid a"])
+
+    def test_memory_only(self):
+        cache = CidCache(capacity=2)
+        cache.set("a", "cid a")
+        self.assertEqual(cache.get("a"), "cid a")
+        cache.close()
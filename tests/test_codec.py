@@ -0,0 +1,150 @@
+import zlib
+from unittest import TestCase
+
+from config import Config
+from blockchain import Block
+from blockchain.codec import (
+    CodecError,
+    decode_block,
+    decode_chunk,
+    decode_transaction,
+    encode_block,
+    encode_chunk,
+    encode_transaction,
+    max_chunk_payload_size,
+)
+from blockchain.transaction import Transaction
+from wallet import Wallet
+
+
+class CodecTestCase(TestCase):
+    def setUp(self):
+        self.sender = Wallet(secret_passcode="sender")
+        self.recipient = Wallet(secret_passcode="recipient")
+
+    def create_transaction(self, **kwargs) -> Transaction:
+        fields = dict(sender=self.sender.public, recipient=self.recipient.public, amount=10, nonce=1)
+        fields.update(kwargs)
+        transaction = Transaction(**fields)
+        transaction.signature = self.sender.sign(transaction.hash())
+        return transaction
+
+    def create_block(self) -> Block:
+        block = Block(
+            index=3,
+            previous_hash="ab" * 32,
+            forger=self.sender.public,
+            transactions=[
+                self.create_transaction(),
+                self.create_transaction(amount=2.5, fee=0.5, nonce=2),
+                self.create_transaction(recipient="not hex", amount=-1, nonce=3),
+            ],
+        )
+        block.signature = self.sender.sign(block.hash())
+        return block
+
+    def test_transaction_round_trip(self):
+        transaction = self.create_transaction(amount=2.5, fee=0)
+        decoded = Transaction.from_bytes(encode_transaction(transaction))
+        self.assertEqual(decoded.to_dict(), transaction.to_dict())
+        self.assertEqual(decoded.hash(), transaction.hash())
+        self.assertEqual(type(decoded.fee), int)
+
+    def test_block_round_trip(self):
+        block = self.create_block()
+        decoded = Block.from_bytes(encode_block(block))
+        self.assertEqual(decoded.to_dict(), block.to_dict())
+        self.assertEqual(decoded.hash(), block.hash())
+        self.assertEqual(decoded.signature, block.signature)
+
+    def test_unsigned_block(self):
+        block = Block(index=0, previous_hash="0", forger=None)
+        self.assertIsNone(decode_block(encode_block(block))["signature"])
+
+    def test_invalid_magic(self):
+        data = encode_transaction(self.create_transaction())
+        with self.assertRaises(CodecError):
+            decode_block(data)
+
+    def test_unsupported_version(self):
+        data = bytearray(encode_block(self.create_block()))
+        data[2] += 1
+        with self.assertRaises(CodecError):
+            decode_block(bytes(data))
+
+    def test_truncated_data(self):
+        data = encode_block(self.create_block())
+        for size in (3, len(data) // 2, len(data) - 1):
+            with self.assertRaises(CodecError):
+                decode_block(data[:size])
+
+    def test_trailing_data(self):
+        with self.assertRaises(CodecError):
+            decode_transaction(encode_transaction(self.create_transaction()) + b"\x00")
+
+    def test_unknown_tag(self):
+        data = bytearray(encode_transaction(self.create_transaction()))
+        data[3] = 0xFF  # sender string tag
+        with self.assertRaises(CodecError):
+            decode_transaction(bytes(data))
+
+    def test_unencodable_transaction(self):
+        with self.assertRaises(CodecError):
+            encode_transaction(self.create_transaction(amount="10"))
+
+
+class ChunkCodecTestCase(TestCase):
+    blocks_data = [b"block 1", b"block 2" * 100, b""]
+
+    def test_round_trip(self):
+        for compress in (True, False):
+            data = encode_chunk(self.blocks_data, compress=compress)
+            self.assertEqual(decode_chunk(data), self.blocks_data)
+
+    def test_size_limit(self):
+        for compress in (True, False):
+            data = encode_chunk(self.blocks_data, compress=compress)
+            with self.assertRaises(CodecError):
+                decode_chunk(data, max_size=100)
+
+    def test_decompression_bomb(self):
+        data = encode_chunk([bytes(10 ** 7)])
+        self.assertLess(len(data), 20000)
+        with self.assertRaises(CodecError):
+            decode_chunk(data)
+        self.assertLess(max_chunk_payload_size(), 2 * 10 ** 6)
+
+    def test_block_size_limit(self):
+        for compress in (True, False):
+            data = encode_chunk([bytes(Config.MAX_BLOCK_BYTES + 1)], compress=compress)
+            with self.assertRaises(CodecError):
+                decode_chunk(data)
+
+    def test_blocks_count_limit(self):
+        data = encode_chunk([b""] * (Config.SYNC_CHUNK_BLOCKS + 1))
+        with self.assertRaises(CodecError):
+            decode_chunk(data)
+
+    def test_truncated_chunk(self):
+        data = encode_chunk(self.blocks_data)
+        with self.assertRaises(CodecError):
+            decode_chunk(data[:-5])
+        with self.assertRaises(CodecError):
+            decode_chunk(encode_chunk(self.blocks_data, compress=False)[:-1])
+
+    def test_trailing_data(self):
+        with self.assertRaises(CodecError):
+            decode_chunk(encode_chunk(self.blocks_data) + b"\x00")
+        with self.assertRaises(CodecError):
+            decode_chunk(encode_chunk(self.blocks_data, compress=False) + b"\x00")
+
+    def test_invalid_compressed_data(self):
+        data = encode_chunk(self.blocks_data)
+        with self.assertRaises(CodecError):
+            decode_chunk(data[:4] + zlib.compress(b"x")[:2] + b"\xff" * 10)
+
+    def test_unknown_compression(self):
+        data = bytearray(encode_chunk(self.blocks_data))
+        data[3] = 9
+        with self.assertRaises(CodecError):
+            decode_chunk(bytes(data))
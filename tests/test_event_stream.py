@@ -0,0 +1,75 @@
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+
+from event_stream.multi_subscribers_queue import MultiSubscribersQueue
+
+
+class MultiSubscribersQueueTestCase(TestCase):
+    def test_get_published_event(self):
+        queue = MultiSubscribersQueue()
+        queue.put("event 0")
+        queue.put("event 1")
+        self.assertEqual(queue.get(1), (1, "event 1"))
+        self.assertEqual(queue.get(2, timeout=0.01), (2, None))
+
+    def test_get_wakes_waiting_subscriber(self):
+        queue = MultiSubscribersQueue()
+        received = []
+        subscriber = Thread(target=lambda: received.append(queue.get(0, timeout=5)))
+        subscriber.start()
+        queue.put("event 0")
+        subscriber.join()
+        self.assertEqual(received, [(0, "event 0")])
+
+    def test_close_wakes_waiting_subscriber(self):
+        queue = MultiSubscribersQueue()
+        received = []
+        subscriber = Thread(target=lambda: received.append(queue.get(0)))
+        subscriber.start()
+        queue.close()
+        subscriber.join(5)
+        self.assertEqual(received, [(0, None)])
+
+    def test_consumed_events_are_removed(self):
+        queue = MultiSubscribersQueue()
+        for index in range(3):
+            queue.put(index)
+        queue.get(0, subscriber_id="a")
+        queue.get(2, subscriber_id="b")
+        self.assertEqual(queue.base_offset, 0)
+        queue.get(1, subscriber_id="a")
+        self.assertEqual(queue.base_offset, 1)
+        self.assertEqual(queue.metrics()["subscribers_lag"], {"a": 2, "b": 1})
+
+    def test_events_are_kept_without_subscribers(self):
+        queue = MultiSubscribersQueue()
+        for index in range(3):
+            queue.put(index)
+        self.assertEqual(queue.get(0), (0, 0))
+
+    def test_capacity_drops_lagging_subscriber_events(self):
+        queue = MultiSubscribersQueue(capacity=2)
+        queue.get(0, subscriber_id="slow", timeout=0)
+        for index in range(5):
+            queue.put(index)
+        self.assertEqual(len(queue.events), 2)
+        self.assertEqual(queue.get(0, subscriber_id="slow"), (3, 3))
+        self.assertEqual(queue.metrics()["dropped_events"], {"slow": 3})
+
+    def test_retention(self):
+        queue = MultiSubscribersQueue(retention=0.01)
+        queue.put("old")
+        sleep(0.02)
+        queue.put("new")
+        self.assertEqual(queue.get(0), (1, "new"))
+
+    def test_unsubscribe(self):
+        queue = MultiSubscribersQueue()
+        for index in range(3):
+            queue.put(index)
+        queue.get(0, subscriber_id="a")
+        queue.get(2, subscriber_id="b")
+        queue.unsubscribe("a")
+        queue.put(3)
+        self.assertEqual(queue.base_offset, 2)
@@ -0,0 +1,147 @@
+from unittest import TestCase
+
+from blockchain.exceptions import (
+    InsufficientBalanceError,
+    MempoolFullError,
+    ReplacementFeeTooLowError,
+)
+from blockchain.mempool import Mempool, SenderQueue
+from blockchain.transaction import Transaction
+
+from .helpers import create_transaction, create_wallets
+
+
+class MempoolTestCase(TestCase):
+    def setUp(self):
+        self.wallets = create_wallets("wallet")
+        self.mempool = Mempool(capacity=4)
+
+    def create_transaction(self, sender: int, nonce: int, fee=1, amount=1) -> Transaction:
+        recipient = self.wallets[(sender + 1) % len(self.wallets)]
+        return create_transaction(self.wallets[sender], recipient, nonce, amount=amount, fee=fee)
+
+    def test_add(self):
+        transaction = self.create_transaction(0, 1)
+        self.assertTrue(self.mempool.add(transaction))
+        self.assertFalse(self.mempool.add(transaction))
+        self.assertIn(transaction.hash(), self.mempool)
+        self.assertEqual(len(self.mempool), 1)
+
+    def test_sender_queue_nonce_order(self):
+        for nonce in (3, 1, 2):
+            self.mempool.add(self.create_transaction(0, nonce))
+        queue = self.mempool.senders[self.wallets[0].public]
+        self.assertEqual([transaction.nonce for transaction in queue], [1, 2, 3])
+
+    def test_sender_queue_remove(self):
+        queue = SenderQueue()
+        for nonce in range(20):
+            queue.add(self.create_transaction(0, nonce))
+        for nonce in range(0, 20, 2):
+            queue.remove(nonce)
+        self.assertEqual([transaction.nonce for transaction in queue], list(range(1, 20, 2)))
+        self.assertIsNone(queue.get(2))
+
+    def test_replace_by_fee(self):
+        original = self.create_transaction(0, 1, fee=1)
+        replacement = self.create_transaction(0, 1, fee=2)
+        self.mempool.add(original)
+        self.mempool.add(replacement)
+        self.assertNotIn(original.hash(), self.mempool)
+        self.assertIn(replacement.hash(), self.mempool)
+        self.assertEqual(self.mempool.metrics()["replaced"], 1)
+
+    def test_replacement_fee_too_low(self):
+        self.mempool.add(self.create_transaction(0, 1, fee=2))
+        with self.assertRaises(ReplacementFeeTooLowError):
+            self.mempool.add(self.create_transaction(0, 1, fee=2, amount=5))
+        self.assertEqual(len(self.mempool), 1)
+
+    def test_full_pool_evicts_lowest_fee(self):
+        for nonce, fee in enumerate((3, 1, 4, 2), 1):
+            self.mempool.add(self.create_transaction(0, nonce, fee=fee))
+        lowest = self.mempool.senders[self.wallets[0].public].get(2)
+        transaction = self.create_transaction(1, 1, fee=5)
+        self.mempool.add(transaction)
+        self.assertEqual(len(self.mempool), 4)
+        self.assertNotIn(lowest.hash(), self.mempool)
+        self.assertIn(transaction.hash(), self.mempool)
+        self.assertEqual(self.mempool.metrics()["evicted"], 1)
+
+    def test_full_pool_rejects_low_fee(self):
+        for nonce in range(1, 5):
+            self.mempool.add(self.create_transaction(0, nonce, fee=2))
+        with self.assertRaises(MempoolFullError):
+            self.mempool.add(self.create_transaction(1, 1, fee=2))
+
+    def test_removed_transactions_are_not_evicted(self):
+        transactions = [self.create_transaction(0, nonce, fee=nonce) for nonce in range(1, 5)]
+        for transaction in transactions:
+            self.mempool.add(transaction)
+        self.mempool.remove(transactions[0].hash())
+        self.mempool.add(self.create_transaction(1, 1, fee=1))
+        # the pool is full again, the lowest live fee is the new transaction (fee 1)
+        with self.assertRaises(MempoolFullError):
+            self.mempool.add(self.create_transaction(2, 1, fee=1))
+        self.mempool.add(self.create_transaction(2, 1, fee=3))
+        self.assertEqual(self.mempool.metrics()["senders"], 2)
+
+    def test_remove_included(self):
+        pending = self.create_transaction(0, 1, fee=1)
+        self.mempool.add(pending)
+        self.mempool.add(self.create_transaction(0, 2))
+        # other transaction with the same nonce was included in a block
+        self.mempool.remove_included([self.create_transaction(0, 1, fee=3)])
+        self.assertNotIn(pending.hash(), self.mempool)
+        self.assertEqual(len(self.mempool), 1)
+
+    def test_select_highest_fee_per_byte_first(self):
+        low = self.create_transaction(0, 1, fee=1)
+        high = self.create_transaction(1, 1, fee=3)
+        middle = self.create_transaction(2, 1, fee=2)
+        for transaction in (low, high, middle):
+            self.mempool.add(transaction)
+        self.assertEqual(self.mempool.select(), [high, middle, low])
+        self.assertEqual(self.mempool.select(max_transactions=2), [high, middle])
+
+    def test_select_sender_nonce_order(self):
+        # the high fee transaction can't be included before the sender lower nonce
+        first = self.create_transaction(0, 1, fee=1)
+        second = self.create_transaction(0, 2, fee=5)
+        other = self.create_transaction(1, 1, fee=2)
+        for transaction in (second, first, other):
+            self.mempool.add(transaction)
+        self.assertEqual(self.mempool.select(), [other, first, second])
+
+    def test_select_max_bytes(self):
+        large = self.create_transaction(0, 1, fee=100, amount=10.5)  # float amount takes more bytes
+        small = self.create_transaction(1, 1, fee=1)
+        following = self.create_transaction(0, 2, fee=100)
+        for transaction in (large, small, following):
+            self.mempool.add(transaction)
+        self.assertGreater(large.size(), small.size())
+        selected = self.mempool.select(max_bytes=large.size() - 1)
+        # the large transaction is skipped with the rest of its sender transactions
+        self.assertEqual(selected, [small])
+        self.assertEqual(self.mempool.select(max_bytes=0), [])
+
+    def test_revalidate_senders(self):
+        transactions = [self.create_transaction(0, nonce, amount=nonce) for nonce in range(1, 4)]
+        other = self.create_transaction(1, 1, amount=10)
+        for transaction in transactions + [other]:
+            self.mempool.add(transaction)
+        checked = []
+
+        def validate(transaction: Transaction):
+            checked.append(transaction)
+            if transaction.amount > 1:
+                raise InsufficientBalanceError("balance is too low")
+
+        senders = [self.wallets[0].public, self.wallets[2].public]
+        removed = self.mempool.revalidate_senders(senders, validate)
+        # only the given senders transactions are checked
+        self.assertEqual(checked, transactions)
+        self.assertEqual(removed, transactions[1:])
+        self.assertEqual(len(self.mempool), 2)
+        self.assertIn(other.hash(), self.mempool)
+        self.assertEqual(self.mempool.metrics()["invalidated"], 2)
@@ -0,0 +1,36 @@
+import json
+from base64 import b64encode
+from unittest import TestCase
+
+from config import Config
+from network.ipfs import Message
+from network.ipfs.api import INLINE_PAYLOAD_RECEIVE_MAX_BYTES
+
+
+class MessageTestCase(TestCase):
+    def setUp(self):
+        self.inline_max_bytes = Config.INLINE_PAYLOAD_MAX_BYTES
+        Config.INLINE_PAYLOAD_MAX_BYTES = 16
+
+    def tearDown(self):
+        Config.INLINE_PAYLOAD_MAX_BYTES = self.inline_max_bytes
+
+    @staticmethod
+    def message_json(data) -> str:
+        return json.dumps({"meta": {"node_id": "node"}, "cid": None, "data": data})
+
+    def test_inline_data_above_send_threshold(self):
+        # other nodes may send bigger inline payloads than this node does
+        payload = bytes(range(256)) * 4
+        message = Message.from_json(self.message_json(b64encode(payload).decode()))
+        self.assertEqual(message.get_data(), payload)
+
+    def test_inline_data_above_receive_max_is_dropped(self):
+        payload = bytes(INLINE_PAYLOAD_RECEIVE_MAX_BYTES + 1)
+        message = Message.from_json(self.message_json(b64encode(payload).decode()))
+        self.assertFalse(message.has_data())
+        self.assertEqual(message.get_node_id(), "node")
+
+    def test_invalid_inline_data_is_dropped(self):
+        for data in ("not base64!", 42):
+            self.assertFalse(Message.from_json(self.message_json(data)).has_data())
@@ -0,0 +1,114 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError, ReadTimeout
+
+from network.ipfs.resilient_session import CircuitOpenError, ResilientSession, RetryPolicy
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.3)
+        self.send_response(503 if self.path == "/unavailable" else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class RetryPolicyTestCase(TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(
+            retry_attempts=0, retry_deadline=1, circuit_failures=2, circuit_cooldown=0.05
+        )
+
+    def open_circuit(self):
+        for _ in range(2):
+            self.policy.before_attempt("GET", "url")
+            self.policy.after_attempt(True)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.OPEN)
+
+    def test_half_open_recovery(self):
+        self.open_circuit()
+        with self.assertRaises(CircuitOpenError):
+            self.policy.before_attempt("GET", "url")
+
+        time.sleep(0.06)
+        self.policy.before_attempt("GET", "url")
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):  # only one probe at a time
+            self.policy.before_attempt("GET", "url")
+
+        self.policy.after_attempt(False)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.CLOSED)
+        self.policy.before_attempt("GET", "url")
+        self.policy.after_attempt(True)  # the streak was reset
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.CLOSED)
+
+    def test_failed_probe_opens_circuit(self):
+        self.open_circuit()
+        time.sleep(0.06)
+        self.policy.before_attempt("GET", "url")
+        self.policy.after_attempt(True)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.OPEN)
+        self.assertEqual(self.policy.metrics()["circuit_opened"], 2)
+
+    def test_cancelled_probe_allows_next_probe(self):
+        self.open_circuit()
+        time.sleep(0.06)
+        self.policy.before_attempt("GET", "url")
+        self.policy.attempt_cancelled()
+        self.policy.before_attempt("GET", "url")
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.HALF_OPEN)
+
+
+class ResilientSessionTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.policy = RetryPolicy(
+            retry_attempts=0, retry_deadline=1, circuit_failures=1, circuit_cooldown=0.05
+        )
+        self.session = ResilientSession(self.policy)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connect_failure_opens_circuit(self):
+        with self.assertRaises(ConnectionError):
+            self.session.get(f"http://127.0.0.1:{unused_port()}/", timeout=1)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.session.get(self.base_url + "/", timeout=1)
+
+        time.sleep(0.06)
+        self.assertEqual(self.session.get(self.base_url + "/", timeout=1).status_code, 200)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.CLOSED)
+
+    def test_read_timeout_and_server_errors_keep_circuit_closed(self):
+        with self.assertRaises(ReadTimeout):
+            self.session.get(self.base_url + "/slow", timeout=(1, 0.05))
+        self.assertEqual(self.session.get(self.base_url + "/unavailable").status_code, 503)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.CLOSED)
+
+    def test_server_error_closes_half_open_circuit(self):
+        with self.assertRaises(ConnectionError):
+            self.session.get(f"http://127.0.0.1:{unused_port()}/", timeout=1)
+        time.sleep(0.06)
+        self.assertEqual(self.session.get(self.base_url + "/unavailable").status_code, 503)
+        self.assertEqual(self.policy.circuit_state, RetryPolicy.CLOSED)
@@ -0,0 +1,34 @@
+import hashlib
+from unittest import TestCase
+
+from blockchain.signature_verifier import SignatureVerifier
+from wallet import Wallet
+
+
+class SignatureVerifierTestCase(TestCase):
+    def setUp(self):
+        self.verifier = SignatureVerifier(workers=2, min_batch=1)
+        wallets = [Wallet(secret_passcode=f"wallet {index}") for index in range(3)]
+        self.items = []
+        for index in range(40):
+            wallet = wallets[index % len(wallets)]
+            hash_str = hashlib.sha256(f"unique {index} {id(self)}".encode()).hexdigest()
+            self.items.append((wallet.public, wallet.sign(hash_str), hash_str))
+
+    def tearDown(self):
+        self.verifier.shutdown()
+
+    def test_verify_many(self):
+        public_key, _, hash_str = self.items[3]
+        self.items[3] = (public_key, self.items[4][1], hash_str)
+        results = self.verifier.verify_many(self.items)
+        self.assertEqual(results, [index != 3 for index in range(len(self.items))])
+
+    def test_verified_signatures_are_cached(self):
+        self.assertTrue(self.verifier.verify_all(self.items))
+        self.assertTrue(all(Wallet.signature_cache.contains(*item) for item in self.items))
+
+    def test_shutdown(self):
+        self.verifier.verify_all(self.items)
+        self.verifier.shutdown()
+        self.assertIsNone(self.verifier._pool)
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from config import Config
+from blockchain import Blockchain
+from storage import SnapshotStore
+
+from .helpers import create_wallets, forge_blocks
+
+
+class SnapshotStoreTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.directory, keep=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        self.store.save(10, {"length": 10})
+        self.assertEqual(self.store.load(10), {"length": 10})
+        self.assertIsNone(self.store.load(20))
+
+    def test_keep_latest(self):
+        for length in (10, 20, 30):
+            self.store.save(length, {"length": length})
+        self.assertEqual(self.store.lengths(), [30, 20])
+
+    def test_save_removes_longer_snapshots(self):
+        # The chain was replaced by a shorter chain
+        for length in (10, 20, 30):
+            self.store.save(length, {"length": length})
+        self.store.save(25, {"length": 25})
+        self.assertEqual(self.store.lengths(), [25, 20])
+
+    def test_corrupted_snapshot(self):
+        self.store.save(10, {"length": 10})
+        with open(self.store._path(10), "ab") as snapshot_file:
+            snapshot_file.write(b" ")
+        self.assertIsNone(self.store.load(10))
+
+
+class BlockchainSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.snapshot_interval = Config.SNAPSHOT_INTERVAL
+        self.is_full_node = Config.IS_FULL_NODE
+        Config.SNAPSHOT_INTERVAL = 4
+        Config.IS_FULL_NODE = False
+        self.directory = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.directory, keep=2)
+        self.forgers = create_wallets("forger")
+
+    def tearDown(self):
+        Config.SNAPSHOT_INTERVAL = self.snapshot_interval
+        Config.IS_FULL_NODE = self.is_full_node
+        shutil.rmtree(self.directory)
+
+    def test_load_latest_snapshot(self):
+        blockchain = Blockchain(branch=True, snapshot_store=self.store)
+        forge_blocks(blockchain, self.forgers, 9)
+        self.assertEqual(self.store.lengths(), [8, 4])
+
+        loaded = Blockchain(branch=True, snapshot_store=self.store)
+        self.assertEqual(loaded.length, 8)
+        self.assertEqual(loaded.block_hashs, blockchain.block_hashs[:8])
+
+    def test_adopt_storage_removes_replaced_chain_snapshots(self):
+        blockchain = Blockchain(branch=True, snapshot_store=self.store)
+        forge_blocks(blockchain, self.forgers, 9)
+        branch = blockchain.fork(4)
+        forge_blocks(branch, self.forgers, 2, first_forger=1)
+
+        branch.adopt_storage(blockchain)
+
+        self.assertEqual(self.store.lengths(), [6, 4])
+        loaded = Blockchain(branch=True, snapshot_store=self.store)
+        self.assertEqual(loaded.block_hashs, branch.block_hashs)
@@ -0,0 +1,79 @@
+import random
+from itertools import accumulate
+from unittest import TestCase
+
+from blockchain.consensus import SumTree
+
+
+class SumTreeTestCase(TestCase):
+    def setUp(self):
+        self.values = [30, 0, 15, 70, 5, 20, 0, 40, 10]
+        self.tree = SumTree()
+        for value in self.values:
+            self.tree.append(value)
+
+    def naive_search(self, value: int) -> int:
+        for index, prefix_sum in enumerate(accumulate(self.values)):
+            if prefix_sum > value:
+                return index
+        return len(self.values) - 1
+
+    def assert_matches_values(self):
+        self.assertEqual(len(self.tree), len(self.values))
+        self.assertEqual(self.tree.sum, sum(self.values))
+        for prefix_sum in accumulate(self.values):
+            for value in (prefix_sum - 1, prefix_sum, prefix_sum + 1):
+                if 0 <= value < self.tree.sum:
+                    self.assertEqual(self.tree.search(value), self.naive_search(value), value)
+
+    def test_append(self):
+        self.assertEqual(self.tree.values, self.values)
+        self.assert_matches_values()
+
+    def test_search_skips_empty_leafs(self):
+        self.assertEqual(self.tree.search(0), 0)
+        self.assertEqual(self.tree.search(30), 2)  # leaf 1 is 0
+        self.assertEqual(self.tree.search(self.tree.sum - 1), 8)
+
+    def test_update(self):
+        for index, value in ((1, 25), (3, 0), (8, 60), (0, 0)):
+            self.tree.update(index, value)
+            self.values[index] = value
+            self.assert_matches_values()
+
+    def test_from_values(self):
+        tree = SumTree.from_values(self.values)
+        self.assertEqual(tree._tree, self.tree._tree)
+        self.assertEqual(tree.sum, self.tree.sum)
+
+    def test_random_updates(self):
+        generator = random.Random(7)
+        self.values = [generator.randint(0, 10) for _ in range(100)]
+        self.tree = SumTree.from_values(self.values)
+        for _ in range(200):
+            index = generator.randrange(len(self.values))
+            self.values[index] = generator.randint(0, 10)
+            self.tree.update(index, self.values[index])
+            if generator.random() < 0.2:
+                self.values.append(generator.randint(0, 10))
+                self.tree.append(self.values[-1])
+        self.assert_matches_values()
+
+    def test_copy(self):
+        tree = self.tree.copy()
+        tree.update(0, 100)
+        tree.append(10)
+        self.assertEqual(self.tree.values, self.values)
+        self.assert_matches_values()
+
+    def test_sums_do_not_depend_on_history(self):
+        generator = random.Random(11)
+        values = [generator.randrange(10 ** 12) for _ in range(500)]
+        tree = SumTree.from_values(values)
+        for _ in range(20000):
+            index = generator.randrange(len(values))
+            values[index] = generator.randrange(10 ** 12)
+            tree.update(index, values[index])
+        rebuilt = SumTree.from_values(values)
+        self.assertEqual(tree._tree, rebuilt._tree)
+        self.assertEqual(tree.sum, rebuilt.sum)